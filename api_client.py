@@ -0,0 +1,203 @@
+"""
+Client de l'API de prédiction Bitcoin (dashboard Streamlit, scripts)
+
+- Session HTTP persistante (keep-alive) avec pool de connexions, timeouts
+  et nouvelles tentatives sur les erreurs transitoires (502/503/504).
+- Cache des prédictions côté client: une prédiction est réutilisée sans
+  requête pendant `ttl` secondes (ou le max-age annoncé par le serveur),
+  puis revalidée par une requête conditionnelle (If-None-Match): l'API
+  répond 304 sans recalcul tant que le modèle et la dernière bougie n'ont
+  pas changé. En cas d'erreur, la dernière version connue est servie.
+- Sonde de santé en arrière-plan: `health()` retourne immédiatement le
+  dernier état connu, sans bloquer l'affichage.
+
+Une même instance peut être partagée par tous les utilisateurs d'un
+serveur Streamlit (`st.cache_resource`).
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401  (décodage br par urllib3)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "http://localhost:5001"
+# (connexion, lecture) en secondes: un calcul de prédiction peut prendre plusieurs secondes
+DEFAULT_TIMEOUT = (3.05, 30)
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class APIError(Exception):
+    """Erreur renvoyée par l'API (ou API injoignable sans version en cache)"""
+
+
+class PredictionAPIClient:
+    """Client HTTP de l'API avec pool de connexions, cache ETag et sonde de santé en arrière-plan"""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=DEFAULT_TIMEOUT, ttl=60, pool_maxsize=20,
+                 retries=2, health_interval=15, clock=time.monotonic):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.ttl = ttl
+        self.health_interval = health_interval
+        self.clock = clock
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset({'GET', 'HEAD'}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json', 'Accept-Encoding': ACCEPT_ENCODING})
+
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # Une seule revalidation par clé à la fois: les autres utilisateurs attendent le même résultat
+        self._key_locks = {}
+        self._health = {"status": "unknown", "ready": None, "checked_at": None, "latency_ms": None, "error": None}
+        self._health_thread = None
+        self._stopped = threading.Event()
+        self.stats = {"hits": 0, "revalidated": 0, "downloads": 0, "stale": 0}
+
+    def _url(self, path):
+        return f"{self.base_url}{path}"
+
+    # ------------------------------------------------------------------
+    # Prédictions
+    # ------------------------------------------------------------------
+    def get_prediction(self, days=30, model=None, samples=0, force=False):
+        """Prédiction (champ "data" de GET /predict), servie depuis le cache tant qu'elle est fraîche"""
+        params = {"days": days}
+        if model:
+            params["model"] = model
+        if samples:
+            params["samples"] = samples
+        return self._get_cached('/predict', params, force=force)
+
+    def _get_cached(self, path, params, force=False):
+        key = (path, tuple(sorted(params.items())))
+        with self._cache_lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._cache_lock:
+                entry = self._cache.get(key)
+            now = self.clock()
+            if entry is not None and not force and now < entry["expires_at"]:
+                self.stats["hits"] += 1
+                return entry["data"]
+
+            headers = {"If-None-Match": entry["etag"]} if entry is not None and entry["etag"] else {}
+            try:
+                response = self.session.get(self._url(path), params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                if entry is not None:
+                    # API injoignable: dernière version connue plutôt qu'une page en erreur
+                    self.stats["stale"] += 1
+                    logger.warning(f"API injoignable, prédiction en cache servie: {e}")
+                    return entry["data"]
+                raise APIError(f"API injoignable: {e}") from e
+
+            if response.status_code == 304 and entry is not None:
+                self.stats["revalidated"] += 1
+                entry = {**entry, "expires_at": now + self._max_age(response)}
+            else:
+                payload = self._json(response)
+                self.stats["downloads"] += 1
+                entry = {
+                    "data": payload["data"],
+                    "etag": response.headers.get("ETag"),
+                    "expires_at": now + self._max_age(response),
+                }
+            with self._cache_lock:
+                self._cache[key] = entry
+            return entry["data"]
+
+    def _max_age(self, response):
+        """Durée de fraîcheur: min(ttl du client, max-age annoncé par le serveur)"""
+        match = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+        return min(self.ttl, int(match.group(1))) if match else self.ttl
+
+    @staticmethod
+    def _json(response):
+        try:
+            payload = response.json()
+        except ValueError:
+            raise APIError(f"Réponse invalide de l'API (HTTP {response.status_code})")
+        if response.status_code != 200 or not payload.get("success", False):
+            raise APIError(payload.get("error") or f"Erreur HTTP {response.status_code}")
+        return payload
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stream_prediction(self, days=30, model=None):
+        """Prédiction diffusée jour par jour (/predict/stream): couples (événement, données)
+
+        Génère "start", un "day" par jour prédit, puis "summary" ou "error".
+        """
+        params = {"days": days}
+        if model:
+            params["model"] = model
+        with self.session.get(self._url('/predict/stream'), params=params, stream=True,
+                              timeout=(self.timeout[0], 60)) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    yield event, json.loads(line[len("data: "):])
+
+    # ------------------------------------------------------------------
+    # Santé
+    # ------------------------------------------------------------------
+    def probe_health(self):
+        """Interroge /ready (une requête) et met à jour l'état de santé"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self._url('/ready'), timeout=(self.timeout[0], 5))
+            ready = response.status_code == 200
+            health = {"status": "ready" if ready else "starting", "ready": ready, "error": None}
+        except requests.RequestException as e:
+            health = {"status": "unreachable", "ready": False, "error": str(e)}
+        health.update(checked_at=time.time(), latency_ms=round((time.perf_counter() - start) * 1e3, 1))
+        self._health = health
+        return health
+
+    def start_health_probe(self):
+        """Lance la sonde de santé périodique en arrière-plan (idempotent)"""
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return
+        self._stopped.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, name="api-health-probe", daemon=True)
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stopped.is_set():
+            self.probe_health()
+            self._stopped.wait(self.health_interval)
+
+    def health(self):
+        """Dernier état connu (status: unknown, ready, starting ou unreachable), sans requête"""
+        return dict(self._health)
+
+    def close(self):
+        self._stopped.set()
+        self.session.close()
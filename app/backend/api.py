@@ -1,7 +1,22 @@
-from flask import Flask, jsonify, request
+import time
+_IMPORTS_START = time.perf_counter()
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+import json
 from flask_cors import CORS
 import logging
-from services.prediction_service import BitcoinPredictionService
+import os
+from services.candle_store import CSVReplaySource
+from services.forecast_scheduler import ForecastScheduler
+from services.http_cache import (FastJSONProvider, compress_response, forecast_etag, is_not_modified,
+                                 last_modified_for, tag_response)
+from services.metrics import CONTENT_TYPE, HTTP_DURATION, HTTP_IN_FLIGHT, HTTP_REQUESTS, REGISTRY
+from services.prediction_service import MAX_UNCERTAINTY_SAMPLES, BitcoinPredictionService
+from services.startup import StartupReport, start_warmup, warm_up
+
+# Rapport de démarrage: durée des imports, du chargement du modèle et de la première inférence
+startup = StartupReport(started_at=_IMPORTS_START)
+startup.record("imports", time.perf_counter() - _IMPORTS_START)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -10,9 +25,169 @@ logger = logging.getLogger(__name__)
 # Initialisation de Flask
 app = Flask(__name__)
 CORS(app)  # Permet les requêtes CORS pour Streamlit
+# Sérialisation JSON par orjson si installé (json standard sinon)
+app.json = FastJSONProvider(app)
+
+# Horizon maximal accepté par /predict
+MAX_PREDICTION_DAYS = 365
+
+# Bandes d'incertitude Monte Carlo dropout (?samples=N): nombre de trajectoires par défaut
+# (0 = désactivé) et budget de latence par défaut au-delà duquel des trajectoires sont abandonnées
+DEFAULT_UNCERTAINTY_SAMPLES = int(os.environ.get('BTC_MC_SAMPLES', '0'))
+DEFAULT_UNCERTAINTY_BUDGET_MS = float(os.environ.get('BTC_MC_BUDGET_MS', '500'))
+
+# Cache HTTP: durée de fraîcheur des prévisions côté client (Cache-Control max-age, secondes)
+# et compression gzip/br des réponses JSON (BTC_HTTP_COMPRESS=0 pour désactiver, ex: derrière un proxy qui compresse)
+HTTP_MAX_AGE = int(os.environ.get('BTC_HTTP_MAX_AGE', '60'))
+HTTP_COMPRESS = os.environ.get('BTC_HTTP_COMPRESS', '1') == '1'
 
 # Initialisation du service de prédiction
-prediction_service = BitcoinPredictionService()
+# BTC_INFERENCE_BACKEND=numpy permet de servir sans importer TensorFlow
+# BTC_MODEL_PATH peut pointer vers un bundle .npz (poids + scalers d'entraînement)
+# BTC_MAX_RESIDENT_MODELS limite le nombre de modèles gardés en mémoire (LRU)
+# BTC_QUANTIZATION=float16|int8 quantifie les poids au chargement (backend numpy)
+# BTC_DATA_SOURCE=csv rejoue BTC_REPLAY_CSV (market_data.csv) à la place de yfinance, et
+# BTC_STORE_ROOT place les stores de bougies ailleurs: tests de charge hors ligne et reproductibles
+# Le modèle est chargé en arrière-plan: le port est ouvert immédiatement et /ready
+# passe à 200 une fois le modèle chargé et la première prédiction calculée
+source_factory = None
+if os.environ.get('BTC_DATA_SOURCE', 'yfinance') == 'csv':
+    replay_csv = os.environ.get('BTC_REPLAY_CSV', 'market_data.csv')
+    source_factory = lambda ticker: CSVReplaySource(replay_csv)
+prediction_service = BitcoinPredictionService(
+    model_path=os.environ.get('BTC_MODEL_PATH', 'app/models/model.h5'),
+    backend=os.environ.get('BTC_INFERENCE_BACKEND', 'keras'),
+    max_resident_models=int(os.environ.get('BTC_MAX_RESIDENT_MODELS', '2')),
+    quantization=os.environ.get('BTC_QUANTIZATION') or None,
+    store_root=os.environ.get('BTC_STORE_ROOT', 'app/data/candles'),
+    source_factory=source_factory,
+    eager_load=False
+)
+warm_forecast = os.environ.get('BTC_WARMUP_FORECAST', '1') == '1'
+preload = os.environ.get('BTC_PRELOAD_MODEL') == '1'
+if preload:
+    # Serveur pré-forké (gunicorn.conf.py): chargement synchrone dans le maître, avant le fork,
+    # pour que les workers partagent les poids en copy-on-write
+    warm_up(prediction_service, startup, warm_forecast=warm_forecast)
+else:
+    start_warmup(prediction_service, startup, warm_forecast=warm_forecast)
+
+# Précalcul des prévisions après chaque clôture journalière (BTC_SCHEDULER=0 pour désactiver)
+# BTC_SCHEDULED_HORIZONS liste les horizons précalculés pour le modèle par défaut (ex: "7,30")
+forecast_scheduler = None
+fine_tune_job = None
+
+
+def start_fine_tune():
+    """Fine-tuning incrémental du modèle par défaut sur les nouvelles bougies du store (processus séparé)
+
+    Le modèle n'est remplacé que si son MAPE de validation ne régresse pas;
+    le registre le recharge alors à chaud et les prévisions sont recalculées.
+    """
+    global fine_tune_job
+    from services.fine_tune import PROMOTED, has_new_candles, start_background
+
+    store = prediction_service.store_for()
+    if (fine_tune_job is not None and not fine_tune_job.done()) or \
+            not has_new_candles(prediction_service.model_path, store.last_date()):
+        return
+
+    def on_done(future):
+        try:
+            report = future.result()
+        except Exception as e:
+            logger.warning(f"Fine-tuning incrémental échoué: {e}")
+            return
+        if report["status"] == PROMOTED and forecast_scheduler is not None:
+            forecast_scheduler.request_refresh()
+
+    fine_tune_job = start_background(prediction_service.model_path, store_dir=store.directory,
+                                     threads=int(os.environ.get('BTC_FINE_TUNE_THREADS', '1')))
+    fine_tune_job.add_done_callback(on_done)
+
+
+if os.environ.get('BTC_SCHEDULER', '1') == '1':
+    forecast_scheduler = ForecastScheduler(
+        prediction_service,
+        jobs=[(int(days), None) for days in os.environ.get('BTC_SCHEDULED_HORIZONS', '30').split(',')],
+        close_delay=int(os.environ.get('BTC_SCHEDULER_CLOSE_DELAY', '300')),
+        # BTC_FINE_TUNE=1: fine-tuning incrémental après chaque précalcul (BTC_FINE_TUNE_THREADS cœurs)
+        after_refresh=start_fine_tune if os.environ.get('BTC_FINE_TUNE') == '1' else None,
+        # Workers gunicorn: un seul worker (élu par verrou sur le store) recalcule et lance le fine-tuning,
+        # les autres servent ses prévisions
+        shared_dir=prediction_service.store.directory
+    )
+    if not preload:
+        # Avec gunicorn --preload, chaque worker démarre son thread à la première requête
+        forecast_scheduler.ensure_started()
+
+
+def not_ready_response():
+    """Réponse 503 tant que le modèle n'est pas chargé (None sinon)"""
+    if startup.ready:
+        return None
+    response = jsonify({
+        "success": False,
+        "error": "Service en cours de démarrage" if startup.error is None else startup.error,
+        "startup": startup.as_dict()
+    })
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
+def json_payload():
+    """Corps JSON de la requête (dict vide sans corps); ValueError si ce n'est pas un objet"""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return {}
+    if not isinstance(payload, dict):
+        raise ValueError("Corps JSON invalide: objet attendu")
+    return payload
+
+
+def unknown_model_response(model_name):
+    """Réponse 400 si le modèle demandé n'existe pas (None sinon)"""
+    if model_name is None or model_name in prediction_service.registry.available():
+        return None
+    if model_name in prediction_service.registry.discover():
+        return None
+    return jsonify({
+        "success": False,
+        "error": f"Modèle inconnu: {model_name}",
+        "available_models": prediction_service.registry.available()
+    }), 400
+
+def _endpoint_label():
+    # Route déclarée (ex: /predict/batch) plutôt que l'URL: cardinalité bornée
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_endpoint = _endpoint_label()
+    HTTP_IN_FLIGHT.labels(endpoint=g.metrics_endpoint).inc()
+
+@app.after_request
+def record_request_metrics(response):
+    # Pour /predict/stream, durée jusqu'au premier octet (le corps est diffusé ensuite)
+    endpoint = g.get("metrics_endpoint", "unmatched")
+    HTTP_DURATION.labels(endpoint=endpoint).observe(time.perf_counter() - g.get("metrics_start", time.perf_counter()))
+    HTTP_REQUESTS.labels(endpoint=endpoint, method=request.method, status=response.status_code).inc()
+    return response
+
+@app.after_request
+def compress(response):
+    # Réponses complètes uniquement: /predict/stream reste diffusé sans tampon
+    if HTTP_COMPRESS:
+        compress_response(response, request.accept_encodings)
+    return response
+
+@app.teardown_request
+def end_request_metrics(error=None):
+    # Peut être appelé deux fois pour les réponses diffusées (stream_with_context): une seule décrémentation
+    endpoint = g.pop("metrics_endpoint", None)
+    if endpoint is not None:
+        HTTP_IN_FLIGHT.labels(endpoint=endpoint).dec()
 
 @app.route('/')
 def root():
@@ -22,37 +197,116 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "predict": "/predict",
-            "model_status": "/model/status"
+            "predict_stream": "/predict/stream",
+            "predict_batch": "/predict/batch",
+            "predict_assets": "/predict/assets",
+            "model_status": "/model/status",
+            "metrics": "/metrics"
         }
     })
 
 @app.route('/health')
 def health_check():
-    """Vérification de la santé de l'API"""
+    """Vérification de la santé de l'API (liveness: le processus répond, modèle chargé ou non)"""
     return jsonify({
         "status": "healthy",
         "model_loaded": prediction_service.model is not None,
         "timestamp": prediction_service.get_model_status()
     })
 
+@app.route('/ready')
+def readiness_check():
+    """Préparation du service (readiness): 200 une fois le modèle chargé et préchauffé, 503 avant"""
+    return jsonify({
+        "ready": startup.ready,
+        "startup": startup.as_dict()
+    }), 200 if startup.ready else 503
+
+@app.route('/metrics')
+def metrics():
+    """Métriques du pipeline au format texte Prometheus (latences par étape, requêtes, chargements)"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/model/status')
 def model_status():
-    """Statut du modèle LSTM"""
-    return jsonify(prediction_service.get_model_status())
+    """Statut du modèle LSTM, des modèles résidents du registre et du scheduler"""
+    status = prediction_service.get_model_status()
+    status["scheduler"] = forecast_scheduler.status() if forecast_scheduler is not None else None
+    return jsonify(status)
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    """Génère une prédiction Bitcoin pour les 30 prochains jours"""
+    """Génère une prédiction Bitcoin pour les 30 prochains jours (ou ?days=N, ?model=nom)"""
+    error_response = not_ready_response()
+    if error_response is not None:
+        return error_response
+
     try:
-        # Génération de la prédiction
-        result = prediction_service.generate_prediction()
+        # Horizon de prédiction (30 jours par défaut)
+        n_days = request.args.get('days', default=30, type=int)
+        if not 1 <= n_days <= MAX_PREDICTION_DAYS:
+            return jsonify({
+                "success": False,
+                "error": f"Le paramètre 'days' doit être compris entre 1 et {MAX_PREDICTION_DAYS}"
+            }), 400
+
+        # Sélection du modèle (?model=model_btc_rolling_30d_1y.npz), modèle par défaut sinon
+        model_name = request.args.get('model')
+        error_response = unknown_model_response(model_name)
+        if error_response is not None:
+            return error_response
+
+        # Bandes d'incertitude: ?samples=N trajectoires Monte Carlo dropout, ?budget_ms=latence maximale visée
+        samples = request.args.get('samples', default=DEFAULT_UNCERTAINTY_SAMPLES, type=int)
+        if not 0 <= samples <= MAX_UNCERTAINTY_SAMPLES:
+            return jsonify({
+                "success": False,
+                "error": f"Le paramètre 'samples' doit être compris entre 0 et {MAX_UNCERTAINTY_SAMPLES}"
+            }), 400
+        budget_ms = request.args.get('budget_ms', default=DEFAULT_UNCERTAINTY_BUDGET_MS, type=float)
+        params = (n_days, samples, budget_ms if samples else None)
+
+        # Prévision à une date passée (?as_of=2025-03-01), ou une par bougie d'une période (&as_of_end=2025-03-31)
+        as_of = request.args.get('as_of')
+        if as_of is not None:
+            if samples:
+                return jsonify({
+                    "success": False,
+                    "error": "Les bandes d'incertitude ne sont pas disponibles avec 'as_of'"
+                }), 400
+            return as_of_response(n_days, model_name, as_of, request.args.get('as_of_end'))
+
+        # Requête conditionnelle (If-None-Match / If-Modified-Since): 304 sans exécuter le pipeline
+        # si le modèle et la dernière bougie n'ont pas changé depuis la version du client
+        entry, last_candle_date = prediction_service.forecast_version(model_name)
+        if last_candle_date is not None:
+            etag = forecast_etag(entry.identity, last_candle_date, *params)
+            last_modified = last_modified_for(entry.mtime, last_candle_date)
+            if is_not_modified(request, etag, last_modified):
+                return tag_response(Response(status=304), etag, last_modified, HTTP_MAX_AGE)
+
+        # Prévision précalculée par le scheduler si disponible (même périmée, rafraîchie en arrière-plan),
+        # sinon calcul à la demande (mis en cache par modèle, dernière bougie et horizon)
+        # Les deux chemins servent le modèle `entry`: une prévision précalculée par une version
+        # précédente (rechargement à chaud) n'est pas servie
+        result = None
+        if forecast_scheduler is not None and not samples:
+            result = forecast_scheduler.get(n_days, model_name, identity=entry.identity)
+        if result is None:
+            result = prediction_service.generate_prediction(n_days=n_days, model_name=model_name, entry=entry,
+                                                            samples=samples, budget_ms=budget_ms if samples else None)
         
         if result["success"]:
-            return jsonify({
+            # ETag et Last-Modified de la version servie: modèle `entry` et dernière bougie de la prévision
+            # (une prévision précalculée peut dater de la bougie précédente)
+            served_date = result["last_candle_date"]
+            return tag_response(jsonify({
                 "success": True,
                 "data": result
-            })
+            }), forecast_etag(entry.identity, served_date, *params), last_modified_for(entry.mtime, served_date),
+                HTTP_MAX_AGE)
         else:
             return jsonify({
                 "success": False,
@@ -66,10 +320,147 @@ def predict():
             "error": str(e)
         }), 500
 
+def as_of_response(n_days, model_name, as_of, as_of_end=None):
+    """Prévision(s) datée(s): recalculées sur l'historique local connu à chaque date, sans données postérieures"""
+    try:
+        result = prediction_service.generate_as_of_prediction(as_of, n_days=n_days, model_name=model_name,
+                                                              as_of_end=as_of_end)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    # Une prévision passée ne change plus: ETag par modèle, ancres et prix de la dernière bougie utilisée
+    forecasts = result["forecasts"] if as_of_end is not None else [result]
+    entry = prediction_service.resolve_model(model_name)
+    etag = forecast_etag(entry.identity, forecasts[-1]["as_of"], "as_of", forecasts[0]["as_of"],
+                         forecasts[-1]["current_price"], n_days)
+    last_modified = last_modified_for(entry.mtime, forecasts[-1]["as_of"])
+    if is_not_modified(request, etag, last_modified):
+        return tag_response(Response(status=304), etag, last_modified, HTTP_MAX_AGE)
+    return tag_response(jsonify({
+        "success": True,
+        "data": result
+    }), etag, last_modified, HTTP_MAX_AGE)
+
 @app.route('/predict', methods=['GET'])
 def predict_get():
     """Endpoint GET pour la prédiction (pour compatibilité)"""
     return predict()
 
+@app.route('/predict/stream', methods=['GET', 'POST'])
+def predict_stream():
+    """Prédiction diffusée jour par jour (Server-Sent Events, ou ?format=ndjson pour du JSON ligne par ligne)
+
+    Événements: "start" (prix actuel), un "day" par jour prédit dès son calcul,
+    puis "summary" (variation, confiance, recommandation DCA) ou "error".
+    """
+    error_response = not_ready_response()
+    if error_response is not None:
+        return error_response
+
+    n_days = request.args.get('days', default=30, type=int)
+    if not 1 <= n_days <= MAX_PREDICTION_DAYS:
+        return jsonify({
+            "success": False,
+            "error": f"Le paramètre 'days' doit être compris entre 1 et {MAX_PREDICTION_DAYS}"
+        }), 400
+
+    model_name = request.args.get('model')
+    error_response = unknown_model_response(model_name)
+    if error_response is not None:
+        return error_response
+
+    ndjson = request.args.get('format') == 'ndjson'
+    events = prediction_service.stream_prediction(n_days=n_days, model_name=model_name)
+
+    def generate():
+        for event, data in events:
+            if ndjson:
+                yield json.dumps({"event": event, **data}) + "\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if ndjson else 'text/event-stream',
+        # Pas de mise en tampon par un proxy (nginx): chaque jour est envoyé dès son calcul
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Prédictions rolling batchées: plusieurs dates d'ancrage, horizons ou scénarios what-if
+
+    Corps JSON: {"days": 30, "model": "model.h5", "scenarios": [{"id": "choc", "anchor_date": "2025-07-01",
+    "days": 60, "overrides": {"RSI_14": 30}, "shocks": {"Volume": 2.0}}, ...]}
+    """
+    error_response = not_ready_response()
+    if error_response is not None:
+        return error_response
+
+    try:
+        payload = json_payload()
+        default_days = int(payload.get("days", 30))
+        result = prediction_service.generate_batch_prediction(payload.get("scenarios", []), default_days=default_days,
+                                                              model_name=payload.get("model"))
+        return jsonify({
+            "success": True,
+            "data": result
+        })
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erreur lors de la prédiction batch: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/predict/assets', methods=['GET', 'POST'])
+def predict_assets():
+    """Prédictions rolling pour plusieurs actifs, données récupérées en parallèle
+
+    Corps JSON: {"tickers": ["BTC-USD", "ETH-USD", "SOL-USD"], "days": 30, "model": "model.h5"}
+    ou paramètres ?tickers=ETH-USD,SOL-USD&days=30
+    """
+    error_response = not_ready_response()
+    if error_response is not None:
+        return error_response
+
+    try:
+        payload = json_payload()
+        tickers = payload.get("tickers")
+        if tickers is None:
+            tickers = [ticker for ticker in request.args.get('tickers', '').split(',') if ticker]
+        n_days = int(payload.get("days", request.args.get('days', 30)))
+        model_name = payload.get("model", request.args.get('model'))
+        error_response = unknown_model_response(model_name)
+        if error_response is not None:
+            return error_response
+
+        result = prediction_service.generate_multi_asset_prediction(tickers, n_days=n_days, model_name=model_name)
+        return jsonify({
+            "success": True,
+            "data": result
+        })
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erreur lors de la prédiction multi-actifs: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=False) 
\ No newline at end of file
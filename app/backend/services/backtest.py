@@ -0,0 +1,195 @@
+"""
+Backtest walk-forward du modèle rolling 30 jours
+
+Rejoue la prédiction rolling depuis chaque date d'ancrage éligible de
+l'historique (ex: market_data.csv), en avançant toutes les ancres d'un
+même chunk ensemble (un appel au modèle par jour d'horizon) et en
+répartissant les chunks sur un pool de processus.
+
+Usage:
+    PYTHONPATH=app/backend python -m services.backtest --csv market_data.csv --workers 4
+"""
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from services.indicators import INDICATOR_WARMUP, compute_indicators
+from services.model_bundle import load_bundle
+from services.model_registry import load_model_file
+from services.numpy_lstm import NumpyLSTMModel
+from services.rollout import rollout_batch, scaler_params
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURES = ['Close', 'Open', 'High', 'Low', 'Volume', 'MM_200', 'RSI_14']
+RESULTS_COLUMNS = ['Pipeline', 'Features', 'Window', 'Batch_size', 'Epochs', 'Période', 'MAPE_1d', 'MAPE_30d', 'Commentaires']
+
+# Modèle chargé une seule fois par processus du pool
+_worker_model = None
+
+
+def _load_model(model_path, backend):
+    if model_path.endswith('.npz'):
+        # Bundle (éventuellement quantifié): moteur NumPy; ses scalers figés sont appliqués par walk_forward
+        return load_bundle(model_path).model
+    if backend == 'numpy':
+        return NumpyLSTMModel.from_h5(model_path)
+    from keras.models import load_model
+    return load_model(model_path)
+
+
+def _init_worker(model_path, backend):
+    global _worker_model
+    _worker_model = _load_model(model_path, backend)
+
+
+def _run_chunk(args):
+    initial_scaled, n_days, x_scale, x_min, y_scale, y_min = args
+    return rollout_batch(_worker_model, initial_scaled, n_days, x_scale, x_min, y_scale, y_min)
+
+
+def load_history(csv_path):
+    """Charge l'historique trié chronologiquement avec les 7 features du modèle"""
+    data = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date']).sort_index()
+    missing = [feature for feature in FEATURES if feature not in data.columns]
+    if missing:
+        # Historique OHLCV brut: calcul des indicateurs comme le service
+        data = compute_indicators(data)
+    return data[FEATURES].dropna()
+
+
+def walk_forward(data, model_path='app/models/model.h5', n_days=30, workers=None,
+                 chunk_size=256, backend='numpy', history_days=300, min_rows=50):
+    """Backtest walk-forward: une prédiction rolling depuis chaque ancre ayant n_days de futur connu
+
+    Chaque ancre est traitée comme le service en direct à cette date:
+    indicateurs (et scalers, sauf ceux figés d'un bundle) recalculés sur
+    les `history_days` bougies se terminant à l'ancre (précédées de leur
+    chauffe), sans aucune donnée postérieure. Les features sont celles du modèle évalué (7, OHLCV ou
+    Close seul). Les premières ancres, dont la fenêtre donne moins de `min_rows` bougies exploitables
+    (seuil du service), sont ignorées.
+
+    Retourne un dict avec les prédictions (ancres, n_days), les prix réels
+    correspondants et le MAPE par jour d'horizon.
+    """
+    entry = load_model_file(model_path, backend='numpy')
+    model_features = entry.features
+    closes = data['Close'].values.astype(np.float64)
+    n_anchors = len(data) - n_days
+    if n_anchors <= 0:
+        raise ValueError(f"Historique trop court ({len(data)} jours) pour un horizon de {n_days} jours")
+
+    positions, rows, x_scales, x_mins, y_scales, y_mins = [], [], [], [], [], []
+    for i in range(n_anchors):
+        window = data.iloc[max(0, i + 1 - history_days - INDICATOR_WARMUP):i + 1]
+        features = compute_indicators(window).iloc[-history_days:].dropna()[model_features]
+        if len(features) < min_rows:
+            continue
+        scaler_x, scaler_y = entry.scalers_for(features)
+        positions.append(i)
+        rows.append(scaler_x.transform(features.values[-1:])[0])
+        x_scale, x_min = scaler_params(scaler_x)
+        y_scale, y_min = scaler_params(scaler_y)
+        x_scales.append(x_scale)
+        x_mins.append(x_min)
+        y_scales.append(y_scale)
+        y_mins.append(y_min)
+    if not positions:
+        raise ValueError(f"Historique trop court ({len(data)} jours): aucune ancre avec {min_rows} bougies exploitables")
+    positions = np.array(positions)
+    initial_scaled, x_scales, x_mins = np.array(rows), np.array(x_scales), np.array(x_mins)
+    y_scales, y_mins = np.concatenate(y_scales), np.concatenate(y_mins)
+
+    chunks = [
+        (initial_scaled[start:start + chunk_size], n_days, x_scales[start:start + chunk_size],
+         x_mins[start:start + chunk_size], y_scales[start:start + chunk_size], y_mins[start:start + chunk_size])
+        for start in range(0, len(positions), chunk_size)
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        _init_worker(model_path, backend)
+        parts = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_worker, initargs=(model_path, backend)) as pool:
+            parts = list(pool.map(_run_chunk, chunks))
+    predictions = np.concatenate(parts, axis=0)
+
+    # Prix réels: jour d pour l'ancre i = Close[i + d]
+    actual = np.lib.stride_tricks.sliding_window_view(closes[1:], n_days)[positions]
+    errors = np.abs((actual - predictions) / actual) * 100
+
+    return {
+        "anchors": data.index[positions],
+        "features": model_features,
+        "predictions": predictions,
+        "actual": actual,
+        "mape_per_day": errors.mean(axis=0),
+        "mape_per_anchor": errors.mean(axis=1),
+    }
+
+
+def report(result):
+    """Tableau du MAPE par jour d'horizon"""
+    return pd.DataFrame({
+        "Horizon": np.arange(1, len(result["mape_per_day"]) + 1),
+        "MAPE": result["mape_per_day"],
+    })
+
+
+def append_results(result, results_csv='resultats_tests_lstm_complets.csv', model_path='app/models/model.h5',
+                   batch_size=32, epochs=100, periode='1y'):
+    """Ajoute une ligne au format de resultats_tests_lstm_complets.csv"""
+    anchors = result["anchors"]
+    row = {
+        'Pipeline': 'LSTM Rolling walk-forward',
+        'Features': ', '.join(result["features"]),
+        'Window': 1,
+        'Batch_size': batch_size,
+        'Epochs': epochs,
+        'Période': periode,
+        'MAPE_1d': float(result["mape_per_day"][0]),
+        'MAPE_30d': float(result["mape_per_anchor"].mean()),
+        'Commentaires': (
+            f"Backtest {len(anchors)} ancres du {anchors[0].strftime('%Y-%m-%d')} "
+            f"au {anchors[-1].strftime('%Y-%m-%d')} ({os.path.basename(model_path)})"
+        ),
+    }
+    header = not os.path.exists(results_csv)
+    pd.DataFrame([row], columns=RESULTS_COLUMNS).to_csv(results_csv, mode='a', header=header, index=False)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest walk-forward du modèle rolling")
+    parser.add_argument('--csv', default='market_data.csv', help="Historique (Date + OHLCV, indicateurs optionnels)")
+    parser.add_argument('--model', default='app/models/model.h5')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    parser.add_argument('--backend', choices=['numpy', 'keras'], default='numpy')
+    parser.add_argument('--results', default='resultats_tests_lstm_complets.csv',
+                        help="Fichier de résultats où ajouter la ligne (vide pour ne rien écrire)")
+    args = parser.parse_args()
+
+    data = load_history(args.csv)
+    result = walk_forward(data, model_path=args.model, n_days=args.days, workers=args.workers,
+                          chunk_size=args.chunk_size, backend=args.backend)
+    print(report(result).to_string(index=False))
+    print(f"MAPE moyen sur {args.days} jours: {result['mape_per_anchor'].mean():.2f}% "
+          f"({len(result['anchors'])} ancres)")
+    if args.results:
+        append_results(result, results_csv=args.results, model_path=args.model)
+        print(f"Résultat ajouté à {args.results}")
+
+
+if __name__ == "__main__":
+    main()
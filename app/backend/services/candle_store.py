@@ -0,0 +1,312 @@
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Close', 'Open', 'High', 'Low', 'Volume']
+
+# Résolutions des bougies stockées (règle pandas de regroupement)
+RESOLUTIONS = {'5m': '5min', '15m': '15min', '1h': '1h', '4h': '4h', '1d': '1D'}
+
+
+def resolution_step(resolution):
+    """Durée d'une bougie à cette résolution"""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Résolution inconnue: {resolution} (choix: {', '.join(RESOLUTIONS)})")
+    return pd.Timedelta(RESOLUTIONS[resolution])
+
+
+def _normalize_index(index, resolution='1d'):
+    """Ramène un index de dates au début de sa bougie, sans fuseau horaire
+
+    En journalier, la date locale est conservée (jours naïfs); en intraday,
+    les heures sont converties en UTC avant d'être arrondies à la résolution.
+    """
+    index = pd.DatetimeIndex(index)
+    if resolution == '1d':
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.normalize().as_unit("ns")
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return index.floor(RESOLUTIONS[resolution]).as_unit("ns")
+
+
+class YFinanceSource:
+    """Source de bougies journalières basée sur yfinance"""
+
+    def __init__(self, ticker="BTC-USD", interval="1d"):
+        self.ticker = ticker
+        self.interval = interval
+
+    def fetch(self, start=None, period="300d"):
+        """Récupère les bougies à partir de `start` (incluse), ou sur `period` si absent"""
+        import yfinance as yf
+
+        ticker = yf.Ticker(self.ticker)
+        if start is None:
+            data = ticker.history(period=period, interval=self.interval)
+        else:
+            data = ticker.history(start=start.strftime("%Y-%m-%d"), interval=self.interval)
+        if data.empty:
+            return data
+        data = data[OHLCV_COLUMNS].copy()
+        data.index = _normalize_index(data.index)
+        return data
+
+
+class CSVReplaySource:
+    """Source locale qui rejoue un fichier CSV (ex: market_data.csv) à la place de yfinance"""
+
+    def __init__(self, csv_path="market_data.csv"):
+        self.csv_path = csv_path
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            data = pd.read_csv(self.csv_path, index_col='Date', parse_dates=['Date'])
+            data = data[OHLCV_COLUMNS].sort_index()
+            data.index = _normalize_index(data.index)
+            self._data = data[~data.index.duplicated(keep='last')]
+        return self._data
+
+    def fetch(self, start=None, period="300d"):
+        """Retourne les bougies du CSV à partir de `start` (incluse)"""
+        data = self._load()
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        elif period is not None:
+            days = int(str(period).rstrip('d'))
+            data = data.iloc[-days:]
+        return data.copy()
+
+
+class CandleStore:
+    """Stockage local colonnaire (NumPy memory-mapped) des bougies OHLCV
+
+    Chaque colonne est un fichier binaire brut dans `directory`, lu via
+    `np.memmap`. Seules les bougies plus récentes que la dernière date
+    stockée sont récupérées et ajoutées; la dernière bougie (souvent encore
+    en cours) est réécrite à chaque mise à jour. `resolution` ('1d', '1h',
+    '5m'...) fixe la durée d'une bougie: un store par résolution.
+    """
+
+    DATE_COLUMN = 'Date'
+
+    def __init__(self, directory, source=None, seed_csv=None, min_update_interval=900, resolution='1d'):
+        resolution_step(resolution)
+        self.directory = directory
+        self.resolution = resolution
+        self.source = source if source is not None else YFinanceSource()
+        self.seed_csv = seed_csv
+        self.min_update_interval = min_update_interval
+        self._last_update = None
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        stored = self._read_meta().get("resolution", '1d')
+        if len(self) and stored != resolution:
+            raise ValueError(f"Le store {directory} contient des bougies {stored}, pas {resolution}")
+        if len(self) == 0 and seed_csv and os.path.exists(seed_csv):
+            self.seed_from_csv(seed_csv)
+
+    # ------------------------------------------------------------------
+    # Métadonnées et fichiers
+    # ------------------------------------------------------------------
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+
+    def _column_path(self, column):
+        return os.path.join(self.directory, f"{column}.bin")
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Verrou inter-processus (workers pré-forkés partageant le même store)"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        if not os.path.exists(self._meta_path):
+            return {"rows": 0}
+        with open(self._meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def __len__(self):
+        return self._read_meta()["rows"]
+
+    def _column(self, column, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(column), dtype=dtype, mode='r', shape=(rows,))
+
+    def _dates(self, rows):
+        return self._column(self.DATE_COLUMN, np.int64, rows)
+
+    def first_date(self):
+        """Première date stockée (ou None si le store est vide)"""
+        with self._file_lock(shared=True):
+            rows = len(self)
+            if rows == 0:
+                return None
+            return pd.Timestamp(int(self._dates(rows)[0]))
+
+    def last_date(self):
+        """Dernière date stockée (ou None si le store est vide)"""
+        # Verrou partagé: une écriture concurrente tronque puis réécrit les colonnes
+        with self._file_lock(shared=True):
+            rows = len(self)
+            if rows == 0:
+                return None
+            return pd.Timestamp(int(self._dates(rows)[-1]))
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+    def append(self, data):
+        """Ajoute des bougies; celles dont la date est déjà stockée sont réécrites"""
+        if data is None or data.empty:
+            return 0
+        data = data[OHLCV_COLUMNS].copy()
+        data.index = _normalize_index(data.index, self.resolution)
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+
+        with self._lock, self._file_lock():
+            rows = len(self)
+            keep = rows
+            if rows:
+                # Première position à réécrire: toutes les dates >= première date reçue
+                dates = self._dates(rows)
+                keep = int(np.searchsorted(dates, data.index[0].value, side='left'))
+
+            new_dates = data.index.values.astype('datetime64[ns]').astype(np.int64)
+            self._append_column(self.DATE_COLUMN, new_dates, keep)
+            for column in OHLCV_COLUMNS:
+                self._append_column(column, data[column].to_numpy(dtype=np.float64), keep)
+
+            self._write_meta({**self._read_meta(), "rows": keep + len(data), "columns": OHLCV_COLUMNS,
+                              "resolution": self.resolution})
+        return keep + len(data) - rows
+
+    def _append_column(self, column, values, keep):
+        path = self._column_path(column)
+        offset = keep * values.dtype.itemsize
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    def seed_from_csv(self, csv_path):
+        """Initialise le store à partir d'un CSV d'historique (ex: market_data.csv)"""
+        data = CSVReplaySource(csv_path).fetch(period=None)
+        added = self.append(data)
+        logger.info(f"Store initialisé depuis {csv_path}: {added} bougies")
+        return added
+
+    def update(self, force=False, min_rows=None, period="300d"):
+        """Récupère et ajoute uniquement les bougies plus récentes que la dernière stockée
+
+        Avec `min_rows`, un historique local plus court est d'abord complété
+        vers le passé (voir `backfill`). Au plus une tentative par
+        `min_update_interval`, réussie ou non: une source lente ou en échec
+        n'est pas rappelée à chaque requête.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_update is not None and now - self._last_update < self.min_update_interval:
+                return 0
+            self._last_update = now
+
+        if min_rows is not None and len(self) < min_rows and not self._read_meta().get("history_complete"):
+            return self.backfill(min_rows, period=period)
+
+        last = self.last_date()
+        data = self.source.fetch(start=last)
+        if last is not None and not data.empty:
+            data = data[_normalize_index(data.index, self.resolution) >= last]
+        added = self.append(data)
+        logger.info(f"Store mis à jour: {added} nouvelles bougies (dernière: {self.last_date()})")
+        return added
+
+    def backfill(self, min_rows, period="300d"):
+        """Complète l'historique local jusqu'à `min_rows` bougies, sans trou
+
+        Store vide: récupération sur `period`. Sinon une seule requête depuis
+        la date qui donnerait `min_rows` bougies jusqu'à aujourd'hui: les
+        bougies manquantes avant la première stockée et après la dernière
+        arrivent ensemble, contiguës. Si la source n'a rien de plus ancien
+        (CSV rejoué, actif récent), l'historique est marqué complet et les
+        mises à jour suivantes sont incrémentales.
+        """
+        rows = len(self)
+        if rows == 0:
+            added = self.append(self.source.fetch(period=period))
+        else:
+            first = self.first_date()
+            start = first - (min_rows - rows) * resolution_step(self.resolution)
+            data = self.source.fetch(start=start)
+            dates = _normalize_index(data.index, self.resolution) if not data.empty else None
+            if dates is not None and dates[0] >= first:
+                # Rien d'antérieur à la première bougie stockée: seules les nouvelles bougies sont écrites
+                with self._lock, self._file_lock():
+                    self._write_meta({**self._read_meta(), "history_complete": True})
+                data = data[dates >= self.last_date()]
+            added = self.append(data)
+        logger.info(f"Store complété: {len(self)} bougies (première: {self.first_date()}, "
+                    f"dernière: {self.last_date()})")
+        return added
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def _position(self, dates, date, side='right'):
+        """Nombre de bougies datées au plus tard de `date` (side='left': strictement avant), par dichotomie"""
+        return int(np.searchsorted(dates, _normalize_index([date], self.resolution)[0].value, side=side))
+
+    def locate(self, date, side='right'):
+        """Nombre de bougies jusqu'à `date` incluse (side='left': antérieures à `date`)"""
+        with self._file_lock(shared=True):
+            return self._position(self._dates(len(self)), date, side=side)
+
+    def load(self, n_rows=None, end=None):
+        """Retourne les `n_rows` dernières bougies (jusqu'à `end` incluse) en DataFrame"""
+        with self._file_lock(shared=True):
+            rows = len(self)
+            dates = self._dates(rows)
+            stop = rows
+            if end is not None:
+                stop = self._position(dates, end)
+            start = 0 if n_rows is None else max(0, stop - n_rows)
+
+            index = pd.DatetimeIndex(np.asarray(dates[start:stop]).astype('datetime64[ns]'), name='Date')
+            data = pd.DataFrame(
+                {column: np.array(self._column(column, np.float64, rows)[start:stop]) for column in OHLCV_COLUMNS},
+                index=index,
+            )
+            return data
@@ -0,0 +1,374 @@
+"""
+Fine-tuning incrémental du modèle déployé sur les nouvelles bougies
+
+Plutôt que de réentraîner le modèle depuis zéro (100 epochs dans le
+notebook), le modèle servi est repris tel quel (warm start) et entraîné
+quelques epochs sur les bougies arrivées depuis le dernier fine-tuning
+(complétées par les plus récentes déjà vues si elles sont trop peu
+nombreuses). Validation puis réentraînement: un premier candidat, entraîné
+sans les dernières bougies, doit avoir un MAPE à 1 jour sur ces bougies au
+moins aussi bon que le modèle en place; le modèle promu est alors
+réentraîné de la même façon depuis les poids déployés en incluant ces
+dernières bougies, pour que les nouvelles bougies soient toujours apprises,
+et n'est promu que s'il respecte le même seuil sur ces bougies.
+
+La promotion est atomique (os.replace dans le même dossier): le registre
+des modèles voit un nouveau mtime et recharge le modèle à chaud, les
+requêtes en cours gardent l'ancien. L'état (dernière bougie vue, dernière
+bougie entraînée, historique des exécutions) est conservé à côté du
+modèle dans `<modèle>.fine_tune.json`.
+
+Usage:
+    PYTHONPATH=app/backend python -m services.fine_tune --model app/models/model.h5 --store app/data/candles/BTC-USD --threads 1
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from services.backtest import FEATURES, load_history
+from services.candle_store import CandleStore, YFinanceSource
+from services.indicators import compute_indicators
+from services.model_registry import load_model_file
+from services.training import WindowedSamples, build_model, calculate_mape, keras_sequence, limit_threads
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Statuts d'une exécution
+PROMOTED, REJECTED, UP_TO_DATE = 'promoted', 'rejected', 'up_to_date'
+
+STATE_SUFFIX = '.fine_tune.json'
+# Dossier de travail (candidats, sauvegarde du modèle précédent), ignoré par la découverte des modèles
+STAGING_DIRECTORY = '.fine_tune'
+# Exécutions gardées dans l'état
+MAX_RUNS = 50
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ----------------------------------------------------------------------
+# Données et état
+# ----------------------------------------------------------------------
+def load_candles(csv_path=None, store_dir=None, rows=300):
+    """Les `rows` dernières bougies avec les 7 features, depuis un CSV, un store de bougies ou yfinance
+
+    Même fenêtre que le service (300 bougies avant le calcul des indicateurs)
+    pour que les scalers réajustés d'un .h5 soient ceux de l'inférence.
+    """
+    if csv_path is not None:
+        return load_history(csv_path).iloc[-rows:]
+    if store_dir is not None:
+        data = CandleStore(store_dir).load(n_rows=rows)
+    else:
+        data = YFinanceSource("BTC-USD").fetch(period=f"{rows}d")
+    return compute_indicators(data)[FEATURES].dropna()
+
+
+def state_path(model_path):
+    return model_path + STATE_SUFFIX
+
+
+def read_state(model_path):
+    path = state_path(model_path)
+    if not os.path.exists(path):
+        return {"runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def has_new_candles(model_path, last_date):
+    """Vrai si `last_date` (dernière bougie du store) est postérieure à la dernière exécution"""
+    last_candle = read_state(model_path).get("last_candle")
+    return last_date is not None and (last_candle is None or pd.Timestamp(last_date) > pd.Timestamp(last_candle))
+
+
+def _write_state(model_path, state):
+    tmp_path = state_path(model_path) + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path(model_path))
+
+
+@contextmanager
+def _run_lock(staging):
+    """Un seul fine-tuning à la fois par modèle (ex: un scheduler par worker gunicorn)"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(staging, '.lock'), 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError("Fine-tuning déjà en cours pour ce modèle")
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ----------------------------------------------------------------------
+# Modèle
+# ----------------------------------------------------------------------
+def _keras_model(entry, lookback):
+    """Modèle Keras entraînable initialisé avec les poids du modèle déployé"""
+    if entry.path.endswith('.h5'):
+        from keras.models import load_model
+        return load_model(entry.path, compile=False)
+
+    # Bundle: architecture reconstruite à partir des couches du moteur NumPy
+    layers = entry.model.layers
+    lstm_layers = [layer for layer in layers if layer["type"] == "lstm"]
+    dropout = next((layer["rate"] for layer in layers if layer["type"] == "dropout"), 0.0)
+    model = build_model(lookback, entry.model.input_dim, units=lstm_layers[0]["units"],
+                        n_layers=len(lstm_layers), dropout=dropout)
+    weights = []
+    for layer in layers:
+        if layer["type"] in ("lstm", "dense"):
+            weights.extend(layer[key] for key in ("kernel", "recurrent_kernel", "bias") if key in layer)
+    model.set_weights(weights)
+    return model
+
+
+def _save_candidate(model, entry, path, metadata):
+    if path.endswith('.npz'):
+        from services.model_bundle import save_bundle
+        save_bundle(path, model, entry.scaler_x, entry.scaler_y, entry.features,
+                    metadata={**entry.metadata, **metadata})
+    else:
+        model.save(path)
+
+
+def _warm_start(entry, samples, lookback, epochs, batch_size, learning_rate, seed):
+    """Modèle initialisé avec les poids déployés et entraîné quelques epochs à faible taux d'apprentissage"""
+    from keras.optimizers import Adam
+    model = _keras_model(entry, lookback)
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mean_squared_error')
+    model.fit(keras_sequence(samples, batch_size=batch_size, shuffle=True, seed=seed), epochs=epochs, verbose=0)
+    return model
+
+
+def holdout_mape(model, samples, scaler_y):
+    """MAPE à 1 jour (en prix) d'un modèle sur les échantillons gardés à part"""
+    windows, targets = samples.arrays()
+    predictions = np.asarray(model.predict(windows, verbose=0)).reshape(-1, 1)
+    return calculate_mape(scaler_y.inverse_transform(targets), scaler_y.inverse_transform(predictions))
+
+
+# ----------------------------------------------------------------------
+# Fine-tuning
+# ----------------------------------------------------------------------
+def fine_tune(model_path, data, epochs=5, batch_size=32, learning_rate=1e-4, holdout=14, min_samples=32,
+              tolerance=0.0, lookback=None, seed=0):
+    """Fine-tune le modèle `model_path` sur les nouvelles bougies de `data` et le promeut s'il ne régresse pas
+
+    `data`: bougies avec les features du modèle (ou OHLCV brut), triées
+    chronologiquement. L'entraînement porte sur les bougies postérieures au
+    dernier fine-tuning (au moins `min_samples` échantillons). Un candidat
+    entraîné sans les `holdout` dernières bougies est validé sur celles-ci:
+    s'il a un MAPE <= MAPE du modèle en place x (1 + `tolerance`), le modèle
+    est réentraîné depuis les poids déployés jusqu'à la dernière bougie, puis
+    promu si ce modèle réentraîné respecte le même seuil. Retourne le rapport
+    de l'exécution.
+    """
+    started = time.perf_counter()
+    staging = os.path.join(os.path.dirname(os.path.abspath(model_path)), STAGING_DIRECTORY)
+    os.makedirs(staging, exist_ok=True)
+
+    with _run_lock(staging):
+        entry = load_model_file(model_path, backend='numpy')
+        if entry.model.quantization != 'float32':
+            raise ValueError(f"Modèle quantifié ({entry.model.quantization}): fine-tuner le modèle float32 d'origine")
+
+        data = data.sort_index()
+        if any(feature not in data.columns for feature in entry.features):
+            data = compute_indicators(data)
+        data = data[entry.features].dropna()
+        state = read_state(model_path)
+        last_candle = data.index[-1]
+        report = {
+            "model": entry.name,
+            "last_candle": f"{last_candle:%Y-%m-%d}",
+            "holdout": holdout,
+        }
+        if state.get("last_candle") and pd.Timestamp(state["last_candle"]) >= last_candle:
+            logger.info(f"Fine-tuning de {entry.name}: aucune nouvelle bougie depuis le {state['last_candle']}")
+            return {**report, "status": UP_TO_DATE, "duration_seconds": round(time.perf_counter() - started, 2)}
+
+        # Scalers du service: figés (bundle) ou ajustés sur la fenêtre servie (.h5)
+        lookback = lookback or entry.metadata.get("window", 1)
+        scaler_x, scaler_y = entry.scalers_for(data)
+        X_scaled = scaler_x.transform(data.values).astype(np.float32)
+        y_scaled = scaler_y.transform(data['Close'].values.reshape(-1, 1)).astype(np.float32)
+
+        # Échantillon i: fenêtre finissant au jour i + lookback - 1, cible au jour i + lookback
+        n_samples = len(data) - lookback
+        holdout_start = n_samples - holdout
+        if holdout < 1 or holdout_start < 1:
+            raise ValueError(f"Données insuffisantes ({len(data)} bougies) pour {holdout} bougies de validation")
+        target_dates = data.index[lookback:]
+        trained_until = state.get("trained_until")
+        if trained_until is None:
+            first_new = 0
+        else:
+            first_new = int(np.searchsorted(target_dates.values, np.datetime64(pd.Timestamp(trained_until)),
+                                            side='right'))
+
+        # Validation: candidat entraîné sur les nouvelles bougies antérieures à la période de validation
+        # (complétées par les plus récentes déjà vues), évalué sur cette période
+        gate_start = max(0, min(first_new, holdout_start - min_samples))
+        train = WindowedSamples(X_scaled, y_scaled, lookback, start=gate_start, stop=holdout_start)
+        validation = WindowedSamples(X_scaled, y_scaled, lookback, start=holdout_start)
+        model = _warm_start(entry, train, lookback, epochs, batch_size, learning_rate, seed)
+
+        candidate_path = os.path.join(staging, f"candidate-{os.getpid()}{os.path.splitext(model_path)[1]}")
+        _save_candidate(model, entry, candidate_path, {})
+
+        # Les deux modèles évalués avec le moteur de service, le candidat tel que le registre le chargera
+        candidate = load_model_file(candidate_path, backend='numpy')
+        mape_before = holdout_mape(entry.model, validation, scaler_y)
+        mape_after = holdout_mape(candidate.model, validation, scaler_y)
+        os.remove(candidate_path)
+        report.update({
+            "new_candles": int((data.index > pd.Timestamp(state["last_candle"])).sum()) if state.get("last_candle")
+            else len(data),
+            "train_samples": len(train),
+            "epochs": epochs,
+            "holdout_mape_before": round(mape_before, 4),
+            "holdout_mape_after": round(mape_after, 4),
+        })
+
+        promoted = bool(np.isfinite(mape_after)) and mape_after <= mape_before * (1 + tolerance)
+        if promoted:
+            # Réentraînement depuis les poids déployés, nouvelles bougies de la période de validation comprises
+            refit_start = max(0, min(first_new, n_samples - min_samples))
+            refit = WindowedSamples(X_scaled, y_scaled, lookback, start=refit_start)
+            logger.info(f"Candidat validé, réentraînement sur {len(refit)} échantillons jusqu'à la dernière bougie")
+            model = _warm_start(entry, refit, lookback, epochs, batch_size, learning_rate, seed)
+            trained_until = target_dates[-1]
+            _save_candidate(model, entry, candidate_path, {
+                "trained_until": f"{trained_until:%Y-%m-%d}",
+                "fine_tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+            # Le modèle promu est celui du réentraînement: même seuil sur la période de validation
+            mape_refit = holdout_mape(load_model_file(candidate_path, backend='numpy').model, validation, scaler_y)
+            report.update({"refit_samples": len(refit), "holdout_mape_refit": round(mape_refit, 4)})
+            if not (np.isfinite(mape_refit) and mape_refit <= mape_before * (1 + tolerance)):
+                promoted = False
+                report["reason"] = "réentraînement en régression sur la période de validation"
+                os.remove(candidate_path)
+        if promoted and os.path.getmtime(model_path) != entry.mtime:
+            # Modèle redéployé pendant l'exécution: on ne l'écrase pas
+            promoted = False
+            report["reason"] = "modèle remplacé pendant le fine-tuning"
+            os.remove(candidate_path)
+        if promoted:
+            # Sauvegarde du modèle en place puis remplacement atomique (rechargement à chaud par le registre)
+            shutil.copy2(model_path, os.path.join(staging, os.path.basename(model_path) + '.previous'))
+            os.replace(candidate_path, model_path)
+            state["trained_until"] = f"{trained_until:%Y-%m-%d}"
+
+        report["status"] = PROMOTED if promoted else REJECTED
+        report["trained_until"] = state.get("trained_until")
+        report["duration_seconds"] = round(time.perf_counter() - started, 2)
+        state["last_candle"] = report["last_candle"]
+        state["runs"] = (state.get("runs", []) + [{**report, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}])[-MAX_RUNS:]
+        _write_state(model_path, state)
+
+    logger.info(f"Fine-tuning de {entry.name} {'promu' if promoted else 'rejeté'}: MAPE validation "
+                f"{mape_before:.2f}% -> {mape_after:.2f}% ({len(train)} échantillons, "
+                f"{report['duration_seconds']}s)")
+    return report
+
+
+# ----------------------------------------------------------------------
+# Exécution en arrière-plan
+# ----------------------------------------------------------------------
+def limit_cpu(threads, niceness=0):
+    """Processus à faible priorité, limité à `threads` cœurs (avant l'import de TensorFlow)"""
+    if niceness:
+        os.nice(niceness)
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, cpus[-threads:])
+    limit_threads(threads)
+
+
+def start_background(model_path, csv_path=None, store_dir=None, rows=300, threads=1, niceness=10, **options):
+    """Lance le fine-tuning dans un processus séparé (CPU limité) et retourne un Future du rapport
+
+    Le processus du service n'est pas bloqué: TensorFlow tourne dans un
+    processus `python -m services.fine_tune` limité à `threads` cœurs et de
+    priorité réduite, qui se termine avec le fine-tuning. `options`:
+    paramètres de la ligne de commande (epochs, holdout, tolerance...).
+    """
+    command = [sys.executable, '-m', 'services.fine_tune', '--model', os.path.abspath(model_path),
+               '--rows', str(rows), '--threads', str(threads), '--niceness', str(niceness)]
+    if csv_path is not None:
+        command += ['--csv', os.path.abspath(csv_path)]
+    if store_dir is not None:
+        command += ['--store', os.path.abspath(store_dir)]
+    for name, value in options.items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True)
+
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def wait():
+        stdout, stderr = process.communicate()
+        if process.returncode == 0:
+            future.set_result(json.loads(stdout))
+        else:
+            error = stderr.strip().splitlines()[-1] if stderr.strip() else f"code de sortie {process.returncode}"
+            future.set_exception(RuntimeError(f"Fine-tuning échoué: {error}"))
+
+    threading.Thread(target=wait, name="fine-tune", daemon=True).start()
+    return future
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tuning incrémental du modèle déployé")
+    parser.add_argument('--model', default='app/models/model.h5', help="Modèle servi (.h5 ou bundle .npz)")
+    parser.add_argument('--csv', default=None, help="Historique local (ex: market_data.csv)")
+    parser.add_argument('--store', default=None, help="Store de bougies du service (ex: app/data/candles/BTC-USD)")
+    parser.add_argument('--rows', type=int, default=300, help="Bougies lues (fenêtre du service)")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--holdout', type=int, default=14, help="Dernières bougies gardées pour la validation")
+    parser.add_argument('--min-samples', type=int, default=32, help="Échantillons d'entraînement minimum")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="Régression relative du MAPE tolérée")
+    parser.add_argument('--threads', type=int, default=1, help="Cœurs CPU utilisés")
+    parser.add_argument('--niceness', type=int, default=0, help="Priorité réduite du processus (nice)")
+    args = parser.parse_args()
+
+    limit_cpu(args.threads, args.niceness)
+    data = load_candles(csv_path=args.csv, store_dir=args.store, rows=args.rows)
+    report = fine_tune(args.model, data, epochs=args.epochs, batch_size=args.batch_size,
+                       learning_rate=args.learning_rate, holdout=args.holdout, min_samples=args.min_samples,
+                       tolerance=args.tolerance)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
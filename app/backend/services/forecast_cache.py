@@ -0,0 +1,116 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from services.metrics import CACHE_REQUESTS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _InFlight:
+    """Calcul en cours partagé par toutes les requêtes identiques"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ForecastCache:
+    """Cache LRU avec TTL des prédictions, avec coalescence des calculs concurrents (single-flight)
+
+    Les requêtes identiques qui arrivent pendant qu'une prédiction est en
+    cours de calcul attendent ce calcul au lieu d'en lancer un nouveau.
+    """
+
+    def __init__(self, maxsize=32, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """Retourne la valeur en cache (ou None si absente/expirée)"""
+        with self._lock:
+            entry = self._get_fresh(key, time.monotonic())
+            return None if entry is None else entry[1]
+
+    def set(self, key, value):
+        """Ajoute une valeur au cache en évinçant les entrées les moins récemment utilisées"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, cache_if=None):
+        """Retourne la valeur en cache ou la calcule une seule fois pour tous les appelants concurrents
+
+        `cache_if(value)` permet de ne pas mettre en cache certains résultats (ex: erreurs).
+        """
+        with self._lock:
+            entry = self._get_fresh(key, time.monotonic())
+            if entry is not None:
+                self.hits += 1
+                CACHE_REQUESTS.labels(result="hit").inc()
+                return entry[1]
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                self.misses += 1
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+        CACHE_REQUESTS.labels(result="miss" if leader else "coalesced").inc()
+
+        if not leader:
+            # Un calcul identique est déjà en cours: on attend son résultat
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.result
+
+        try:
+            inflight.result = compute()
+            if cache_if is None or cache_if(inflight.result):
+                self.set(key, inflight.result)
+            return inflight.result
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.done.set()
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Statistiques du cache"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
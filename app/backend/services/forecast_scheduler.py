@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+import time
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus, chaque processus est leader
+    fcntl = None
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+
+class ForecastScheduler:
+    """Précalcul des prévisions après chaque clôture de bougie journalière
+
+    Un thread recalcule chaque prévision configurée (horizon, modèle) peu après
+    la clôture de la bougie journalière (minuit UTC + `close_delay`), puis la
+    publie de façon atomique. Les requêtes lisent la dernière prévision publiée;
+    si elle date d'avant la dernière clôture, elle est servie quand même et un
+    recalcul est demandé en arrière-plan (stale-while-revalidate). Chaque
+    prévision garde l'identité du modèle qui l'a calculée: après un
+    rechargement à chaud (fine-tuning promu), elle n'est plus servie.
+    `after_refresh` est appelé après chaque recalcul réussi (ex: lancement du
+    fine-tuning incrémental sur la nouvelle bougie).
+
+    Avec `shared_dir` (workers gunicorn partageant le même store), un seul
+    processus est élu par un verrou flock sur ce dossier: lui seul met à jour
+    le store, recalcule et lance `after_refresh`, et il écrit ses prévisions
+    dans `shared_dir/forecasts.json`. Les autres processus servent ce fichier
+    et retentent l'élection toutes les `retry_delay` secondes (leader arrêté).
+    """
+
+    def __init__(self, service, jobs=((30, None),), close_delay=300, retry_delay=60, clock=time.time,
+                 after_refresh=None, shared_dir=None):
+        self.service = service
+        # Prévisions précalculées: (n_days, model_name), model_name=None pour le modèle par défaut
+        self.jobs = [tuple(job) for job in jobs]
+        self.close_delay = close_delay
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.after_refresh = after_refresh
+        self.shared_dir = shared_dir
+        self._leader_file = None
+        self._leader_pid = None
+        self._shared_mtime = None
+        self._published = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._refreshing = False
+        self._last_refresh_request = None
+        self._thread = None
+        self._pid = None
+        self.refreshes = 0
+        self.failures = 0
+
+    # ------------------------------------------------------------------
+    # Calendrier
+    # ------------------------------------------------------------------
+    def last_run_time(self, now=None):
+        """Dernier instant de recalcul prévu (clôture journalière UTC + close_delay) avant `now`"""
+        now = self.clock() if now is None else now
+        run = (now - self.close_delay) // DAY_SECONDS * DAY_SECONDS + self.close_delay
+        return run
+
+    def seconds_until_next_run(self, now=None):
+        now = self.clock() if now is None else now
+        return self.last_run_time(now) + DAY_SECONDS - now
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+    def ensure_started(self):
+        """Démarre le thread s'il ne tourne pas dans ce processus (les threads ne survivent pas au fork)"""
+        with self._lock:
+            if self._stopped or (self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()):
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="forecast-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def is_leader(self):
+        """Vrai si ce processus est le seul à recalculer (verrou flock non bloquant sur shared_dir)"""
+        if self.shared_dir is None or fcntl is None:
+            return True
+        if self._leader_pid == os.getpid():
+            return True
+        os.makedirs(self.shared_dir, exist_ok=True)
+        f = open(os.path.join(self.shared_dir, '.scheduler.lock'), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # Le descripteur reste ouvert: le verrou est libéré à la fin du processus
+        self._leader_file = f
+        self._leader_pid = os.getpid()
+        logger.info(f"Scheduler élu dans le processus {self._leader_pid}")
+        return True
+
+    def _run(self):
+        # Recalcul immédiat au démarrage, puis après chaque clôture
+        delay = 0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopped:
+                return
+            if not self.is_leader():
+                # Un autre processus recalcule: relecture de ses prévisions, nouvelle élection plus tard
+                self._load_shared()
+                delay = max(self.retry_delay, 1)
+                continue
+            ok = self.refresh()
+            delay = self.seconds_until_next_run() if ok else self.retry_delay
+
+    # ------------------------------------------------------------------
+    # Calcul et publication
+    # ------------------------------------------------------------------
+    def refresh(self):
+        """Recalcule toutes les prévisions configurées; une prévision en échec garde sa version publiée"""
+        self._refreshing = True
+        try:
+            # Bougie de clôture récupérée sans attendre l'intervalle minimal du store
+            # (historique court complété comme pour une requête; un échec garde les données locales)
+            self.service.refresh_store(force=True)
+
+            ok = True
+            for n_days, model_name in self.jobs:
+                started = time.perf_counter()
+                try:
+                    entry = self.service.resolve_model(model_name)
+                except Exception as e:
+                    entry, result = None, {"success": False, "error": str(e)}
+                if entry is not None:
+                    result = self.service.generate_prediction(n_days=n_days, model_name=model_name, entry=entry)
+                if not result["success"]:
+                    ok = False
+                    self.failures += 1
+                    logger.warning(f"Précalcul {n_days}j ({model_name or 'défaut'}) échoué, "
+                                   f"version précédente conservée: {result['error']}")
+                    continue
+                self.publish((n_days, model_name), result, entry.identity)
+                logger.info(f"Prévision {n_days}j ({model_name or 'défaut'}) publiée "
+                            f"en {time.perf_counter() - started:.2f}s")
+            self.refreshes += 1
+            if ok and self.after_refresh is not None:
+                try:
+                    self.after_refresh()
+                except Exception as e:
+                    logger.warning(f"Tâche après précalcul échouée: {e}")
+            return ok
+        finally:
+            self._refreshing = False
+
+    def publish(self, key, result, identity=None):
+        """Publication atomique: les lecteurs voient l'ancien ou le nouveau dictionnaire, jamais un état partiel"""
+        entry = {"result": result, "computed_at": self.clock(),
+                 "identity": list(identity) if identity is not None else None}
+        with self._lock:
+            published = dict(self._published)
+            published[key] = entry
+            self._published = published
+        if self.shared_dir is not None:
+            self._write_shared(published)
+
+    def _shared_path(self):
+        return os.path.join(self.shared_dir, 'forecasts.json')
+
+    def _write_shared(self, published):
+        """Écriture atomique (fichier temporaire puis os.replace) des prévisions pour les autres processus"""
+        path = self._shared_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump([[n_days, model_name, entry] for (n_days, model_name), entry in published.items()], f)
+        os.replace(tmp_path, path)
+
+    def _load_shared(self):
+        """Prévisions publiées par le processus leader (relues seulement si le fichier a changé)"""
+        try:
+            mtime = os.stat(self._shared_path()).st_mtime_ns
+            if mtime == self._shared_mtime:
+                return
+            with open(self._shared_path()) as f:
+                published = {(n_days, model_name): entry for n_days, model_name, entry in json.load(f)}
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._published = published
+            self._shared_mtime = mtime
+
+    def request_refresh(self):
+        """Demande un recalcul en arrière-plan (au plus un par retry_delay)"""
+        now = self.clock()
+        with self._lock:
+            if self._refreshing or (self._last_refresh_request is not None
+                                    and now - self._last_refresh_request < self.retry_delay):
+                return False
+            self._last_refresh_request = now
+        self._wake.set()
+        return True
+
+    def get(self, n_days=30, model_name=None, identity=None):
+        """Dernière prévision publiée (ou None si cette prévision n'est pas précalculée)
+
+        Le résultat est enrichi de l'âge de la prévision et d'un indicateur
+        `stale` (calculée avant la dernière clôture); une prévision périmée
+        déclenche un recalcul en arrière-plan. Avec `identity` (modèle servi
+        actuellement), une prévision calculée par une autre version du modèle
+        n'est pas retournée (None, recalcul demandé).
+        """
+        self.ensure_started()
+        if self.shared_dir is not None and self._leader_pid != os.getpid():
+            self._load_shared()
+        entry = self._published.get((n_days, model_name))
+        if entry is None:
+            return None
+        if identity is not None and entry.get("identity") != list(identity):
+            self.request_refresh()
+            return None
+
+        now = self.clock()
+        stale = entry["computed_at"] < self.last_run_time(now)
+        if stale:
+            self.request_refresh()
+        return {
+            **entry["result"],
+            "computed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["computed_at"])),
+            "data_age_seconds": round(now - entry["computed_at"], 1),
+            "stale": stale,
+        }
+
+    def status(self):
+        now = self.clock()
+        published = self._published
+        return {
+            "running": self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+            "leader": self.shared_dir is None or self._leader_pid == os.getpid(),
+            "jobs": [{"days": n_days, "model": model_name} for n_days, model_name in self.jobs],
+            "published": [
+                {"days": n_days, "model": model_name, "data_age_seconds": round(now - entry["computed_at"], 1)}
+                for (n_days, model_name), entry in published.items()
+            ],
+            "next_run_in_seconds": round(self.seconds_until_next_run(now), 1),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,114 @@
+"""
+Cache HTTP des réponses de l'API: ETag / Last-Modified, requêtes conditionnelles et compression
+
+Une prévision ne dépend que du modèle (nom, fichier, version), de la
+dernière bougie et des paramètres de la requête: son ETag est calculé à
+partir de ces éléments, sans exécuter le pipeline, ce qui permet de
+répondre 304 aux clients qui ont déjà la bonne version.
+"""
+
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle: json de la bibliothèque standard
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle: gzip uniquement
+    brotli = None
+
+# Taille minimale d'un corps compressé (en deçà, le gain ne couvre pas le coût)
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def forecast_etag(identity, last_candle_date, *params):
+    """ETag d'une prévision: identité du modèle, dernière bougie et paramètres de la requête"""
+    key = repr((tuple(identity), str(last_candle_date), params))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def last_modified_for(model_mtime, last_candle_date):
+    """Dernière modification: fichier du modèle ou dernière bougie, selon le plus récent"""
+    # "2024-01-31" (journalier) ou "2024-01-31 13:00" (intraday, UTC)
+    candle = datetime.fromisoformat(str(last_candle_date)).replace(tzinfo=timezone.utc)
+    model = datetime.fromtimestamp(model_mtime, tz=timezone.utc)
+    return max(candle, model).replace(microsecond=0)
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Vrai si la version du client est à jour (If-None-Match prioritaire sur If-Modified-Since)"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def tag_response(response, etag, last_modified=None, max_age=60):
+    """Ajoute ETag (faible: le corps compressé ou l'âge de la prévision peuvent varier), Last-Modified et Cache-Control"""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response
+
+
+def choose_encoding(accept_encoding):
+    """Encodage préféré parmi ceux acceptés par le client (br si disponible, sinon gzip)"""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding, min_size=MIN_COMPRESS_SIZE, level=6):
+    """Compresse le corps d'une réponse complète (les réponses diffusées ne sont pas modifiées)"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    body = response.get_data()
+    if encoding is None or len(body) < min_size:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=min(level, 11))
+    else:
+        body = gzip.compress(body, compresslevel=level)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Sérialisation JSON par orjson si disponible (mêmes types acceptés que le provider Flask)"""
+
+    def dumps(self, obj, **kwargs):
+        # jsonify passe separators (sortie compacte) ou indent=2 (mode debug), tous deux gérés par orjson
+        if orjson is None or set(kwargs) - {'indent', 'separators'} or kwargs.get('indent') not in (None, 2):
+            return super().dumps(obj, **kwargs)
+        indent = kwargs.get('indent')
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
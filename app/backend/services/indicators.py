@@ -0,0 +1,215 @@
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+MA_WINDOW = 200
+RSI_WINDOW = 14
+# Bougies à lire avant une fenêtre pour que ses indicateurs soient ceux de l'historique complet
+INDICATOR_WARMUP = max(MA_WINDOW - 1, RSI_WINDOW)
+
+
+def calculate_rsi(prices, window=14):
+    """Calcule le RSI (Relative Strength Index)"""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+
+def _rsi_from_means(mean_gain, mean_loss):
+    """RSI à partir des moyennes de gains/pertes (mêmes cas limites que pandas: inf -> 100, 0/0 -> NaN)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.divide(mean_gain, mean_loss)
+        return 100 - (100 / (1 + rs))
+
+
+def _rolling_sum(values, window):
+    """Somme glissante sur des vues (sans copie des fenêtres), complétée par des zéros au début"""
+    padded = np.concatenate([np.zeros(window - 1), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window).sum(axis=1)
+
+
+def moving_average_batch(closes, window=MA_WINDOW):
+    """Moyenne mobile (équivalente à rolling(window, min_periods=1).mean()) en NumPy"""
+    closes = np.asarray(closes, dtype=np.float64)
+    counts = np.minimum(np.arange(1, len(closes) + 1), window)
+    return _rolling_sum(closes, window) / counts
+
+
+def rsi_batch(closes, window=RSI_WINDOW):
+    """RSI (équivalent à calculate_rsi) en NumPy, pour le remplissage d'historiques longs"""
+    closes = np.asarray(closes, dtype=np.float64)
+    delta = np.diff(closes, prepend=np.nan)
+    # Comme delta.where(...): le premier delta (NaN) compte comme un gain/une perte nulle
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    rsi = _rsi_from_means(_rolling_sum(gains, window) / window, _rolling_sum(losses, window) / window)
+    rsi[:window - 1] = np.nan
+    return rsi
+
+
+def compute_indicators(data, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+    """Ajoute MM_200 et RSI_14 à un DataFrame de bougies (calcul vectorisé NumPy)"""
+    data = data.copy()
+    closes = data['Close'].to_numpy(dtype=np.float64)
+    data['MM_200'] = moving_average_batch(closes, ma_window)
+    data['RSI_14'] = rsi_batch(closes, rsi_window)
+    return data
+
+
+class _RunningWindow:
+    """Fenêtre glissante (buffer circulaire) avec somme courante mise à jour en O(1)
+
+    La somme est recalculée exactement toutes les `window` mises à jour pour
+    éviter la dérive de l'arrondi flottant (coût amorti O(1)).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = np.zeros(window, dtype=np.float64)
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value):
+        old = self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.window
+        if self.count < self.window:
+            self.count += 1
+            self.total += value
+        else:
+            self.total += value - old
+        if self.position == 0:
+            self.total = float(self.values[:self.count].sum())
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+
+class IndicatorEngine:
+    """Moteur d'indicateurs incrémental: MM_200 et RSI_14 mis à jour en temps constant par bougie
+
+    Donne les mêmes valeurs que le calcul pandas (`rolling(200, min_periods=1)`
+    et `calculate_rsi`) sur la même suite de clôtures.
+    """
+
+    def __init__(self, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+        self.ma_window = ma_window
+        self.rsi_window = rsi_window
+        self.reset()
+
+    def reset(self):
+        """Réinitialise l'état du moteur"""
+        self._closes = _RunningWindow(self.ma_window)
+        self._gains = _RunningWindow(self.rsi_window)
+        self._losses = _RunningWindow(self.rsi_window)
+        self.last_close = None
+
+    def update(self, close):
+        """Ajoute une clôture et retourne (MM_200, RSI_14)"""
+        close = float(close)
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        self.last_close = close
+
+        self._closes.push(close)
+        self._gains.push(delta if delta > 0 else 0.0)
+        self._losses.push(-delta if delta < 0 else 0.0)
+        return self.values()
+
+    def peek(self, close):
+        """(MM_200, RSI_14) après une clôture de plus, sans modifier l'état du moteur"""
+        return copy.deepcopy(self).update(close)
+
+    def values(self):
+        """Valeurs courantes (MM_200, RSI_14); RSI_14 vaut NaN tant que la fenêtre n'est pas pleine"""
+        rsi = np.nan
+        if self._gains.count == self.rsi_window:
+            rsi = float(_rsi_from_means(self._gains.mean(), self._losses.mean()))
+        return self._closes.mean(), rsi
+
+    def backfill(self, closes):
+        """Calcule les indicateurs sur un historique (mode batch NumPy) et positionne l'état du moteur"""
+        closes = np.asarray(closes, dtype=np.float64)
+        result = pd.DataFrame({
+            'MM_200': moving_average_batch(closes, self.ma_window),
+            'RSI_14': rsi_batch(closes, self.rsi_window),
+        })
+        # Seules les dernières clôtures sont nécessaires pour poursuivre en incrémental
+        tail = closes[-(max(self.ma_window, self.rsi_window) + 1):]
+        self.reset()
+        for close in tail:
+            self.update(close)
+        return result
+
+
+class StoreIndicators:
+    """Indicateurs des dernières bougies d'un store local, tenus à jour par un IndicatorEngine
+
+    Démarrage à froid (ou historique réécrit, ex: backfill vers le passé):
+    calcul batch sur les `rows` dernières bougies précédées de
+    INDICATOR_WARMUP bougies, soit les valeurs de l'historique complet.
+    Ensuite seules les bougies ajoutées depuis l'appel précédent passent
+    dans le moteur. La dernière bougie, encore réécrite par les mises à jour
+    du store, est évaluée sur une copie de l'état (`peek`).
+    """
+
+    def __init__(self, rows, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+        self.rows = rows
+        self.warmup = max(ma_window - 1, rsi_window)
+        self.engine = IndicatorEngine(ma_window, rsi_window)
+        self.cold_starts = 0
+        self._lock = threading.Lock()
+        self._first_date = None
+        # MM_200 / RSI_14 des bougies passées dans le moteur (jusqu'à l'avant-dernière), indexés par date
+        self._values = None
+
+    def _in_sync(self, data, first_date):
+        if self._values is None or first_date != self._first_date:
+            return False
+        last = self._values.index[-1]
+        return last in data.index[:-1] and data.at[last, 'Close'] == self.engine.last_close
+
+    def _cold_start(self, store, first_date):
+        """Calcul batch avec chauffe, puis moteur positionné sur l'avant-dernière bougie"""
+        data = store.load(n_rows=self.rows + self.warmup)
+        values = self.engine.backfill(data['Close'].to_numpy(dtype=np.float64)[:-1])
+        values.index = data.index[:-1]
+        self._values = values.iloc[-self.rows:]
+        self._first_date = first_date
+        self.cold_starts += 1
+        return data.iloc[-self.rows:]
+
+    def _append(self, data):
+        """Passe dans le moteur les bougies confirmées depuis l'appel précédent (O(1) chacune)"""
+        start = data.index.get_loc(self._values.index[-1]) + 1
+        added = data.iloc[start:-1]
+        if len(added):
+            updates = pd.DataFrame([self.engine.update(close) for close in added['Close']],
+                                   columns=['MM_200', 'RSI_14'], index=added.index)
+            self._values = pd.concat([self._values, updates]).iloc[-self.rows:]
+
+    def load(self, store):
+        """Les `rows` dernières bougies du store avec MM_200 et RSI_14 (valeurs de l'historique complet)"""
+        with self._lock:
+            first_date = store.first_date()
+            data = store.load(n_rows=self.rows)
+            if len(data) < 2:
+                # Store vide ou d'une seule bougie: rien à conserver dans le moteur
+                self._values = None
+                return compute_indicators(data) if len(data) else data
+            if self._in_sync(data, first_date):
+                self._append(data)
+            else:
+                data = self._cold_start(store, first_date)
+
+            data = data.copy()
+            values = self._values.reindex(data.index[:-1])
+            data['MM_200'] = np.append(values['MM_200'].to_numpy(), np.nan)
+            data['RSI_14'] = np.append(values['RSI_14'].to_numpy(), np.nan)
+            data.loc[data.index[-1], ['MM_200', 'RSI_14']] = self.engine.peek(data['Close'].iloc[-1])
+            return data
@@ -0,0 +1,300 @@
+"""
+Historique intraday: récupération par tranches concurrentes et agrégation en flux
+
+yfinance limite la durée couverte par une requête intraday (7 jours en 1m,
+60 jours d'historique en 5m...). L'historique est donc découpé en tranches
+de dates récupérées en parallèle; chaque tranche est agrégée à la résolution
+du modèle (5m, 1h, 1d...) dès son arrivée, dans l'ordre chronologique. Seule
+la dernière bougie incomplète est gardée d'une tranche à l'autre: la mémoire
+dépend de la taille d'une tranche, pas de la longueur de l'historique.
+
+Les 7 features du modèle rolling sont calculées de la même façon à toute
+résolution (`FeatureStream`): MM_200 et RSI_14 portent sur les 200 et 14
+dernières bougies, en ne gardant que ces clôtures entre deux tranches.
+
+Usage:
+    PYTHONPATH=app/backend python -m services.intraday BTC-USD --resolution 1h --period 60d --output btc_1h.csv
+"""
+
+import argparse
+import logging
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from services.candle_store import OHLCV_COLUMNS, RESOLUTIONS, _normalize_index, resolution_step
+from services.indicators import MA_WINDOW, RSI_WINDOW, moving_average_batch, rsi_batch
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = OHLCV_COLUMNS + ['MM_200', 'RSI_14']
+
+# Limites yfinance par intervalle: (durée maximale d'une requête, ancienneté maximale des données)
+INTERVAL_LIMITS = {
+    '1m': (pd.Timedelta(days=7), pd.Timedelta(days=30)),
+    '5m': (pd.Timedelta(days=60), pd.Timedelta(days=60)),
+    '15m': (pd.Timedelta(days=60), pd.Timedelta(days=60)),
+    '30m': (pd.Timedelta(days=60), pd.Timedelta(days=60)),
+    '1h': (pd.Timedelta(days=730), pd.Timedelta(days=730)),
+    '1d': (pd.Timedelta(days=3650), None),
+}
+
+# Intervalle source par défaut de chaque résolution
+DEFAULT_INTERVALS = {'5m': '5m', '15m': '15m', '1h': '1h', '4h': '1h', '1d': '1h'}
+
+# Durée d'une tranche par défaut: plusieurs tranches par fenêtre, récupérées en parallèle
+DEFAULT_CHUNK_SPANS = {
+    '1m': pd.Timedelta(days=2),
+    '5m': pd.Timedelta(days=7),
+    '15m': pd.Timedelta(days=15),
+    '30m': pd.Timedelta(days=30),
+    '1h': pd.Timedelta(days=60),
+    '1d': pd.Timedelta(days=365),
+}
+
+
+def period_offset(period):
+    """Durée d'une période au format yfinance ('12h', '300d', '6mo', '1y') en DateOffset"""
+    for suffix, unit in (('mo', 'months'), ('h', 'hours'), ('d', 'days'), ('y', 'years')):
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Période invalide: {period}")
+
+
+def history_period(rows, resolution='1d'):
+    """Période yfinance ('300d') couvrant `rows` bougies à cette résolution"""
+    if resolution == '1d':
+        return f"{rows}d"
+    # +1 jour: la bougie en cours et les trous éventuels de cotation
+    return f"{math.ceil(rows * resolution_step(resolution) / pd.Timedelta(days=1)) + 1}d"
+
+
+def date_chunks(start, end, span):
+    """Tranches [début, fin) consécutives couvrant [start, end), de durée `span` au plus"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    while start < end:
+        stop = min(start + span, end)
+        yield start, stop
+        start = stop
+
+
+def resample_ohlcv(data, resolution):
+    """Agrège des bougies OHLCV à une résolution plus grossière (Open premier, Close dernier...)"""
+    if data.empty:
+        return data[OHLCV_COLUMNS]
+    labels = _normalize_index(data.index, resolution)
+    grouped = data[OHLCV_COLUMNS].groupby(labels)
+    result = pd.DataFrame({
+        'Close': grouped['Close'].last(),
+        'Open': grouped['Open'].first(),
+        'High': grouped['High'].max(),
+        'Low': grouped['Low'].min(),
+        'Volume': grouped['Volume'].sum(),
+    })
+    result.index.name = 'Date'
+    return result
+
+
+class StreamingResampler:
+    """Agrégation en flux de tranches chronologiques de bougies fines
+
+    `push` retourne les bougies agrégées complètes; les lignes de la dernière
+    bougie (peut-être incomplète) sont gardées jusqu'à la tranche suivante,
+    `flush` la retourne en fin de flux.
+    """
+
+    def __init__(self, resolution):
+        resolution_step(resolution)
+        self.resolution = resolution
+        self._pending = None
+        self._emitted_until = None
+
+    def push(self, chunk):
+        if chunk is None or chunk.empty:
+            return resample_ohlcv(pd.DataFrame(columns=OHLCV_COLUMNS), self.resolution)
+        chunk = chunk[OHLCV_COLUMNS]
+        if self._pending is not None:
+            chunk = pd.concat([self._pending, chunk])
+        # Tranches contiguës: le recouvrement aux bornes est dédoublonné
+        chunk = chunk[~chunk.index.duplicated(keep='last')].sort_index()
+
+        labels = _normalize_index(chunk.index, self.resolution)
+        if self._emitted_until is not None:
+            # Bougie déjà émise: lignes en retard ignorées
+            chunk, labels = chunk[labels > self._emitted_until], labels[labels > self._emitted_until]
+        if chunk.empty:
+            self._pending = None
+            return resample_ohlcv(chunk, self.resolution)
+
+        complete = labels < labels[-1]
+        self._pending = chunk[~complete]
+        bars = resample_ohlcv(chunk[complete], self.resolution)
+        if len(bars):
+            self._emitted_until = bars.index[-1]
+        return bars
+
+    def flush(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return resample_ohlcv(pd.DataFrame(columns=OHLCV_COLUMNS), self.resolution)
+        bars = resample_ohlcv(pending, self.resolution)
+        self._emitted_until = bars.index[-1]
+        return bars
+
+
+class FeatureStream:
+    """Calcul en flux des 7 features (OHLCV, MM_200, RSI_14) sur des bougies chronologiques
+
+    Chaque lot est traité en NumPy vectorisé avec les dernières clôtures du
+    lot précédent: mêmes valeurs que `compute_indicators` sur la série
+    complète, en ne gardant que max(200, 15) clôtures entre deux lots.
+    """
+
+    def __init__(self, ma_window=MA_WINDOW, rsi_window=RSI_WINDOW):
+        self.ma_window = ma_window
+        self.rsi_window = rsi_window
+        self.tail_size = max(ma_window, rsi_window + 1)
+        self._tail = np.empty(0, dtype=np.float64)
+
+    def push(self, bars):
+        """Features des bougies `bars` (RSI_14 vaut NaN sur les premières bougies du flux)"""
+        closes = bars['Close'].to_numpy(dtype=np.float64)
+        history = np.concatenate([self._tail, closes])
+        offset = len(self._tail)
+        features = bars[OHLCV_COLUMNS].copy()
+        features['MM_200'] = moving_average_batch(history, self.ma_window)[offset:]
+        features['RSI_14'] = rsi_batch(history, self.rsi_window)[offset:]
+        self._tail = history[-self.tail_size:]
+        return features[FEATURE_COLUMNS]
+
+
+class IntradayYFinanceSource:
+    """Source de bougies intraday yfinance, agrégées à `resolution`
+
+    Même interface que `YFinanceSource` (fetch(start, period)), utilisable
+    par un `CandleStore` de même résolution. Les tranches sont récupérées
+    par `workers` threads, au plus `workers` tranches en vol à la fois.
+    """
+
+    def __init__(self, ticker="BTC-USD", resolution="1h", interval=None, chunk_span=None, workers=4,
+                 fetch_chunk=None, clock=None):
+        resolution_step(resolution)
+        self.ticker = ticker
+        self.resolution = resolution
+        self.interval = interval or DEFAULT_INTERVALS[resolution]
+        if self.interval not in INTERVAL_LIMITS:
+            raise ValueError(f"Intervalle inconnu: {self.interval} (choix: {', '.join(INTERVAL_LIMITS)})")
+        max_span, self.max_lookback = INTERVAL_LIMITS[self.interval]
+        self.chunk_span = min(chunk_span or DEFAULT_CHUNK_SPANS[self.interval], max_span)
+        self.workers = workers
+        # Récupération d'une tranche (injectable pour les tests): (start, end) -> DataFrame OHLCV
+        self.fetch_chunk = fetch_chunk or self._yfinance_chunk
+        self.clock = clock or (lambda: pd.Timestamp(datetime.now(timezone.utc)).tz_localize(None))
+
+    def _yfinance_chunk(self, start, end):
+        import yfinance as yf
+
+        data = yf.Ticker(self.ticker).history(start=start, end=end, interval=self.interval)
+        if data.empty:
+            return data
+        data = data[OHLCV_COLUMNS].copy()
+        index = pd.DatetimeIndex(data.index)
+        data.index = index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index
+        return data
+
+    def _fetch_logged(self, start, end):
+        try:
+            return self.fetch_chunk(start, end)
+        except Exception as e:
+            logger.warning(f"Tranche {start} -> {end} de {self.ticker} ({self.interval}) impossible, "
+                           f"tranches suivantes ignorées: {e}")
+            return None
+
+    def iter_bars(self, start, end=None):
+        """Bougies agrégées de [start, end), par lots chronologiques, au fil des tranches récupérées
+
+        Les bougies s'arrêtent à la première tranche en échec: seul un préfixe
+        contigu est livré, et un store mis à jour reprend ensuite à partir de
+        sa dernière bougie au lieu de garder un trou.
+        """
+        end = pd.Timestamp(end) if end is not None else self.clock()
+        start = pd.Timestamp(start)
+        if self.max_lookback is not None and start < end - self.max_lookback:
+            logger.warning(f"Historique {self.interval} limité à {self.max_lookback.days} jours par yfinance")
+            start = end - self.max_lookback
+
+        resampler = StreamingResampler(self.resolution)
+        chunks = date_chunks(start, end, self.chunk_span)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="intraday-fetch") as pool:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(pool.submit(self._fetch_logged, *chunk))
+                if len(in_flight) >= self.workers:
+                    break
+            while in_flight:
+                raw = in_flight.popleft().result()
+                if raw is None:
+                    for future in in_flight:
+                        future.cancel()
+                    break
+                # Une tranche terminée libère une place: la suivante part aussitôt
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    in_flight.append(pool.submit(self._fetch_logged, *next_chunk))
+                bars = resampler.push(raw)
+                if len(bars):
+                    yield bars
+        bars = resampler.flush()
+        if len(bars):
+            yield bars
+
+    def fetch(self, start=None, period="300d"):
+        """Récupère les bougies à partir de `start` (incluse), ou sur `period` si absent"""
+        end = self.clock()
+        if start is None:
+            start = end - period_offset(period)
+        batches = list(self.iter_bars(start, end))
+        if not batches:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+        return pd.concat(batches)
+
+
+def stream_features(source, start, end=None):
+    """Features (7 colonnes, sans NaN) des bougies de `source`, par lots, en mémoire bornée"""
+    features = FeatureStream()
+    for bars in source.iter_bars(start, end):
+        batch = features.push(bars).dropna()
+        if len(batch):
+            yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historique intraday agrégé et features (7 colonnes)")
+    parser.add_argument('ticker', nargs='?', default='BTC-USD')
+    parser.add_argument('--resolution', choices=sorted(RESOLUTIONS), default='1h')
+    parser.add_argument('--interval', choices=sorted(INTERVAL_LIMITS), default=None,
+                        help="Intervalle yfinance (défaut: selon la résolution)")
+    parser.add_argument('--period', default='60d', help="Historique récupéré ('7d', '60d', '730d'...)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--output', required=True, help="CSV de sortie (colonnes Date + 7 features)")
+    args = parser.parse_args()
+
+    source = IntradayYFinanceSource(args.ticker, resolution=args.resolution, interval=args.interval,
+                                    workers=args.workers)
+    start = source.clock() - period_offset(args.period)
+    rows = 0
+    # Écriture lot par lot: le CSV complet n'est jamais en mémoire
+    for i, batch in enumerate(stream_features(source, start)):
+        batch.to_csv(args.output, mode='w' if i == 0 else 'a', header=i == 0, index_label='Date')
+        rows += len(batch)
+    print(f"{rows} bougies {args.resolution} écrites dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Métriques du pipeline de prédiction au format texte Prometheus
+
+Implémentation minimale (compteurs, jauges, histogrammes avec labels) sans
+dépendance externe. Les valeurs sont propres à chaque processus: avec
+plusieurs workers gunicorn, chaque série porte le label `pid` du worker.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes par défaut des histogrammes de latence (secondes)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class _Metric:
+    """Base commune: nom, aide, labels et valeurs par combinaison de labels"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labels):
+        """Série correspondant à ces valeurs de labels (créée au premier usage)"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels attendus pour {self.name}: {', '.join(self.labelnames)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} nécessite des labels: {', '.join(self.labelnames)}")
+        return self.labels()
+
+    def collect(self, base_labels=()):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, child in sorted(self._children.items()):
+            labels = tuple(base_labels) + tuple(zip(self.labelnames, key))
+            lines.extend(child.samples(self.name, labels))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Un compteur ne peut que croître")
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self._value)}"]
+
+
+class Counter(_Metric):
+    """Compteur monotone (ex: nombre de requêtes)"""
+
+    type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function):
+        """Valeur lue à chaque collecte (ex: taille du cache)"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self, name, labels):
+        value = self._function() if self._function is not None else self._value
+        return [f"{name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (ex: requêtes en cours, durée du dernier chargement)"""
+
+    type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Chronomètre le bloc et enregistre sa durée"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution de durées par intervalles cumulés (buckets)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+            self._metrics.append(metric)
+
+    def render(self):
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        base_labels = (('pid', os.getpid()),)
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect(base_labels))
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = MetricsRegistry()
+
+# ----------------------------------------------------------------------
+# Métriques du pipeline de prédiction
+# ----------------------------------------------------------------------
+STAGE_DURATION = Histogram(
+    'btc_stage_duration_seconds',
+    "Durée des étapes du pipeline (fetch, indicators, prepare, rollout)",
+    ['stage'],
+)
+MODEL_PREDICT_CALLS = Counter(
+    'btc_model_predict_calls_total',
+    "Nombre d'appels à model.predict (un par jour d'horizon, quel que soit le batch)",
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'btc_model_load_seconds',
+    "Durée du dernier chargement de chaque modèle",
+    ['model'],
+)
+STARTUP_PHASE_SECONDS = Gauge(
+    'btc_startup_phase_seconds',
+    "Durée des phases de démarrage (imports, chargement du modèle, première inférence)",
+    ['phase'],
+)
+CACHE_REQUESTS = Counter(
+    'btc_forecast_cache_requests_total',
+    "Consultations du cache de prédictions (hit, miss, coalesced: calcul identique déjà en cours)",
+    ['result'],
+)
+HTTP_REQUESTS = Counter(
+    'btc_http_requests_total',
+    "Requêtes HTTP traitées",
+    ['endpoint', 'method', 'status'],
+)
+HTTP_DURATION = Histogram(
+    'btc_http_request_duration_seconds',
+    "Durée des requêtes HTTP (jusqu'au premier octet pour les réponses diffusées)",
+    ['endpoint'],
+)
+HTTP_IN_FLIGHT = Gauge(
+    'btc_http_requests_in_flight',
+    "Requêtes HTTP en cours",
+    ['endpoint'],
+)
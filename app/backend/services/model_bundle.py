@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+from services.numpy_lstm import NumpyLSTMModel
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Version 2: poids quantifiés (float16 / int8 + échelles) et scalers optionnels
+BUNDLE_FORMAT_VERSION = 2
+WEIGHT_KEYS = ("kernel", "recurrent_kernel", "bias", "kernel_scale", "recurrent_kernel_scale")
+
+
+class ArrayScaler:
+    """Scaler min-max figé à partir des paramètres d'un MinMaxScaler entraîné
+
+    Même convention que scikit-learn: X_scaled = X * scale_ + min_.
+    """
+
+    def __init__(self, scale_, min_):
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        return cls(scaler.scale_, scaler.min_)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.min_) / self.scale_
+
+
+class ModelBundle:
+    """Modèle prêt à servir: poids, scalers d'entraînement, liste des features et métadonnées"""
+
+    def __init__(self, model, scaler_x, scaler_y, features, metadata=None, path=None):
+        self.model = model
+        self.scaler_x = scaler_x
+        self.scaler_y = scaler_y
+        self.features = list(features)
+        self.metadata = metadata or {}
+        self.path = path
+
+
+def _layer_spec(layer):
+    return {key: value for key, value in layer.items() if key not in WEIGHT_KEYS}
+
+
+def save_bundle(path, model, scaler_x, scaler_y, features, metadata=None):
+    """Sauvegarde un bundle .npz non compressé (lisible en memory-map)
+
+    `model` peut être un modèle Keras, un NumpyLSTMModel ou le chemin d'un .h5.
+    Sans scalers (None), le service les réajuste à chaque requête comme pour un .h5.
+    """
+    if isinstance(model, str):
+        model = NumpyLSTMModel.from_h5(model)
+    elif not isinstance(model, NumpyLSTMModel):
+        model = NumpyLSTMModel.from_keras(model)
+
+    if len(features) != model.input_dim:
+        raise ValueError(f"{len(features)} features fournies, le modèle en attend {model.input_dim}")
+
+    arrays = {}
+    for i, layer in enumerate(model.layers):
+        for key in WEIGHT_KEYS:
+            if key in layer:
+                arrays[f"layer{i}_{key}"] = layer[key]
+    if (scaler_x is None) != (scaler_y is None):
+        raise ValueError("Les scalers des features et de la cible doivent être fournis ensemble")
+    if scaler_x is not None:
+        arrays["scaler_x_scale"] = np.asarray(scaler_x.scale_, dtype=np.float64)
+        arrays["scaler_x_min"] = np.asarray(scaler_x.min_, dtype=np.float64)
+        arrays["scaler_y_scale"] = np.asarray(scaler_y.scale_, dtype=np.float64)
+        arrays["scaler_y_min"] = np.asarray(scaler_y.min_, dtype=np.float64)
+
+    # Version 1 tant que le bundle reste lisible par les versions précédentes
+    version = 1 if model.quantization == "float32" and scaler_x is not None else BUNDLE_FORMAT_VERSION
+    meta = {
+        "format_version": version,
+        "layers": [_layer_spec(layer) for layer in model.layers],
+        "features": list(features),
+        "metadata": metadata or {},
+    }
+    arrays["__meta__"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    logger.info(f"Bundle sauvegardé: {path}")
+    return path
+
+
+def _read_npz_mmap(path):
+    """Ouvre chaque tableau d'un .npz non compressé en memory-map (np.load ne le fait pas pour les .npz)"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            # En-tête local zip: 30 octets + nom + champ extra, puis le contenu .npy
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                         order="F" if fortran_order else "C")
+    return arrays
+
+
+def load_bundle(path, mmap=True):
+    """Charge un bundle .npz: modèle NumPy, scalers figés, features et métadonnées"""
+    if mmap:
+        arrays = _read_npz_mmap(path)
+    else:
+        with np.load(path) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+
+    meta = json.loads(bytes(np.asarray(arrays["__meta__"])).decode("utf-8"))
+    if meta.get("format_version", 0) > BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Version de bundle non supportée: {meta.get('format_version')}")
+
+    layers = []
+    for i, spec in enumerate(meta["layers"]):
+        layer = dict(spec)
+        for key in WEIGHT_KEYS:
+            if f"layer{i}_{key}" in arrays:
+                layer[key] = arrays[f"layer{i}_{key}"]
+        layers.append(layer)
+
+    # Poids déjà en float32 (ou float16 / int8): NumpyLSTMModel garde les vues memory-map sans copie
+    model = NumpyLSTMModel(layers)
+    scaler_x = scaler_y = None
+    if "scaler_x_scale" in arrays:
+        scaler_x = ArrayScaler(arrays["scaler_x_scale"], arrays["scaler_x_min"])
+        scaler_y = ArrayScaler(arrays["scaler_y_scale"], arrays["scaler_y_min"])
+    logger.info(f"Bundle chargé: {path} ({len(meta['features'])} features, poids {model.quantization})")
+    return ModelBundle(model, scaler_x, scaler_y, meta["features"], meta["metadata"], path=path)
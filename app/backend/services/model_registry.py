@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from sklearn.preprocessing import MinMaxScaler
+
+from services.metrics import MODEL_LOAD_SECONDS
+from services.model_bundle import load_bundle
+from services.numpy_lstm import NumpyLSTMModel
+from services.quantization import quantize_model
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dossiers scannés pour découvrir les modèles
+MODEL_DIRECTORIES = ('model', 'app/models')
+MODEL_EXTENSIONS = ('.h5', '.npz')
+
+# Features utilisées par le modèle rolling (7 features)
+FEATURES = ['Close', 'Open', 'High', 'Low', 'Volume', 'MM_200', 'RSI_14']
+
+# Features des modèles .h5 déduites de leur dimension d'entrée (pipelines du notebook)
+FEATURES_BY_INPUT_DIM = {
+    1: ['Close'],
+    5: ['Close', 'Open', 'High', 'Low', 'Volume'],
+    7: FEATURES,
+}
+
+
+class ThreadSafeModel:
+    """Sérialise les appels à predict d'un modèle Keras partagé entre les threads d'un worker
+
+    Le modèle NumPy est sans état (thread-safe); un modèle Keras ne garantit pas
+    des appels concurrents à predict sur la même instance.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def predict(self, x, verbose=0, **kwargs):
+        with self._lock:
+            return self.model.predict(x, verbose=verbose, **kwargs)
+
+    def __call__(self, x, **kwargs):
+        with self._lock:
+            return self.model(x, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class LoadedModel:
+    """Modèle résident en mémoire: poids, scalers figés éventuels (bundle) et features"""
+
+    def __init__(self, name, path, mtime, model, backend, features, scaler_x=None, scaler_y=None, metadata=None):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.model = model
+        self.backend = backend
+        self.features = list(features)
+        self.scaler_x = scaler_x
+        self.scaler_y = scaler_y
+        self.metadata = metadata or {}
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.load_seconds = None
+        self.nbytes = self._weights_nbytes()
+
+    @property
+    def frozen_scalers(self):
+        """Scalers de l'entraînement (bundle) plutôt que réajustés à chaque requête"""
+        return self.scaler_x is not None
+
+    @property
+    def resolution(self):
+        """Résolution des bougies de l'entraînement (métadonnées du bundle; journalier pour un .h5)"""
+        return self.metadata.get("resolution", "1d")
+
+    @property
+    def identity(self):
+        return (self.name, self.path, self.mtime, self.backend)
+
+    def _weights_nbytes(self):
+        if isinstance(self.model, NumpyLSTMModel):
+            return self.model.nbytes
+        try:
+            return int(sum(weights.nbytes for weights in self.model.get_weights()))
+        except Exception:
+            return None
+
+    def scalers_for(self, data):
+        """Scalers (features, cible) à utiliser pour ces données
+
+        Scalers figés pour un bundle, sinon nouveaux MinMaxScaler ajustés sur
+        les données (comme le service d'origine), sans état partagé entre requêtes.
+        """
+        if self.frozen_scalers:
+            return self.scaler_x, self.scaler_y
+        scaler_x = MinMaxScaler(feature_range=(-1, 1)).fit(data[self.features].values)
+        scaler_y = MinMaxScaler(feature_range=(-1, 1)).fit(data['Close'].values.reshape(-1, 1))
+        return scaler_x, scaler_y
+
+
+def _check_window(path, window):
+    """Refuse les modèles entraînés sur une fenêtre de plusieurs bougies
+
+    Le service prédit à partir de la dernière bougie seulement (entrées
+    (batch, 1, features)); un modèle `--lookback N` de services.training
+    recevrait des entrées d'une autre forme.
+    """
+    if window is not None and window > 1:
+        raise ValueError(f"Modèle {path} entraîné sur une fenêtre de {window} bougies: "
+                         f"seuls les modèles à fenêtre 1 sont servis")
+
+
+def load_model_file(path, backend='keras', name=None, quantization=None):
+    """Charge un fichier modèle (.h5 via Keras ou NumPy, .npz via le bundle)
+
+    `quantization` ('float16' ou 'int8'): poids float32 quantifiés au
+    chargement (moteur NumPy); un bundle déjà quantifié est servi tel quel.
+    Les modèles à fenêtre > 1 lèvent une ValueError.
+    """
+    name = name or os.path.basename(path)
+    mtime = os.path.getmtime(path)
+
+    if path.endswith('.npz'):
+        # Bundle: poids + scalers d'entraînement + features, inférence NumPy
+        bundle = load_bundle(path)
+        _check_window(path, bundle.metadata.get("window"))
+        model = bundle.model
+        if quantization and model.quantization == 'float32':
+            model = quantize_model(model, quantization)
+        return LoadedModel(name, path, mtime, model, 'numpy', bundle.features,
+                           bundle.scaler_x, bundle.scaler_y, bundle.metadata)
+
+    if backend == 'numpy':
+        # Inférence NumPy: lecture directe des poids HDF5, sans TensorFlow
+        model = NumpyLSTMModel.from_h5(path)
+        _check_window(path, model.timesteps)
+        if quantization:
+            model = quantize_model(model, quantization)
+        input_dim = model.input_dim
+    else:
+        from keras.models import load_model
+        model = ThreadSafeModel(load_model(path))
+        _check_window(path, model.input_shape[1])
+        input_dim = model.input_shape[-1]
+
+    if input_dim not in FEATURES_BY_INPUT_DIM:
+        raise ValueError(f"Dimension d'entrée non reconnue pour {path}: {input_dim}")
+    return LoadedModel(name, path, mtime, model, backend, FEATURES_BY_INPUT_DIM[input_dim])
+
+
+class ModelRegistry:
+    """Registre des modèles: découverte, chargement paresseux, éviction LRU et rechargement à chaud
+
+    Les modèles de `directories` sont découverts par nom de fichier et chargés
+    au premier usage. Au plus `max_resident` modèles restent en mémoire. Si le
+    fichier d'un modèle change sur disque, la nouvelle version est chargée puis
+    remplace l'ancienne de façon atomique (les requêtes en cours gardent l'ancienne).
+    """
+
+    def __init__(self, directories=MODEL_DIRECTORIES, max_resident=2, backend='keras', quantization=None):
+        self.directories = list(directories)
+        self.max_resident = max_resident
+        self.backend = backend
+        self.quantization = quantization
+        self._paths = {}
+        self._explicit = {}
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.discover()
+
+    def register(self, path, name=None):
+        """Enregistre explicitement un fichier modèle (ex: model_path du service)"""
+        name = name or os.path.basename(path)
+        with self._lock:
+            self._explicit[name] = path
+            self._paths[name] = path
+        return name
+
+    def discover(self):
+        """(Re)scanne les dossiers de modèles"""
+        paths = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(MODEL_EXTENSIONS):
+                    continue
+                if filename in paths:
+                    logger.warning(f"Modèle {filename} présent dans plusieurs dossiers, {paths[filename]} conservé")
+                    continue
+                paths[filename] = os.path.join(directory, filename)
+        with self._lock:
+            paths.update(self._explicit)
+            self._paths = paths
+        return dict(paths)
+
+    def available(self):
+        """Noms des modèles disponibles"""
+        with self._lock:
+            return sorted(self._paths)
+
+    def is_resident(self, name):
+        with self._lock:
+            return name in self._resident
+
+    def _path_for(self, name):
+        with self._lock:
+            path = self._paths.get(name)
+        if path is None or not os.path.exists(path):
+            path = self.discover().get(name)
+        if path is None:
+            raise KeyError(f"Modèle inconnu: {name}")
+        return path
+
+    def get(self, name):
+        """Retourne le modèle chargé (chargement au premier usage, rechargement si le fichier a changé)"""
+        path = self._path_for(name)
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is not None and entry.path == path and entry.mtime == mtime:
+                self._resident.move_to_end(name)
+                entry.last_used = time.time()
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Un seul chargement par modèle à la fois, sans bloquer les autres modèles
+        with load_lock:
+            with self._lock:
+                entry = self._resident.get(name)
+                if entry is not None and entry.path == path and entry.mtime == mtime:
+                    return entry
+
+            start = time.perf_counter()
+            try:
+                new_entry = load_model_file(path, self.backend, name, quantization=self.quantization)
+            except Exception as e:
+                if entry is not None:
+                    # Fichier en cours d'écriture ou invalide: on garde la version résidente
+                    logger.warning(f"Rechargement de {name} impossible, version précédente conservée: {e}")
+                    return entry
+                raise
+            new_entry.load_seconds = time.perf_counter() - start
+            MODEL_LOAD_SECONDS.labels(model=name).set(new_entry.load_seconds)
+
+            with self._lock:
+                swapped = name in self._resident
+                self._resident[name] = new_entry
+                self._resident.move_to_end(name)
+                while len(self._resident) > self.max_resident:
+                    evicted, _ = self._resident.popitem(last=False)
+                    logger.info(f"Modèle évincé de la mémoire (LRU): {evicted}")
+
+        action = "rechargé à chaud" if swapped else "chargé"
+        logger.info(f"Modèle {name} {action} en {new_entry.load_seconds:.2f}s ({new_entry.backend})")
+        return new_entry
+
+    def status(self):
+        """Modèles disponibles, résidents et mémoire occupée par leurs poids"""
+        with self._lock:
+            resident = dict(self._resident)
+            paths = dict(self._paths)
+        models = []
+        for name in sorted(paths):
+            entry = resident.get(name)
+            models.append({
+                "name": name,
+                "path": paths[name],
+                "resident": entry is not None,
+                "backend": entry.backend if entry else None,
+                "quantization": getattr(entry.model, "quantization", "float32") if entry else None,
+                "features": entry.features if entry else None,
+                "resolution": entry.resolution if entry else None,
+                "memory_bytes": entry.nbytes if entry else None,
+                "loaded_at": entry.loaded_at if entry else None,
+                "last_used": entry.last_used if entry else None,
+            })
+        return {
+            "max_resident": self.max_resident,
+            "resident": list(resident),
+            "resident_memory_bytes": sum(entry.nbytes or 0 for entry in resident.values()),
+            "models": models,
+        }
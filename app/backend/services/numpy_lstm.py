@@ -0,0 +1,240 @@
+import json
+import logging
+
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (1.0 + np.tanh(0.5 * x)),
+    "hard_sigmoid": lambda x: np.clip(0.2 * x + 0.5, 0.0, 1.0),
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+    None: lambda x: x,
+}
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Activation non supportée: {name}")
+    return ACTIVATIONS[name]
+
+
+class NumpyLSTMModel:
+    """Moteur d'inférence NumPy pour les modèles Sequential LSTM/Dropout/Dense de Keras
+
+    Les poids sont lus directement dans les fichiers .h5 sauvegardés par le
+    notebook, sans importer TensorFlow. L'API `predict(x, verbose=0)` est
+    compatible avec celle de Keras pour des entrées (batch, timesteps, features).
+    """
+
+    def __init__(self, layers, dtype=np.float32, timesteps=None):
+        self.dtype = dtype
+        # Longueur de la fenêtre d'entrée déclarée à l'entraînement (None si inconnue)
+        self.timesteps = timesteps
+        self.layers = []
+        for layer in layers:
+            layer = dict(layer)
+            for key in ("kernel", "recurrent_kernel", "bias"):
+                if key not in layer:
+                    continue
+                if key != "bias" and f"{key}_scale" in layer:
+                    # Poids int8 quantifiés (une échelle par colonne de sortie), gardés tels quels
+                    layer[key] = np.ascontiguousarray(layer[key], dtype=np.int8)
+                    layer[f"{key}_scale"] = np.ascontiguousarray(layer[f"{key}_scale"], dtype=dtype)
+                elif key != "bias" and np.asarray(layer[key]).dtype == np.float16:
+                    # Poids float16 gardés tels quels (moitié moins de mémoire)
+                    layer[key] = np.ascontiguousarray(layer[key])
+                else:
+                    layer[key] = np.ascontiguousarray(layer[key], dtype=dtype)
+            self.layers.append(layer)
+
+    @classmethod
+    def from_h5(cls, path, dtype=np.float32):
+        """Charge l'architecture et les poids d'un modèle Keras sauvegardé au format HDF5"""
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            config = json.loads(_decode(f.attrs["model_config"]))
+            weights_group = f["model_weights"] if "model_weights" in f else f
+
+            layers = []
+            timesteps = None
+            for layer_config in config["config"]["layers"]:
+                class_name = layer_config["class_name"]
+                cfg = layer_config["config"]
+                # Keras 3: "batch_shape" de l'InputLayer, Keras 2: "batch_input_shape" de la première couche
+                input_shape = cfg.get("batch_shape") or cfg.get("batch_input_shape")
+                if input_shape and timesteps is None and len(input_shape) == 3:
+                    timesteps = input_shape[1]
+                if class_name == "InputLayer":
+                    continue
+
+                weights = {}
+                if cfg["name"] in weights_group:
+                    group = weights_group[cfg["name"]]
+                    for weight_name in group.attrs.get("weight_names", []):
+                        weight_name = _decode(weight_name)
+                        # Keras 2: ".../kernel:0", Keras 3: ".../kernel"
+                        key = weight_name.split("/")[-1].split(":")[0]
+                        weights[key] = group[weight_name][()]
+
+                if class_name == "LSTM":
+                    layers.append({
+                        "type": "lstm",
+                        "name": cfg["name"],
+                        "units": cfg["units"],
+                        "return_sequences": cfg.get("return_sequences", False),
+                        "activation": cfg.get("activation", "tanh"),
+                        "recurrent_activation": cfg.get("recurrent_activation", "sigmoid"),
+                        "kernel": weights["kernel"],
+                        "recurrent_kernel": weights["recurrent_kernel"],
+                        "bias": weights.get("bias", np.zeros(4 * cfg["units"])),
+                    })
+                elif class_name == "Dense":
+                    layers.append({
+                        "type": "dense",
+                        "name": cfg["name"],
+                        "activation": cfg.get("activation", "linear"),
+                        "kernel": weights["kernel"],
+                        "bias": weights.get("bias", np.zeros(cfg["units"])),
+                    })
+                elif class_name == "Dropout":
+                    layers.append({"type": "dropout", "name": cfg["name"], "rate": cfg.get("rate", 0.0)})
+                else:
+                    raise ValueError(f"Couche non supportée par le moteur NumPy: {class_name}")
+
+        logger.info(f"Modèle NumPy chargé depuis {path}: {len(layers)} couches")
+        return cls(layers, dtype=dtype, timesteps=timesteps)
+
+    @classmethod
+    def from_keras(cls, model, dtype=np.float32):
+        """Convertit un modèle Keras déjà chargé (ex: juste après l'entraînement dans le notebook)"""
+        layers = []
+        for layer in model.layers:
+            class_name = layer.__class__.__name__
+            cfg = layer.get_config()
+            weights = layer.get_weights()
+            if class_name == "LSTM":
+                layers.append({
+                    "type": "lstm",
+                    "name": cfg["name"],
+                    "units": cfg["units"],
+                    "return_sequences": cfg.get("return_sequences", False),
+                    "activation": cfg.get("activation", "tanh"),
+                    "recurrent_activation": cfg.get("recurrent_activation", "sigmoid"),
+                    "kernel": weights[0],
+                    "recurrent_kernel": weights[1],
+                    "bias": weights[2] if len(weights) > 2 else np.zeros(4 * cfg["units"]),
+                })
+            elif class_name == "Dense":
+                layers.append({
+                    "type": "dense",
+                    "name": cfg["name"],
+                    "activation": cfg.get("activation", "linear"),
+                    "kernel": weights[0],
+                    "bias": weights[1] if len(weights) > 1 else np.zeros(cfg["units"]),
+                })
+            elif class_name == "Dropout":
+                layers.append({"type": "dropout", "name": cfg["name"], "rate": cfg.get("rate", 0.0)})
+            elif class_name != "InputLayer":
+                raise ValueError(f"Couche non supportée par le moteur NumPy: {class_name}")
+        return cls(layers, dtype=dtype)
+
+    @property
+    def input_dim(self):
+        """Nombre de features attendues en entrée"""
+        return self.layers[0]["kernel"].shape[0]
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par les poids (et leurs échelles de quantification)"""
+        return sum(
+            layer[key].nbytes
+            for layer in self.layers
+            for key in ("kernel", "recurrent_kernel", "bias", "kernel_scale", "recurrent_kernel_scale")
+            if key in layer
+        )
+
+    @property
+    def quantization(self):
+        """Format des poids: float32, float16 ou int8"""
+        kernels = [layer["kernel"] for layer in self.layers if "kernel" in layer]
+        if any(kernel.dtype == np.int8 for kernel in kernels):
+            return "int8"
+        if any(kernel.dtype == np.float16 for kernel in kernels):
+            return "float16"
+        return "float32"
+
+    def _matmul(self, x, layer, key):
+        """x @ poids, avec déquantification à la volée des poids float16 / int8"""
+        weights = layer[key]
+        if weights.dtype == x.dtype:
+            return x @ weights
+        out = x @ weights.astype(x.dtype)
+        scale = layer.get(f"{key}_scale")
+        # int8: q * scale par colonne, donc x @ (q * scale) = (x @ q) * scale
+        return out * scale if scale is not None else out
+
+    def _lstm(self, layer, x):
+        batch, timesteps, _ = x.shape
+        units = layer["units"]
+        activation = _activation(layer["activation"])
+        recurrent_activation = _activation(layer["recurrent_activation"])
+
+        # Projection des entrées pour tous les pas de temps en une seule multiplication
+        x_proj = self._matmul(x, layer, "kernel") + layer["bias"]
+        h = np.zeros((batch, units), dtype=self.dtype)
+        c = np.zeros((batch, units), dtype=self.dtype)
+        outputs = []
+        for t in range(timesteps):
+            z = x_proj[:, t, :]
+            if t > 0:
+                z = z + self._matmul(h, layer, "recurrent_kernel")
+            # Ordre des portes Keras: input, forget, cell, output
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if layer["return_sequences"]:
+                outputs.append(h)
+
+        if layer["return_sequences"]:
+            return np.stack(outputs, axis=1)
+        return h
+
+    def predict(self, x, verbose=0, batch_size=None, training=False, rng=None):
+        """Passe avant sur un tenseur (batch, timesteps, features)
+
+        En inférence (défaut) le Dropout est l'identité. Avec `training=True`,
+        chaque couche Dropout tire un masque indépendant par élément du batch
+        (Monte Carlo dropout), comme `model(x, training=True)` avec Keras.
+        """
+        out = np.asarray(x, dtype=self.dtype)
+        if out.ndim == 2:
+            out = out[:, np.newaxis, :]
+        if training and rng is None:
+            rng = np.random.default_rng()
+        for layer in self.layers:
+            if layer["type"] == "lstm":
+                out = self._lstm(layer, out)
+            elif layer["type"] == "dense":
+                out = _activation(layer["activation"])(self._matmul(out, layer, "kernel") + layer["bias"])
+            elif training and layer["rate"] > 0:
+                # Dropout inversé: les unités conservées sont remises à l'échelle 1 / (1 - rate)
+                keep = 1.0 - layer["rate"]
+                out = out * ((rng.random(out.shape) < keep) / keep).astype(self.dtype)
+        return out
+
+    def __call__(self, x, training=False, rng=None):
+        """Appel façon Keras: `model(x, training=True)` active le dropout"""
+        return self.predict(x, training=training, rng=rng)
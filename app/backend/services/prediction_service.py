@@ -1,71 +1,218 @@
+import os
+import re
+import asyncio
+import threading
+import time
 import numpy as np
 import pandas as pd
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from sklearn.preprocessing import MinMaxScaler
-from keras.models import load_model
 import logging
+from services.candle_store import CandleStore, YFinanceSource, resolution_step
+from services.forecast_cache import ForecastCache
+from services.indicators import INDICATOR_WARMUP, StoreIndicators, calculate_rsi, compute_indicators
+from services.intraday import IntradayYFinanceSource, history_period
+from services.metrics import MODEL_PREDICT_CALLS, STAGE_DURATION
+from services.model_registry import FEATURES, ModelRegistry
+from services.quantization import QUANTIZATION_MODES
+from services.rollout import quantile_bands, rollout_batch, rollout_mc_dropout, rollout_steps, scaler_params
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def calculate_rsi(prices, window=14):
-    """Calcule le RSI (Relative Strength Index)"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+# Backends d'inférence disponibles
+INFERENCE_BACKENDS = ('keras', 'numpy')
+
+# Nombre maximal de scénarios par requête batch
+MAX_BATCH_SCENARIOS = 1000
+
+# Nombre maximal de trajectoires Monte Carlo dropout par prédiction
+MAX_UNCERTAINTY_SAMPLES = 1000
+
+# Nombre maximal d'actifs par requête multi-actifs
+MAX_TICKERS = 50
+
+# Nombre maximal de dates d'ancrage par requête as-of (un an de bougies journalières)
+MAX_AS_OF_DATES = 366
+
+# Symboles acceptés (ex: BTC-USD, ETH-USD, ^GSPC): utilisés comme nom de dossier du store
+TICKER_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9.=^-]{0,19}$')
+
+
+def format_candle_date(date, resolution='1d'):
+    """Date d'une bougie: jour en journalier, jour et heure (UTC) en intraday"""
+    return date.strftime("%Y-%m-%d" if resolution == '1d' else "%Y-%m-%d %H:%M")
+
+
+def horizon_dates(last_date, n_steps, resolution='1d', anchored=False):
+    """Dates des `n_steps` bougies prédites
+
+    En journalier, à partir d'aujourd'hui (comme le service d'origine); en
+    intraday ou pour une prévision datée (`anchored`), à la suite de la
+    dernière bougie, un pas de résolution à la fois.
+    """
+    if resolution == '1d' and not anchored:
+        start_date = datetime.now()
+        return [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(1, n_steps + 1)]
+    step = resolution_step(resolution)
+    return [format_candle_date(last_date + i * step, resolution) for i in range(1, n_steps + 1)]
 
 class BitcoinPredictionService:
     """Service de prédiction Bitcoin utilisant LSTM"""
     
-    def __init__(self, model_path='app/models/model.h5'):
+    def __init__(self, model_path='app/models/model.h5', store=None,
+                 store_dir=None, seed_csv='market_data.csv',
+                 history_days=300, cache=None, backend='keras', registry=None,
+                 max_resident_models=2, eager_load=True, ticker='BTC-USD',
+                 store_root='app/data/candles', source_factory=None, fetch_workers=8, quantization=None,
+                 intraday_source_factory=None):
         self.model = None
         self.scaler_x = None
         self.scaler_y = None
+        self.features = list(FEATURES)
+        # Scalers figés (bundle) ou réajustés sur les données à chaque requête (.h5)
+        self.frozen_scalers = False
         self.model_path = model_path
-        self.load_model()
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Backend d'inférence inconnu: {backend} (choix: {', '.join(INFERENCE_BACKENDS)})")
+        self.backend = backend
+        # Poids quantifiés au chargement (float16 / int8): moteur NumPy uniquement
+        if quantization is not None:
+            if quantization not in QUANTIZATION_MODES:
+                raise ValueError(f"Quantification inconnue: {quantization} (choix: {', '.join(QUANTIZATION_MODES)})")
+            if backend != 'numpy':
+                raise ValueError("La quantification des poids nécessite le backend numpy")
+        self.quantization = quantization
+        self.history_days = history_days
+        # Actif par défaut; les autres actifs ont chacun leur store, créé au premier usage
+        self.ticker = ticker
+        self.store_root = store_root
+        self.source_factory = source_factory if source_factory is not None else YFinanceSource
+        # Sources des modèles entraînés en intraday (1h, 5m...): factory(ticker, resolution)
+        self.intraday_source_factory = (intraday_source_factory if intraday_source_factory is not None
+                                        else IntradayYFinanceSource)
+        self.fetch_workers = fetch_workers
+        self._fetch_pool = None
+        self._stores_lock = threading.Lock()
+        if store is None:
+            store = CandleStore(store_dir or os.path.join(store_root, ticker),
+                                source=self.source_factory(ticker), seed_csv=seed_csv)
+        self.store = store
+        self.stores = {ticker: store}
+        # Indicateurs incrémentaux de chaque store (par dossier), créés à la première lecture
+        self._indicators = {}
+        self.cache = cache if cache is not None else ForecastCache(maxsize=32, ttl=3600)
+        # Registre des modèles (model/ et app/models/), model_path étant le modèle par défaut
+        self.registry = registry if registry is not None else ModelRegistry(
+            backend=backend, max_resident=max_resident_models, quantization=quantization)
+        self.default_model = self.registry.register(model_path)
+        # eager_load=False: le chargement est laissé à l'appelant (préchauffage en arrière-plan)
+        if eager_load:
+            self.load_model()
     
     def load_model(self):
-        """Charge le modèle LSTM et initialise les scalers"""
+        """Charge le modèle LSTM par défaut et initialise les scalers"""
         try:
-            self.model = load_model(self.model_path)
-            self.scaler_x = MinMaxScaler(feature_range=(-1, 1))
-            self.scaler_y = MinMaxScaler(feature_range=(-1, 1))
-            logger.info("Modèle LSTM chargé avec succès")
+            self.resolve_model()
+            logger.info(f"Modèle LSTM chargé avec succès (backend: {self.backend})")
             return True
         except Exception as e:
             logger.error(f"Erreur lors du chargement du modèle: {e}")
             return False
+
+    def resolve_model(self, model_name=None):
+        """Retourne le modèle demandé (modèle par défaut si None), chargé via le registre"""
+        name = model_name or self.default_model
+        try:
+            entry = self.registry.get(name)
+        except KeyError:
+            raise ValueError(f"Modèle inconnu: {name} (disponibles: {', '.join(self.registry.available())})")
+
+        if name == self.default_model:
+            # Attributs du modèle par défaut, mis à jour après un rechargement à chaud
+            self.model = entry.model
+            self.backend = entry.backend
+            self.features = entry.features
+            self.frozen_scalers = entry.frozen_scalers
+            if entry.frozen_scalers:
+                self.scaler_x, self.scaler_y = entry.scaler_x, entry.scaler_y
+        return entry
     
+    def store_for(self, ticker=None, resolution='1d'):
+        """Store local de l'actif (créé au premier usage, dans store_root/<ticker> ou <ticker>_<résolution>)"""
+        ticker = ticker or self.ticker
+        key = ticker if resolution == '1d' else f"{ticker}_{resolution}"
+        with self._stores_lock:
+            store = self.stores.get(key)
+            if store is None:
+                if not TICKER_PATTERN.match(ticker):
+                    raise ValueError(f"Symbole invalide: {ticker}")
+                if resolution == '1d':
+                    source = self.source_factory(ticker)
+                else:
+                    source = self.intraday_source_factory(ticker, resolution)
+                store = CandleStore(os.path.join(self.store_root, key), source=source, resolution=resolution,
+                                    min_update_interval=min(900, resolution_step(resolution).total_seconds()))
+                self.stores[key] = store
+            return store
+
+    def refresh_store(self, ticker=None, resolution='1d', force=False):
+        """Met à jour le store local; en cas d'échec de la source, on garde les données locales
+
+        `force`: sans attendre l'intervalle minimal du store (précalcul planifié à la clôture).
+        """
+        store = self.store_for(ticker, resolution)
+        try:
+            # Historique local insuffisant pour MM_200: complété jusqu'à history_days bougies,
+            # au plus une tentative par intervalle de mise à jour comme les mises à jour incrémentales
+            store.update(force=force, min_rows=self.history_days,
+                         period=history_period(self.history_days, resolution))
+        except Exception as e:
+            logger.warning(f"Mise à jour du store {ticker or self.ticker} impossible, utilisation des données locales: {e}")
+
+    def indicators_for(self, store):
+        """Indicateurs incrémentaux du store (un IndicatorEngine par série de bougies)"""
+        with self._stores_lock:
+            indicators = self._indicators.get(store.directory)
+            if indicators is None:
+                indicators = self._indicators[store.directory] = StoreIndicators(self.history_days)
+            return indicators
+
     def get_latest_bitcoin_data(self):
-        """Récupère les dernières données Bitcoin via yfinance"""
+        """Récupère les dernières données Bitcoin depuis le store local (mis à jour de façon incrémentale)"""
+        return self.get_latest_data(self.ticker)
+
+    def get_latest_data(self, ticker=None, resolution='1d'):
+        """Récupère les dernières données d'un actif depuis son store local (mis à jour de façon incrémentale)
+
+        `resolution` ('1d', '1h', '5m'...): durée des bougies, celle de
+        l'entraînement du modèle; les indicateurs portent sur des bougies.
+        Ils sont mis à jour de façon incrémentale avec les bougies ajoutées
+        au store depuis la lecture précédente (calcul batch au démarrage).
+        """
         try:
-            # Récupération des données des 300 derniers jours pour avoir assez de données pour MM_200
-            btc = yf.Ticker("BTC-USD")
-            data = btc.history(period="300d", interval="1d")
+            store = self.store_for(ticker, resolution)
+            with STAGE_DURATION.labels(stage="fetch").time():
+                self.refresh_store(ticker, resolution)
+
+            # Lecture des history_days dernières bougies et de leurs indicateurs techniques
+            with STAGE_DURATION.labels(stage="indicators").time():
+                data = self.indicators_for(store).load(store)
             
             if data.empty:
-                logger.error("Aucune donnée récupérée de yfinance")
+                logger.error(f"Aucune donnée disponible dans le store {ticker or self.ticker}")
                 return None
             
-            logger.info(f"Données brutes récupérées: {len(data)} jours")
-            
-            # Calcul des indicateurs techniques
-            data['MM_200'] = data['Close'].rolling(window=200, min_periods=1).mean()
-            data['RSI_14'] = calculate_rsi(data['Close'], window=14)
+            logger.info(f"Données récupérées: {len(data)} bougies {resolution}")
             
             # Sélection des features utilisées par le modèle
-            features = ['Close', 'Open', 'High', 'Low', 'Volume', 'MM_200', 'RSI_14']
-            data = data[features]
+            data = data[FEATURES]
             
             # Suppression des lignes avec des valeurs NaN
             data_clean = data.dropna()
             
-            logger.info(f"Données après nettoyage: {len(data_clean)} jours")
+            logger.info(f"Données après nettoyage: {len(data_clean)} bougies")
             
             if len(data_clean) < 50:  # Vérification du minimum de données
                 logger.error(f"Pas assez de données après nettoyage: {len(data_clean)} lignes")
@@ -76,9 +223,39 @@ class BitcoinPredictionService:
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des données: {e}")
             return None
-    
-    def prepare_data_for_prediction(self, data):
+
+    def _get_fetch_pool(self):
+        # Créé au premier usage: pas de threads hérités d'un fork (gunicorn --preload)
+        with self._stores_lock:
+            if self._fetch_pool is None:
+                self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers,
+                                                      thread_name_prefix="candle-fetch")
+            return self._fetch_pool
+
+    def fetch_latest_data(self, tickers, resolution='1d'):
+        """Récupère les données de plusieurs actifs en parallèle (asyncio + pool de threads)
+
+        yfinance et les stores sont synchrones: chaque récupération s'exécute dans
+        un thread du pool, asyncio attend l'ensemble. Retourne {ticker: DataFrame ou None}.
+        """
+        pool = self._get_fetch_pool()
+
+        async def gather():
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*(
+                loop.run_in_executor(pool, self.get_latest_data, ticker, resolution) for ticker in tickers
+            ))
+
+        return dict(zip(tickers, asyncio.run(gather())))
+
+    def prepare_data_for_prediction(self, data, entry=None):
         """Prépare les données pour la prédiction"""
+        X_scaled, y_scaled, scaler_x, scaler_y = self._prepare(data, entry or self.resolve_model())
+        self.scaler_x, self.scaler_y = scaler_x, scaler_y
+        return X_scaled, y_scaled
+
+    def _prepare(self, data, entry):
+        """Normalise les données avec les scalers du modèle (sans état partagé entre requêtes)"""
         try:
             # Vérification des données
             if data is None or len(data) == 0:
@@ -86,95 +263,112 @@ class BitcoinPredictionService:
             
             logger.info(f"Préparation des données: {len(data)} lignes, {len(data.columns)} colonnes")
             
-            # Normalisation des features
-            X_scaled = self.scaler_x.fit_transform(data.values)
-            
-            # Normalisation de la target (Close)
-            y_scaled = self.scaler_y.fit_transform(data['Close'].values.reshape(-1, 1))
+            with STAGE_DURATION.labels(stage="prepare").time():
+                # Scalers de l'entraînement (bundle) ou ajustés sur les données (.h5)
+                scaler_x, scaler_y = entry.scalers_for(data)
+
+                # Normalisation des features
+                X_scaled = scaler_x.transform(data[entry.features].values)
+                
+                # Normalisation de la target (Close)
+                y_scaled = scaler_y.transform(data['Close'].values.reshape(-1, 1))
             
-            return X_scaled, y_scaled
+            return X_scaled, y_scaled, scaler_x, scaler_y
         except Exception as e:
             logger.error(f"Erreur lors de la préparation des données: {e}")
             raise e
     
     def predict_rolling_days(self, initial_data, n_days=30):
         """Prédiction rolling: utilise les prédictions précédentes pour prédire les jours suivants"""
-        predictions = []
-        current_data = initial_data.copy()
-        
-        for day in range(n_days):
-            # Reshape pour le modèle LSTM
-            input_data = current_data.reshape((1, 1, current_data.shape[0]))
-            
-            # Prédiction du prix de clôture du jour suivant
-            pred_scaled = self.model.predict(input_data, verbose=0)
-            pred_price = self.scaler_y.inverse_transform(pred_scaled)[0, 0]
-            predictions.append(pred_price)
-            
-            # Mise à jour des données pour la prochaine prédiction
-            current_data_unscaled = self.scaler_x.inverse_transform(current_data.reshape(1, -1))[0]
-            
-            # Mise à jour: Close = prédiction, on garde les autres features
-            current_data_unscaled[0] = pred_price  # Close
-            
-            # Re-normalisation
-            current_data = self.scaler_x.transform(current_data_unscaled.reshape(1, -1))[0]
-        
-        return np.array(predictions)
-    
-    def generate_prediction(self):
-        """Génère une prédiction pour les 30 prochains jours"""
+        return self.predict_rolling_batch(initial_data.reshape(1, -1), n_days=n_days)[0]
+
+    def predict_rolling_batch(self, initial_batch, n_days=30, model=None, scalers=None):
+        """Prédiction rolling pour un batch de points de départ normalisés (batch, features)"""
+        scaler_x, scaler_y = scalers if scalers is not None else (self.scaler_x, self.scaler_y)
+        x_scale, x_min = scaler_params(scaler_x)
+        y_scale, y_min = scaler_params(scaler_y)
+        with STAGE_DURATION.labels(stage="rollout").time():
+            predictions = rollout_batch(model if model is not None else self.model, initial_batch, n_days,
+                                        x_scale, x_min, y_scale, y_min)
+        MODEL_PREDICT_CALLS.inc(n_days)
+        return predictions
+
+    def model_identity(self, model_name=None):
+        """Identité du modèle (nom, chemin, date de modification du fichier, backend)"""
+        return self.resolve_model(model_name).identity
+
+    def forecast_version(self, model_name=None, ticker=None):
+        """Entrées dont dépend une prévision (modèle, date de la dernière bougie), sans exécuter le pipeline
+
+        Sert à construire l'ETag des réponses et à répondre 304 aux requêtes
+        conditionnelles. La date vaut None si le store est vide.
+        """
+        entry = self.resolve_model(model_name)
+        self.refresh_store(ticker, entry.resolution)
+        last_date = self.store_for(ticker, entry.resolution).last_date()
+        return entry, format_candle_date(last_date, entry.resolution) if last_date is not None else None
+
+    def generate_prediction(self, n_days=30, model_name=None, samples=0, budget_ms=None, entry=None):
+        """Génère une prédiction pour les n_days prochains jours (30 par défaut)
+
+        Avec `samples` > 0, ajoute des bandes d'incertitude (p10/p50/p90 par
+        jour) issues de `samples` trajectoires Monte Carlo dropout, réduites
+        si nécessaire pour tenir dans `budget_ms`. `entry`: modèle déjà résolu
+        (ex: celui de l'ETag de la réponse), sinon résolu d'après `model_name`.
+        """
         try:
-            # Récupération des données récentes
-            data = self.get_latest_bitcoin_data()
+            if not 0 <= samples <= MAX_UNCERTAINTY_SAMPLES:
+                raise ValueError(f"Le nombre d'échantillons doit être compris entre 0 et {MAX_UNCERTAINTY_SAMPLES}")
+            entry = entry if entry is not None else self.resolve_model(model_name)
+
+            # Récupération des données récentes (à la résolution du modèle)
+            data = self.get_latest_data(self.ticker, entry.resolution)
             if data is None:
                 raise Exception("Impossible de récupérer les données Bitcoin")
-            
+
+            # Les entrées ne changent qu'à la clôture d'une nouvelle bougie:
+            # les requêtes identiques partagent le même calcul
+            cache_key = (entry.identity, data.index[-1], n_days)
+            if samples:
+                cache_key += (samples, budget_ms)
+            return self.cache.get_or_compute(
+                cache_key,
+                lambda: self._compute_prediction(data, n_days, entry, samples=samples, budget_ms=budget_ms),
+                cache_if=lambda result: result["success"],
+            )
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def _compute_prediction(self, data, n_days, entry, samples=0, budget_ms=None):
+        """Calcule la prédiction rolling à partir des données préparées"""
+        try:
             # Préparation des données
-            X_scaled, y_scaled = self.prepare_data_for_prediction(data)
+            X_scaled, y_scaled, scaler_x, scaler_y = self._prepare(data, entry)
             
             # Point de départ: dernière observation
             last_data = X_scaled[-1]
             
             # Prédiction
-            predictions = self.predict_rolling_days(last_data, n_days=30)
-            
-            # Génération des dates
-            start_date = datetime.now()
-            prediction_dates = [
-                (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-                for i in range(1, 31)
-            ]
-            
-            # Calcul du score de confiance (basé sur la variance des prédictions)
-            confidence_score = max(0.1, 1.0 - np.std(predictions) / np.mean(predictions))
-            
-            # Prix actuel et prédit
-            current_price = float(data['Close'].iloc[-1])
-            predicted_price_30d = float(predictions[-1])
-            
-            # Calcul de la variation
-            variation_percent = ((predicted_price_30d - current_price) / current_price) * 100
-            
-            # Recommandation DCA basée sur la prédiction
-            dca_recommendation = self.generate_dca_recommendation(variation_percent)
-            
-            return {
-                "success": True,
-                "current_price": current_price,
-                "predicted_price_30d": predicted_price_30d,
-                "variation_percent": variation_percent,
-                "confidence_score": float(confidence_score),
-                "dca_recommendation": dca_recommendation,
-                "prediction_dates": prediction_dates,
-                "predicted_prices": [float(p) for p in predictions],
-                "model_info": {
-                    "model_type": "LSTM",
-                    "features": ["Close", "Open", "High", "Low", "Volume", "MM_200", "RSI_14"],
-                    "training_period": "1 year",
-                    "mape": 3.14
-                }
-            }
+            predictions = self.predict_rolling_batch(last_data.reshape(1, -1), n_days=n_days, model=entry.model,
+                                                     scalers=(scaler_x, scaler_y))[0]
+
+            paths = None
+            if samples:
+                # Trajectoires stochastiques empilées dans le batch: un appel au modèle par jour
+                x_scale, x_min = scaler_params(scaler_x)
+                y_scale, y_min = scaler_params(scaler_y)
+                with STAGE_DURATION.labels(stage="uncertainty").time():
+                    paths = rollout_mc_dropout(entry.model, last_data, n_days, samples, x_scale, x_min,
+                                               y_scale, y_min,
+                                               budget_s=budget_ms / 1000 if budget_ms is not None else None)
+                MODEL_PREDICT_CALLS.inc(n_days)
+
+            return self._prediction_result(data, predictions, n_days, entry, paths=paths, requested_samples=samples)
             
         except Exception as e:
             logger.error(f"Erreur lors de la prédiction: {e}")
@@ -183,37 +377,392 @@ class BitcoinPredictionService:
                 "error": str(e)
             }
     
-    def generate_dca_recommendation(self, variation_percent):
+    def stream_prediction(self, n_days=30, model_name=None):
+        """Prédiction rolling diffusée jour par jour
+
+        Génère des événements (nom, données): "start" (prix actuel, horizon),
+        un "day" par jour dès que son pas de rollout est calculé, puis "summary"
+        (variation, confiance, recommandation DCA), ou "error". Une prédiction
+        déjà en cache est rejouée sans recalcul.
+        """
+        try:
+            entry = self.resolve_model(model_name)
+            data = self.get_latest_data(self.ticker, entry.resolution)
+            if data is None:
+                raise Exception("Impossible de récupérer les données Bitcoin")
+
+            cache_key = (entry.identity, data.index[-1], n_days)
+            cached = self.cache.get(cache_key)
+            yield "start", {
+                "n_days": n_days,
+                "model_name": entry.name,
+                "current_price": float(data['Close'].iloc[-1]),
+                "last_candle_date": format_candle_date(data.index[-1], entry.resolution),
+                "cached": cached is not None,
+            }
+
+            if cached is not None:
+                result = cached
+                for day, (date, price) in enumerate(zip(result["prediction_dates"], result["predicted_prices"]), 1):
+                    yield "day", {"day": day, "date": date, "price": price}
+            else:
+                X_scaled, _, scaler_x, scaler_y = self._prepare(data, entry)
+                x_scale, x_min = scaler_params(scaler_x)
+                y_scale, y_min = scaler_params(scaler_y)
+
+                dates = horizon_dates(data.index[-1], n_days, entry.resolution)
+                predictions = np.empty(n_days, dtype=np.float64)
+                steps = rollout_steps(entry.model, X_scaled[-1:], n_days, x_scale, x_min, y_scale, y_min)
+                # Étape "rollout": durée des pas calculés, hors attente du client entre deux événements
+                rollout_seconds = 0.0
+                started = time.perf_counter()
+                for day, pred_price in enumerate(steps, 1):
+                    rollout_seconds += time.perf_counter() - started
+                    MODEL_PREDICT_CALLS.inc()
+                    predictions[day - 1] = pred_price[0]
+                    yield "day", {
+                        "day": day,
+                        "date": dates[day - 1],
+                        "price": float(pred_price[0]),
+                    }
+                    started = time.perf_counter()
+                STAGE_DURATION.labels(stage="rollout").observe(rollout_seconds + time.perf_counter() - started)
+                result = self._prediction_result(data, predictions, n_days, entry)
+                self.cache.set(cache_key, result)
+
+            yield "summary", {
+                key: value for key, value in result.items() if key not in ("prediction_dates", "predicted_prices")
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la prédiction diffusée: {e}")
+            yield "error", {
+                "success": False,
+                "error": str(e)
+            }
+
+    def generate_as_of_prediction(self, as_of, n_days=30, model_name=None, as_of_end=None, ticker=None):
+        """Prédiction telle que le modèle l'aurait faite à une date passée, ou pour chaque bougie d'une période
+
+        Les features de chaque date d'ancrage sont recalculées sur les seules
+        bougies connues à cette date (les `history_days` dernières, jusqu'à la
+        bougie de l'ancre incluse, précédées des bougies de chauffe des
+        indicateurs), comme le service en direct ce jour-là:
+        aucune donnée postérieure n'est utilisée. Les bougies sont lues dans
+        l'historique local (store initialisé depuis market_data.csv), par
+        recherche dichotomique sur l'index des dates.
+
+        Sans `as_of_end`, retourne la prédiction de la dernière bougie au plus
+        tard le `as_of`. Avec `as_of_end`, une prédiction par bougie de
+        [as_of, as_of_end]: toutes les ancres avancent ensemble (n_days appels
+        au modèle au total).
+        """
+        entry = self.resolve_model(model_name)
+        store = self.store_for(ticker, entry.resolution)
+        try:
+            start = pd.Timestamp(as_of)
+            end = pd.Timestamp(as_of_end) if as_of_end is not None else start
+        except (TypeError, ValueError):
+            raise ValueError(f"Date as-of invalide: {as_of if as_of_end is None else f'{as_of} / {as_of_end}'}")
+        if end < start:
+            raise ValueError("La fin de la période as-of précède son début")
+
+        stop = store.locate(end)
+        first = stop - 1 if as_of_end is None else store.locate(start, side='left')
+        if stop == 0 or first < 0:
+            raise ValueError(f"Aucune bougie au plus tard le {as_of} dans l'historique local")
+        n_anchors = stop - first
+        if n_anchors == 0:
+            raise ValueError(f"Aucune bougie entre le {as_of} et le {as_of_end} dans l'historique local")
+        if n_anchors > MAX_AS_OF_DATES:
+            raise ValueError(f"Trop de dates as-of: {n_anchors} (maximum {MAX_AS_OF_DATES})")
+
+        with STAGE_DURATION.labels(stage="fetch").time():
+            data = store.load(n_rows=INDICATOR_WARMUP + self.history_days + n_anchors - 1, end=end)
+        # La dernière bougie du store peut encore être réécrite (bougie en cours): son prix fait partie de la clé
+        cache_key = (entry.identity, "as_of", data.index[-n_anchors], data.index[-1], float(data['Close'].iloc[-1]),
+                     n_days)
+        forecasts = self.cache.get_or_compute(cache_key,
+                                              lambda: self._compute_as_of(data, n_anchors, n_days, entry))
+        if as_of_end is None:
+            return forecasts[0]
+        return {
+            "success": True,
+            "model_name": entry.name,
+            "as_of_start": forecasts[0]["as_of"],
+            "as_of_end": forecasts[-1]["as_of"],
+            "n_forecasts": len(forecasts),
+            "model_calls": n_days,
+            "forecasts": forecasts,
+        }
+
+    def _compute_as_of(self, data, n_anchors, n_days, entry):
+        """Features de chaque ancre recalculées sur sa propre fenêtre, puis un rollout batché"""
+        frames = []
+        with STAGE_DURATION.labels(stage="indicators").time():
+            for stop in range(len(data) - n_anchors + 1, len(data) + 1):
+                # Fenêtre du service en direct à cette date: history_days bougies jusqu'à l'ancre,
+                # indicateurs calculés avec leur chauffe (valeurs de l'historique complet)
+                window = data.iloc[max(0, stop - self.history_days - INDICATOR_WARMUP):stop]
+                features = compute_indicators(window)[FEATURES].iloc[-self.history_days:].dropna()
+                if len(features) < 50:
+                    raise ValueError(f"Historique insuffisant au {format_candle_date(window.index[-1], entry.resolution)}: "
+                                     f"{len(features)} bougies exploitables")
+                frames.append(features)
+
+        predictions = self._rollout_frames(frames, n_days, entry)
+        forecasts = []
+        for features, path in zip(frames, predictions):
+            result = self._prediction_result(features, path, n_days, entry, anchored=True)
+            result["as_of"] = format_candle_date(features.index[-1], entry.resolution)
+            forecasts.append(result)
+        return forecasts
+
+    def _prediction_result(self, data, predictions, n_days, entry, paths=None, requested_samples=None, anchored=False):
+        """Met en forme une trajectoire prédite (prix, variation, recommandation DCA)
+
+        `paths` (échantillons, n_days): trajectoires Monte Carlo dropout dont
+        les quantiles forment les bandes d'incertitude. `anchored`: dates
+        prédites à la suite de la dernière bougie (prévision à une date passée).
+        """
+        # Génération des dates
+        prediction_dates = horizon_dates(data.index[-1], n_days, entry.resolution, anchored=anchored)
+        
+        # Calcul du score de confiance (basé sur la variance des prédictions)
+        confidence_score = max(0.1, 1.0 - np.std(predictions) / np.mean(predictions))
+        uncertainty = None
+        if paths is not None:
+            bands = quantile_bands(paths)
+            # Largeur relative de la bande p10-p90 à l'horizon
+            band_width = (bands["p90"][-1] - bands["p10"][-1]) / bands["p50"][-1]
+            confidence_score = max(0.1, 1.0 - band_width)
+            uncertainty = {
+                "method": "mc_dropout",
+                "samples": int(len(paths)),
+                "requested_samples": requested_samples,
+                "relative_band_width": float(band_width),
+                "quantiles": bands,
+            }
+        
+        # Prix actuel et prédit
+        current_price = float(data['Close'].iloc[-1])
+        predicted_price_30d = float(predictions[-1])
+        
+        # Calcul de la variation
+        variation_percent = ((predicted_price_30d - current_price) / current_price) * 100
+        
+        # Recommandation DCA basée sur la prédiction
+        dca_recommendation = self.generate_dca_recommendation(variation_percent, n_days)
+        
+        result = {
+            "success": True,
+            "current_price": current_price,
+            "predicted_price_30d": predicted_price_30d,
+            "variation_percent": variation_percent,
+            "confidence_score": float(confidence_score),
+            "dca_recommendation": dca_recommendation,
+            "prediction_dates": prediction_dates,
+            "predicted_prices": [float(p) for p in predictions],
+            "last_candle_date": format_candle_date(data.index[-1], entry.resolution),
+            "model_info": {
+                "model_type": "LSTM",
+                "model_name": entry.name,
+                "features": entry.features,
+                "resolution": entry.resolution,
+                "training_period": "1 year",
+                "mape": entry.metadata.get("mape_30d", 3.14)
+            }
+        }
+        if uncertainty is not None:
+            result["uncertainty"] = uncertainty
+        return result
+
+    def _build_scenarios(self, data, scenarios, default_days):
+        """Construit les points de départ (non normalisés) et horizons de chaque scénario"""
+        rows, horizons, anchors = [], [], []
+        for i, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict):
+                raise ValueError(f"Scénario {i}: objet JSON attendu")
+
+            # Date d'ancrage: dernière bougie disponible à cette date (dernière bougie par défaut)
+            anchor_date = scenario.get("anchor_date")
+            if anchor_date is None:
+                position = len(data) - 1
+            else:
+                position = int(data.index.searchsorted(pd.Timestamp(anchor_date), side='right')) - 1
+                if position < 0:
+                    raise ValueError(f"Scénario {i}: date d'ancrage {anchor_date} antérieure aux données disponibles")
+
+            n_days = int(scenario.get("days", default_days))
+            if not 1 <= n_days <= 365:
+                raise ValueError(f"Scénario {i}: l'horizon doit être compris entre 1 et 365 jours")
+
+            row = data.iloc[position].copy()
+            # Scénarios what-if: valeurs imposées puis chocs multiplicatifs sur les features
+            for feature, value in (scenario.get("overrides") or {}).items():
+                if feature not in row.index:
+                    raise ValueError(f"Scénario {i}: feature inconnue '{feature}'")
+                row[feature] = float(value)
+            for feature, factor in (scenario.get("shocks") or {}).items():
+                if feature not in row.index:
+                    raise ValueError(f"Scénario {i}: feature inconnue '{feature}'")
+                row[feature] *= float(factor)
+
+            rows.append(row.values)
+            horizons.append(n_days)
+            anchors.append(data.index[position])
+        return np.array(rows, dtype=np.float64), horizons, anchors
+
+    def generate_batch_prediction(self, scenarios, default_days=30, model_name=None):
+        """Prédictions rolling pour plusieurs dates d'ancrage, horizons ou scénarios what-if
+
+        Tous les scénarios avancent ensemble: le nombre d'appels au modèle est
+        égal à l'horizon maximal, pas au nombre de scénarios.
+        """
+        if not scenarios:
+            raise ValueError("Aucun scénario fourni")
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            raise ValueError(f"Trop de scénarios: {len(scenarios)} (maximum {MAX_BATCH_SCENARIOS})")
+
+        entry = self.resolve_model(model_name)
+        data = self.get_latest_data(self.ticker, entry.resolution)
+        if data is None:
+            raise Exception("Impossible de récupérer les données Bitcoin")
+
+        rows, horizons, anchors = self._build_scenarios(data[entry.features], scenarios, default_days)
+        _, _, scaler_x, scaler_y = self._prepare(data, entry)
+        initial_batch = scaler_x.transform(rows)
+        max_days = max(horizons)
+        predictions = self.predict_rolling_batch(initial_batch, n_days=max_days, model=entry.model,
+                                                 scalers=(scaler_x, scaler_y))
+
+        results = []
+        for i, (scenario, n_days, anchor) in enumerate(zip(scenarios, horizons, anchors)):
+            path = predictions[i, :n_days]
+            current_price = float(rows[i, 0])
+            variation_percent = (float(path[-1]) - current_price) / current_price * 100
+            results.append({
+                "id": scenario.get("id", i),
+                "anchor_date": format_candle_date(anchor, entry.resolution),
+                "current_price": current_price,
+                "predicted_price": float(path[-1]),
+                "variation_percent": variation_percent,
+                "dca_recommendation": self.generate_dca_recommendation(variation_percent, n_days),
+                "prediction_dates": [
+                    format_candle_date(anchor + d * resolution_step(entry.resolution), entry.resolution)
+                    for d in range(1, n_days + 1)
+                ],
+                "predicted_prices": [float(p) for p in path],
+            })
+
+        return {
+            "success": True,
+            "model_name": entry.name,
+            "n_scenarios": len(results),
+            "model_calls": max_days,
+            "scenarios": results,
+        }
+
+    def generate_multi_asset_prediction(self, tickers, n_days=30, model_name=None):
+        """Prédictions rolling pour plusieurs actifs (ex: BTC-USD, ETH-USD, SOL-USD)
+
+        Les données des actifs sont récupérées en parallèle, puis toutes les
+        trajectoires avancent ensemble (n_days appels au modèle au total),
+        chaque actif gardant ses propres scalers.
+        """
+        tickers = list(dict.fromkeys(str(ticker).strip().upper() for ticker in tickers if str(ticker).strip()))
+        if not tickers:
+            raise ValueError("Aucun actif fourni")
+        if len(tickers) > MAX_TICKERS:
+            raise ValueError(f"Trop d'actifs: {len(tickers)} (maximum {MAX_TICKERS})")
+        invalid = [ticker for ticker in tickers if not TICKER_PATTERN.match(ticker)]
+        if invalid:
+            raise ValueError(f"Symboles invalides: {', '.join(invalid)}")
+        if not 1 <= n_days <= 365:
+            raise ValueError("L'horizon doit être compris entre 1 et 365 jours")
+
+        entry = self.resolve_model(model_name)
+        datasets = self.fetch_latest_data(tickers, entry.resolution)
+        available = [ticker for ticker in tickers if datasets[ticker] is not None]
+        if not available:
+            raise Exception("Impossible de récupérer les données des actifs demandés")
+
+        # Même principe que generate_prediction: recalcul uniquement à la clôture d'une nouvelle bougie
+        cache_key = (entry.identity, tuple((ticker, datasets[ticker].index[-1]) for ticker in available), n_days)
+        assets = self.cache.get_or_compute(
+            cache_key,
+            lambda: self._compute_multi_asset(datasets, available, n_days, entry),
+        )
+
+        return {
+            "success": True,
+            "model_name": entry.name,
+            "n_assets": len(available),
+            "model_calls": n_days,
+            "assets": assets,
+            "errors": {
+                ticker: "Impossible de récupérer les données" for ticker in tickers if datasets[ticker] is None
+            },
+        }
+
+    def _compute_multi_asset(self, datasets, tickers, n_days, entry):
+        """Rollout batché: une ligne par actif, avec les scalers propres à chaque actif"""
+        predictions = self._rollout_frames([datasets[ticker] for ticker in tickers], n_days, entry)
+        return {
+            ticker: self._prediction_result(datasets[ticker], predictions[i], n_days, entry)
+            for i, ticker in enumerate(tickers)
+        }
+
+    def _rollout_frames(self, frames, n_days, entry):
+        """Rollout batché depuis la dernière observation de chaque jeu de données, chacun avec ses propres scalers"""
+        rows, x_scales, x_mins, y_scales, y_mins = [], [], [], [], []
+        for frame in frames:
+            X_scaled, _, scaler_x, scaler_y = self._prepare(frame, entry)
+            rows.append(X_scaled[-1])
+            x_scale, x_min = scaler_params(scaler_x)
+            y_scale, y_min = scaler_params(scaler_y)
+            x_scales.append(x_scale)
+            x_mins.append(x_min)
+            y_scales.append(y_scale)
+            y_mins.append(y_min)
+
+        with STAGE_DURATION.labels(stage="rollout").time():
+            predictions = rollout_batch(entry.model, np.array(rows), n_days, np.array(x_scales), np.array(x_mins),
+                                        np.concatenate(y_scales), np.concatenate(y_mins))
+        MODEL_PREDICT_CALLS.inc(n_days)
+        return predictions
+
+    def generate_dca_recommendation(self, variation_percent, n_days=30):
         """Génère une recommandation DCA basée sur la variation prédite"""
         if variation_percent > 10:
             return {
                 "action": "increase",
                 "message": "Augmenter les achats DCA - Hausse significative prédite",
-                "reason": f"Prédiction: +{variation_percent:.1f}% en 30 jours"
+                "reason": f"Prédiction: +{variation_percent:.1f}% en {n_days} jours"
             }
         elif variation_percent > 5:
             return {
                 "action": "maintain",
                 "message": "Maintenir le DCA actuel - Hausse modérée prédite",
-                "reason": f"Prédiction: +{variation_percent:.1f}% en 30 jours"
+                "reason": f"Prédiction: +{variation_percent:.1f}% en {n_days} jours"
             }
         elif variation_percent > -5:
             return {
                 "action": "maintain",
                 "message": "Maintenir le DCA actuel - Stabilité relative prédite",
-                "reason": f"Prédiction: {variation_percent:.1f}% en 30 jours"
+                "reason": f"Prédiction: {variation_percent:.1f}% en {n_days} jours"
             }
         elif variation_percent > -10:
             return {
                 "action": "reduce",
                 "message": "Réduire légèrement le DCA - Baisse modérée prédite",
-                "reason": f"Prédiction: {variation_percent:.1f}% en 30 jours"
+                "reason": f"Prédiction: {variation_percent:.1f}% en {n_days} jours"
             }
         else:
             return {
                 "action": "reduce",
                 "message": "Réduire significativement le DCA - Baisse importante prédite",
-                "reason": f"Prédiction: {variation_percent:.1f}% en 30 jours"
+                "reason": f"Prédiction: {variation_percent:.1f}% en {n_days} jours"
             }
     
     def get_model_status(self):
@@ -221,10 +770,18 @@ class BitcoinPredictionService:
         return {
             "model_loaded": self.model is not None,
             "model_path": self.model_path,
+            "default_model": self.default_model,
             "model_type": "LSTM",
-            "features": ["Close", "Open", "High", "Low", "Volume", "MM_200", "RSI_14"],
+            "backend": self.backend,
+            "quantization": self.quantization,
+            "features": self.features,
+            "frozen_scalers": self.frozen_scalers,
             "performance": {
                 "mape_30d": 3.14,
                 "horizon": "30 days rolling prediction"
-            }
-        } 
\ No newline at end of file
+            },
+            "ticker": self.ticker,
+            "tickers": sorted(self.stores),
+            "registry": self.registry.status(),
+            "cache": self.cache.stats()
+        }
@@ -0,0 +1,156 @@
+"""
+Export quantifié des modèles (poids float16 ou int8) et rapport de précision
+
+Les poids LSTM/Dense sont quantifiés dans le format bundle .npz servi par le
+moteur NumPy (sans TensorFlow): float16 (2 octets par poids) ou int8 avec une
+échelle par colonne de sortie (1 octet par poids). Le biais reste en float32.
+Le rapport compare le MAPE walk-forward de chaque variante à celui du modèle
+float32 sur market_data.csv.
+
+Usage:
+    PYTHONPATH=app/backend python -m services.quantization model/model_btc_rolling_30d_1y.npz --mode float16 int8 --csv market_data.csv
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.numpy_lstm import NumpyLSTMModel
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ('float16', 'int8')
+QUANTIZED_KEYS = ("kernel", "recurrent_kernel")
+
+
+def quantize_weights(weights, mode):
+    """Quantifie une matrice de poids: (poids, échelles par colonne ou None)"""
+    weights = np.asarray(weights, dtype=np.float32)
+    if mode == 'float16':
+        return weights.astype(np.float16), None
+    if mode == 'int8':
+        # Quantification symétrique par colonne de sortie: W ≈ q * scale, q dans [-127, 127]
+        scale = np.abs(weights).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        quantized = np.clip(np.rint(weights / scale), -127, 127).astype(np.int8)
+        return quantized, scale.astype(np.float32)
+    raise ValueError(f"Quantification inconnue: {mode} (choix: {', '.join(QUANTIZATION_MODES)})")
+
+
+def quantize_model(model, mode):
+    """Copie d'un NumpyLSTMModel float32 avec les matrices de poids quantifiées"""
+    if model.quantization != 'float32':
+        raise ValueError(f"Modèle déjà quantifié ({model.quantization})")
+    layers = []
+    for layer in model.layers:
+        layer = dict(layer)
+        for key in QUANTIZED_KEYS:
+            if key in layer:
+                layer[key], scale = quantize_weights(layer[key], mode)
+                if scale is not None:
+                    layer[f"{key}_scale"] = scale
+        layers.append(layer)
+    return NumpyLSTMModel(layers, dtype=model.dtype)
+
+
+def load_source(path):
+    """Modèle float32, scalers (ou None) et features d'un .h5 ou d'un bundle .npz"""
+    from services.model_bundle import load_bundle
+    from services.model_registry import FEATURES_BY_INPUT_DIM
+
+    if path.endswith('.npz'):
+        bundle = load_bundle(path, mmap=False)
+        return bundle.model, bundle.scaler_x, bundle.scaler_y, bundle.features, bundle.metadata
+    model = NumpyLSTMModel.from_h5(path)
+    if model.input_dim not in FEATURES_BY_INPUT_DIM:
+        raise ValueError(f"Dimension d'entrée non reconnue pour {path}: {model.input_dim}")
+    return model, None, None, FEATURES_BY_INPUT_DIM[model.input_dim], {"source_model": os.path.basename(path)}
+
+
+def quantized_path(path, mode):
+    return f"{os.path.splitext(path)[0]}.{mode}.npz"
+
+
+def export_quantized(path, mode, output=None):
+    """Écrit la variante quantifiée d'un modèle .h5 ou .npz (scalers d'un bundle conservés)"""
+    from services.model_bundle import save_bundle
+
+    model, scaler_x, scaler_y, features, metadata = load_source(path)
+    output = output or quantized_path(path, mode)
+    save_bundle(output, quantize_model(model, mode), scaler_x, scaler_y, features,
+                metadata={**metadata, "quantization": mode, "quantized_from": os.path.basename(path)})
+    return output
+
+
+def step_latency(model, repeats=500):
+    """Durée médiane d'un pas de predict (batch 1, comme un jour de rollout)"""
+    x = np.zeros((1, 1, model.input_dim))
+    model.predict(x)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(x)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def accuracy_report(reference_path, variants, csv_path='market_data.csv', n_days=30):
+    """Compare chaque variante au modèle float32: MAPE walk-forward, écart des prédictions, taille, latence
+
+    `variants`: {nom: chemin du modèle}; le modèle de référence est ajouté
+    sous le nom "float32".
+    """
+    from services.backtest import _load_model, load_history, walk_forward
+
+    paths = {"float32": reference_path, **variants}
+    history = load_history(csv_path)
+    rows, reference = [], None
+    for name, path in paths.items():
+        model = _load_model(path, 'numpy')
+        result = walk_forward(history, model_path=path, n_days=n_days, workers=1)
+        if reference is None:
+            reference = result["predictions"]
+        deviation = np.abs(result["predictions"] - reference) / reference * 100
+        rows.append({
+            "Format": name,
+            "Fichier": os.path.basename(path),
+            "Poids_Ko": round(model.nbytes / 1024, 1),
+            "Fichier_Ko": round(os.path.getsize(path) / 1024, 1),
+            "MAPE_1d": float(result["mape_per_day"][0]),
+            f"MAPE_{n_days}d": float(result["mape_per_anchor"].mean()),
+            "Ecart_max_%": float(deviation.max()),
+            "Pas_ms": step_latency(model) * 1e3,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quantifié (float16 / int8) et rapport de précision")
+    parser.add_argument('model', help="Modèle source (.h5 ou bundle .npz float32)")
+    parser.add_argument('--mode', nargs='+', choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+    parser.add_argument('--csv', default='market_data.csv', help="Historique du rapport de précision")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--report', default=None, help="Fichier CSV où enregistrer le rapport")
+    args = parser.parse_args()
+
+    variants = {}
+    for mode in args.mode:
+        variants[mode] = export_quantized(args.model, mode)
+        print(f"Modèle {mode} exporté: {variants[mode]}")
+
+    report = accuracy_report(args.model, variants, csv_path=args.csv, n_days=args.days)
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    if args.report:
+        report.to_csv(args.report, index=False)
+        print(f"Rapport enregistré: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+
+from services.numpy_lstm import NumpyLSTMModel
+
+# Quantiles publiés pour les bandes d'incertitude
+QUANTILES = {"p10": 10, "p50": 50, "p90": 90}
+
+
+def scaler_params(scaler):
+    """Paramètres (scale_, min_) d'un MinMaxScaler: X_scaled = X * scale_ + min_"""
+    return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+
+
+def rollout_steps(model, initial_scaled, n_days, x_scale, x_min, y_scale, y_min, close_index=0):
+    """Prédiction rolling pas à pas: génère le prix prédit (batch,) de chaque jour dès qu'il est calculé
+
+    Mêmes paramètres que `rollout_batch`; permet de diffuser chaque jour
+    sans attendre la fin de l'horizon.
+    """
+    current = np.array(initial_scaled, dtype=np.float64, ndmin=2)
+    batch = current.shape[0]
+    x_scale = np.broadcast_to(np.asarray(x_scale, dtype=np.float64), current.shape)
+    x_min = np.broadcast_to(np.asarray(x_min, dtype=np.float64), current.shape)
+    y_scale = np.broadcast_to(np.asarray(y_scale, dtype=np.float64).reshape(-1), (batch,))
+    y_min = np.broadcast_to(np.asarray(y_min, dtype=np.float64).reshape(-1), (batch,))
+
+    for _ in range(n_days):
+        # Prédiction du prix de clôture du jour suivant pour tout le batch
+        pred_scaled = np.asarray(model.predict(current[:, np.newaxis, :], verbose=0), dtype=np.float64).reshape(batch)
+        pred_price = (pred_scaled - y_min) / y_scale
+        yield pred_price
+
+        # Mise à jour: Close = prédiction (re-normalisée), on garde les autres features
+        current[:, close_index] = pred_price * x_scale[:, close_index] + x_min[:, close_index]
+
+
+def rollout_batch(model, initial_scaled, n_days, x_scale, x_min, y_scale, y_min, close_index=0):
+    """Prédiction rolling vectorisée pour un batch de points de départ
+
+    Tous les scénarios avancent ensemble: un seul appel au modèle par jour
+    avec un tenseur (batch, 1, features), quel que soit le nombre de scénarios.
+
+    - initial_scaled: (batch, features), données normalisées de départ
+    - x_scale, x_min: paramètres du scaler des features, (features,) ou (batch, features)
+    - y_scale, y_min: paramètres du scaler de la cible, scalaires ou (batch,)
+
+    Comme dans `predict_rolling_days`, seul le Close est remplacé par la
+    prédiction; les autres features restent constantes.
+    """
+    batch = np.array(initial_scaled, ndmin=2).shape[0]
+    predictions = np.empty((batch, n_days), dtype=np.float64)
+    steps = rollout_steps(model, initial_scaled, n_days, x_scale, x_min, y_scale, y_min, close_index)
+    for day, pred_price in enumerate(steps):
+        predictions[:, day] = pred_price
+    return predictions
+
+
+class MCDropoutModel:
+    """Modèle dont `predict` garde le dropout actif (Monte Carlo dropout)
+
+    Chaque ligne du batch reçoit ses propres masques: N échantillons empilés
+    dans la dimension batch coûtent un seul appel au modèle par pas.
+    """
+
+    def __init__(self, model, seed=None):
+        self.model = model
+        self.rng = np.random.default_rng(seed)
+
+    def predict(self, x, verbose=0):
+        if isinstance(self.model, NumpyLSTMModel):
+            return self.model.predict(x, training=True, rng=self.rng)
+        # Keras (éventuellement derrière ThreadSafeModel): appel direct en mode entraînement
+        return np.asarray(self.model(x, training=True))
+
+
+def rollout_mc_dropout(model, initial_scaled, n_days, n_samples, x_scale, x_min, y_scale, y_min,
+                       close_index=0, seed=None, budget_s=None, min_samples=20, clock=time.perf_counter):
+    """Trajectoires rolling stochastiques (dropout actif) depuis un même point de départ
+
+    Retourne un tableau (échantillons, n_days). Avec `budget_s`, la durée
+    totale est extrapolée après chaque pas: si elle dépasse le budget, les
+    trajectoires en trop sont abandonnées (au moins `min_samples` gardées);
+    les trajectoires restantes sont complètes et restent des tirages
+    indépendants.
+    """
+    current = np.repeat(np.array(initial_scaled, dtype=np.float64, ndmin=2)[:1], n_samples, axis=0)
+    x_scale = np.asarray(x_scale, dtype=np.float64).reshape(-1)
+    x_min = np.asarray(x_min, dtype=np.float64).reshape(-1)
+    y_scale, y_min = float(np.asarray(y_scale).reshape(-1)[0]), float(np.asarray(y_min).reshape(-1)[0])
+    stochastic = MCDropoutModel(model, seed=seed)
+    paths = np.empty((n_samples, n_days), dtype=np.float64)
+
+    start = clock()
+    for day in range(n_days):
+        batch = current.shape[0]
+        pred_scaled = np.asarray(stochastic.predict(current[:, np.newaxis, :]), dtype=np.float64).reshape(batch)
+        pred_price = (pred_scaled - y_min) / y_scale
+        paths[:batch, day] = pred_price
+        current[:, close_index] = pred_price * x_scale[close_index] + x_min[close_index]
+
+        if budget_s is not None and day + 1 < n_days:
+            projected = (clock() - start) / (day + 1) * n_days
+            if projected > budget_s:
+                keep = max(min(min_samples, batch), int(batch * budget_s / projected))
+                current = current[:keep]
+    return paths[:current.shape[0]]
+
+
+def quantile_bands(paths):
+    """Quantiles par jour d'horizon des trajectoires (échantillons, n_days)"""
+    values = np.percentile(paths, list(QUANTILES.values()), axis=0)
+    return {name: [float(v) for v in row] for name, row in zip(QUANTILES, values)}
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from services.metrics import STARTUP_PHASE_SECONDS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# États successifs du démarrage
+STARTING, READY, FAILED = "starting", "ready", "failed"
+
+
+class StartupReport:
+    """Durées des phases de démarrage (imports, chargement du modèle, première inférence) et état de préparation"""
+
+    def __init__(self, started_at=None):
+        # started_at (time.perf_counter) permet d'inclure les imports faits avant la création du rapport
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.state = STARTING
+        self.error = None
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = round(seconds, 3)
+        STARTUP_PHASE_SECONDS.labels(phase=name).set(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Chronomètre une phase du démarrage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def mark_ready(self):
+        with self._lock:
+            self.state = READY
+            self.phases["total"] = round(time.perf_counter() - self.started_at, 3)
+        logger.info(f"Service prêt: {self.summary()}")
+
+    def mark_failed(self, error):
+        with self._lock:
+            self.state = FAILED
+            self.error = str(error)
+        logger.error(f"Échec du démarrage du service: {error}")
+
+    def summary(self):
+        with self._lock:
+            return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "error": self.error,
+                "phases_seconds": dict(self.phases),
+            }
+
+
+def warm_up(service, report, warm_forecast=True):
+    """Charge le modèle par défaut puis calcule une première prédiction (qui remplit aussi le cache)"""
+    try:
+        with report.phase("model_load"):
+            if not service.load_model():
+                raise RuntimeError(f"Chargement du modèle impossible: {service.model_path}")
+
+        if warm_forecast:
+            with report.phase("first_inference"):
+                result = service.generate_prediction()
+            if not result["success"]:
+                # Le modèle est chargé: une source de données indisponible ne bloque pas la préparation
+                logger.warning(f"Prédiction de préchauffage échouée: {result['error']}")
+
+        report.mark_ready()
+    except Exception as e:
+        report.mark_failed(e)
+
+
+def start_warmup(service, report, warm_forecast=True):
+    """Lance le préchauffage en arrière-plan pour que le serveur écoute immédiatement"""
+    thread = threading.Thread(target=warm_up, args=(service, report, warm_forecast),
+                              name="model-warmup", daemon=True)
+    thread.start()
+    return thread
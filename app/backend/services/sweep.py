@@ -0,0 +1,325 @@
+"""
+Sweep d'hyperparamètres parallèle et reprenable
+
+Entraîne les configurations d'une grille ou d'un tirage aléatoire
+(pipeline, fenêtre, batch size, epochs, unités, période) sur un pool de
+processus, les threads CPU étant répartis entre les workers. Chaque essai
+terminé est ajouté immédiatement au fichier de résultats (colonnes de
+resultats_tests_lstm_complets.csv + colonnes du sweep): un sweep
+interrompu reprend là où il s'était arrêté. Les essais dont la val_loss
+est moins bonne que la médiane des essais déjà terminés au même epoch
+sont arrêtés tôt (élagage médian).
+
+Spécification (JSON):
+    {"mode": "grid", "params": {"pipeline": ["rolling"], "lookback": [1, 7, 30], "batch_size": [16, 32]}}
+    {"mode": "random", "n_trials": 200, "seed": 0,
+     "params": {"lookback": {"low": 1, "high": 120}, "batch_size": [16, 32, 64], "units": [50, 100]}}
+
+Usage:
+    PYTHONPATH=app/backend python -m services.sweep sweep.json --csv market_data.csv --workers 4 --results sweep_results.csv
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from services.backtest import RESULTS_COLUMNS
+from services.training import PIPELINES, limit_threads, load_pipeline_data, train_pipeline
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Valeurs par défaut d'un essai (celles du notebook)
+DEFAULT_PARAMS = {
+    'pipeline': 'rolling',
+    'lookback': 1,
+    'batch_size': 32,
+    'epochs': 100,
+    'units': 100,
+    'patience': 5,
+    'period': None,
+}
+SWEEP_COLUMNS = RESULTS_COLUMNS + ['Trial', 'Statut', 'Val_loss', 'Courbe_val_loss', 'Durée_s', 'Paramètres']
+
+# Statuts enregistrés; seuls les essais en échec sont relancés à la reprise
+COMPLETED, PRUNED, FAILED = 'completed', 'pruned', 'failed'
+
+
+# ----------------------------------------------------------------------
+# Spécification des essais
+# ----------------------------------------------------------------------
+def trial_id(params):
+    """Identifiant stable d'une configuration (indépendant de l'ordre des paramètres)"""
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _sample(rng, values):
+    if isinstance(values, dict):
+        low, high = values['low'], values['high']
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return rng.uniform(low, high)
+    return rng.choice(list(values))
+
+
+def expand_spec(spec):
+    """Liste des configurations (avec les valeurs par défaut) d'une spécification grid ou random, sans doublon"""
+    params = spec.get('params', {})
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+
+    mode = spec.get('mode', 'grid')
+    if mode == 'grid':
+        names = list(params)
+        combos = [dict(zip(names, values)) for values in itertools.product(*(params[name] for name in names))]
+    elif mode == 'random':
+        rng = random.Random(spec.get('seed', 0))
+        combos = [{name: _sample(rng, values) for name, values in params.items()}
+                  for _ in range(spec['n_trials'])]
+    else:
+        raise ValueError(f"Mode de sweep inconnu: {mode}")
+
+    trials, seen = [], set()
+    for combo in combos:
+        trial = {**DEFAULT_PARAMS, **combo}
+        key = trial_id(trial)
+        if key not in seen:
+            seen.add(key)
+            trials.append(trial)
+    return trials
+
+
+# ----------------------------------------------------------------------
+# Élagage médian
+# ----------------------------------------------------------------------
+class MedianPruner:
+    """Arrête un essai dont la meilleure val_loss est pire que la médiane des essais de référence au même epoch
+
+    Les courbes de référence sont les val_loss par epoch des essais déjà
+    terminés. L'élagage ne s'applique qu'après `warmup_epochs` epochs et
+    avec au moins `min_trials` courbes de référence.
+    """
+
+    def __init__(self, reference_curves, warmup_epochs=3, min_trials=5):
+        # Meilleure valeur atteinte jusqu'à chaque epoch (un essai arrêté garde sa dernière meilleure valeur)
+        self.references = [np.minimum.accumulate(curve) for curve in reference_curves if len(curve)]
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def should_prune(self, epoch, best_value):
+        """`epoch` compté à partir de 0, `best_value` meilleure val_loss de l'essai jusqu'à cet epoch"""
+        if epoch + 1 < self.warmup_epochs or len(self.references) < self.min_trials:
+            return False
+        values = [curve[min(epoch, len(curve) - 1)] for curve in self.references]
+        return best_value > float(np.median(values))
+
+
+def pruning_callback(pruner):
+    """Callback Keras qui arrête l'entraînement quand `pruner` le demande"""
+    from keras.callbacks import Callback
+
+    class PruningCallback(Callback):
+        def __init__(self):
+            super().__init__()
+            self.best = float('inf')
+            self.pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            value = (logs or {}).get('val_loss')
+            if value is None:
+                return
+            self.best = min(self.best, value)
+            if pruner.should_prune(epoch, self.best):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return PruningCallback()
+
+
+# ----------------------------------------------------------------------
+# Workers
+# ----------------------------------------------------------------------
+# Données chargées une seule fois par processus du pool
+_worker_data = {}
+
+
+def _load_data(pipeline, csv_path, period):
+    key = (pipeline, csv_path, period)
+    if key not in _worker_data:
+        _worker_data[key] = load_pipeline_data(pipeline, csv_path=csv_path, period=period)
+    return _worker_data[key]
+
+
+def run_trial(params, csv_path=None, reference_curves=(), warmup_epochs=3, min_trials=5, sweep_name='sweep'):
+    """Entraîne une configuration et retourne sa ligne de résultats (jamais d'exception)"""
+    started = time.perf_counter()
+    key = trial_id(params)
+    row = {
+        'Pipeline': PIPELINES.get(params['pipeline'], {}).get('pipeline', params['pipeline']),
+        'Features': ', '.join(PIPELINES.get(params['pipeline'], {}).get('features', [])),
+        'Window': params['lookback'],
+        'Batch_size': params['batch_size'],
+        'Epochs': params['epochs'],
+        'Période': params['period'] or PIPELINES.get(params['pipeline'], {}).get('period'),
+        'MAPE_1d': None,
+        'MAPE_30d': None,
+        'Commentaires': f"{sweep_name} {key}",
+        'Trial': key,
+        'Paramètres': json.dumps(params, sort_keys=True),
+    }
+    try:
+        data = _load_data(params['pipeline'], csv_path, params['period'])
+        callback = pruning_callback(MedianPruner(reference_curves, warmup_epochs=warmup_epochs, min_trials=min_trials))
+        result = train_pipeline(params['pipeline'], data=data, lookback=params['lookback'], epochs=params['epochs'],
+                                batch_size=params['batch_size'], patience=params['patience'], units=params['units'],
+                                callbacks=[callback], verbose=0)
+        val_losses = [float(value) for value in result['history'].get('val_loss', [])]
+        row.update({
+            'Epochs': result['metadata']['epochs'],
+            'Période': result['metadata']['period'],
+            'MAPE_1d': result['mape_1d'],
+            'Statut': PRUNED if callback.pruned_at else COMPLETED,
+            'Val_loss': min(val_losses) if val_losses else None,
+            'Courbe_val_loss': json.dumps(val_losses),
+        })
+        if callback.pruned_at:
+            row['Commentaires'] += f" (élagué à l'epoch {callback.pruned_at})"
+    except Exception as e:
+        row.update({'Statut': FAILED, 'Courbe_val_loss': '[]', 'Commentaires': f"{row['Commentaires']} échec: {e}"})
+    row['Durée_s'] = round(time.perf_counter() - started, 2)
+    return row
+
+
+# ----------------------------------------------------------------------
+# Stockage des résultats
+# ----------------------------------------------------------------------
+class SweepStore:
+    """Fichier CSV des essais terminés, complété ligne par ligne (reprise après interruption)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return pd.DataFrame(columns=SWEEP_COLUMNS)
+        return pd.read_csv(self.path, dtype={'Trial': str})
+
+    def done(self):
+        """Identifiants des essais à ne pas relancer (terminés ou élagués)"""
+        results = self.load()
+        return set(results.loc[results['Statut'].isin([COMPLETED, PRUNED]), 'Trial'])
+
+    def curves(self):
+        """Courbes de val_loss des essais terminés (références de l'élagage)"""
+        results = self.load()
+        completed = results.loc[results['Statut'] == COMPLETED, 'Courbe_val_loss']
+        return [json.loads(curve) for curve in completed if isinstance(curve, str)]
+
+    def append(self, row):
+        header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            pd.DataFrame([row], columns=SWEEP_COLUMNS).to_csv(f, header=header, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# ----------------------------------------------------------------------
+# Exécution
+# ----------------------------------------------------------------------
+def run_sweep(spec, results_path, csv_path=None, workers=None, threads_per_worker=None,
+              warmup_epochs=3, min_trials=5, sweep_name=None):
+    """Exécute les essais de `spec` non encore présents dans `results_path`
+
+    Les essais sont soumis au fur et à mesure (au plus `workers` en cours)
+    pour que l'élagage s'appuie sur les courbes des derniers essais terminés.
+    Retourne le nombre d'essais exécutés.
+    """
+    store = SweepStore(results_path)
+    done = store.done()
+    pending = [trial for trial in expand_spec(spec) if trial_id(trial) not in done]
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    sweep_name = sweep_name or spec.get('name', 'sweep')
+    logger.info(f"Sweep {sweep_name}: {len(pending)} essai(s) à exécuter ({len(done)} déjà terminé(s)), "
+                f"{workers} worker(s) x {threads} thread(s)")
+    if not pending:
+        return 0
+
+    curves = store.curves()
+    executed = 0
+    # spawn: TensorFlow ne supporte pas le fork d'un processus où il serait déjà initialisé
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=limit_threads, initargs=(threads,)) as pool:
+        queue = iter(pending)
+        running = set()
+
+        def submit_next():
+            trial = next(queue, None)
+            if trial is not None:
+                running.add(pool.submit(run_trial, trial, csv_path, list(curves), warmup_epochs, min_trials,
+                                        sweep_name))
+
+        for _ in range(workers):
+            submit_next()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.discard(future)
+                row = future.result()
+                store.append(row)
+                executed += 1
+                if row['Statut'] == COMPLETED:
+                    curves.append(json.loads(row['Courbe_val_loss']))
+                logger.info(f"[{executed}/{len(pending)}] {row['Trial']} {row['Statut']} "
+                            f"MAPE_1d={row['MAPE_1d']} ({row['Durée_s']}s)")
+                submit_next()
+    return executed
+
+
+def best_trials(results_path, top=10):
+    """Meilleurs essais terminés par MAPE à 1 jour"""
+    results = SweepStore(results_path).load()
+    completed = results[results['Statut'] == COMPLETED]
+    return completed.sort_values('MAPE_1d').head(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep d'hyperparamètres parallèle et reprenable")
+    parser.add_argument('spec', help="Spécification JSON (mode grid ou random)")
+    parser.add_argument('--csv', default=None, help="Historique local (défaut: yfinance sur la période de l'essai)")
+    parser.add_argument('--results', default='sweep_results.csv', help="Fichier des essais (repris s'il existe)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--threads-per-worker', type=int, default=None)
+    parser.add_argument('--warmup-epochs', type=int, default=3, help="Epochs avant de pouvoir élaguer un essai")
+    parser.add_argument('--min-trials', type=int, default=5, help="Essais terminés nécessaires à l'élagage")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    name = spec.get('name') or os.path.splitext(os.path.basename(args.spec))[0]
+    run_sweep(spec, args.results, csv_path=args.csv, workers=args.workers,
+              threads_per_worker=args.threads_per_worker, warmup_epochs=args.warmup_epochs,
+              min_trials=args.min_trials, sweep_name=name)
+    columns = ['Trial', 'Pipeline', 'Window', 'Batch_size', 'Epochs', 'Période', 'MAPE_1d', 'Val_loss']
+    print(best_trials(args.results, top=args.top)[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
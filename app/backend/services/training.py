@@ -0,0 +1,352 @@
+"""
+Entraînement des modèles LSTM (pipelines du notebook) avec fenêtres glissantes
+
+Les trois pipelines de Prediction.ipynb (Close seul, OHLCV, 7 features
+rolling) sont repris ici avec une fenêtre d'historique (`lookback`) de
+longueur quelconque. Les échantillons (lookback, features) sont des vues
+strided sur le tableau normalisé (aucune copie) et sont fournis à Keras
+batch par batch via une `keras.utils.Sequence`.
+
+Usage:
+    PYTHONPATH=app/backend python -m services.training --pipeline rolling --csv market_data.csv --lookback 30
+"""
+
+import argparse
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from services.backtest import RESULTS_COLUMNS
+from services.candle_store import RESOLUTIONS, YFinanceSource
+from services.indicators import compute_indicators
+from services.intraday import IntradayYFinanceSource, period_offset, resample_ohlcv
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Modèles entraînés en ligne de commande, hors des dossiers découverts par le registre (model/, app/models/)
+EXPERIMENTS_DIRECTORY = os.path.join('model', 'experiments')
+
+# Pipelines du notebook: features, période d'historique et nom du modèle sauvegardé
+PIPELINES = {
+    'close': {
+        'features': ['Close'],
+        'period': '4y',
+        'pipeline': 'LSTM',
+        'model_file': 'model_btc_close_only_4y.h5',
+    },
+    'ohlcv': {
+        'features': ['Close', 'Open', 'High', 'Low', 'Volume'],
+        'period': '4y',
+        'pipeline': 'LSTM',
+        'model_file': 'model_btc_ohlcv_4y.h5',
+    },
+    'rolling': {
+        'features': ['Close', 'Open', 'High', 'Low', 'Volume', 'MM_200', 'RSI_14'],
+        'period': '1y',
+        'pipeline': 'LSTM Rolling',
+        'model_file': 'model_btc_rolling_30d_1y.h5',
+    },
+}
+
+
+def calculate_mape(actual, forecast):
+    """MAPE en % (valeurs réelles nulles ignorées), comme dans le notebook"""
+    actual, forecast = np.asarray(actual).ravel(), np.asarray(forecast).ravel()
+    non_zero_actual = actual != 0
+    return float(np.mean(np.abs((actual[non_zero_actual] - forecast[non_zero_actual]) / actual[non_zero_actual])) * 100)
+
+
+def sliding_windows(values, lookback):
+    """Vue (n - lookback + 1, lookback, features) des fenêtres glissantes de `values` (n, features), sans copie"""
+    values = np.asarray(values)
+    if lookback < 1 or lookback > len(values):
+        raise ValueError(f"Fenêtre invalide: {lookback} (données: {len(values)} lignes)")
+    # sliding_window_view place la fenêtre en dernier axe: (n - lookback + 1, features, lookback)
+    return np.lib.stride_tricks.sliding_window_view(values, lookback, axis=0).transpose(0, 2, 1)
+
+
+class WindowedSamples:
+    """Échantillons (fenêtre, cible) d'une série normalisée
+
+    La fenêtre se terminant au jour t (jours t - lookback + 1 à t) a pour
+    cible le Close normalisé du jour t + 1. Seuls les tableaux normalisés
+    sont en mémoire; les fenêtres sont des vues et un batch n'est copié
+    qu'au moment où Keras le demande.
+    """
+
+    def __init__(self, X_scaled, y_scaled, lookback, start=0, stop=None):
+        self.lookback = lookback
+        n_samples = len(X_scaled) - lookback
+        if n_samples <= 0:
+            raise ValueError(f"Pas assez de données ({len(X_scaled)} lignes) pour une fenêtre de {lookback} jours")
+        self.windows = sliding_windows(X_scaled, lookback)[:n_samples]
+        self.targets = np.asarray(y_scaled).reshape(-1, 1)[lookback:]
+        stop = n_samples if stop is None else min(stop, n_samples)
+        self.indices = np.arange(start, stop)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def split(self, fraction):
+        """Découpe chronologique: (premiers 1 - fraction, derniers fraction) des échantillons"""
+        cut = int(len(self.indices) * (1 - fraction))
+        head, tail = self._subset(self.indices[:cut]), self._subset(self.indices[cut:])
+        return head, tail
+
+    def _subset(self, indices):
+        subset = object.__new__(WindowedSamples)
+        subset.lookback, subset.windows, subset.targets = self.lookback, self.windows, self.targets
+        subset.indices = indices
+        return subset
+
+    def batch(self, indices):
+        """Matérialise un batch (copie contiguë des seules fenêtres demandées)"""
+        return np.ascontiguousarray(self.windows[indices]), self.targets[indices]
+
+    def arrays(self):
+        """Tous les échantillons matérialisés (pour une évaluation sur un petit jeu de test)"""
+        return self.batch(self.indices)
+
+
+def keras_sequence(samples, batch_size=32, shuffle=False, seed=None):
+    """`keras.utils.Sequence` qui fournit les échantillons batch par batch"""
+    from keras.utils import Sequence
+
+    class WindowSequence(Sequence):
+        def __init__(self):
+            super().__init__()
+            self.order = samples.indices.copy()
+            self.rng = np.random.default_rng(seed)
+            if shuffle:
+                self.rng.shuffle(self.order)
+
+        def __len__(self):
+            return int(np.ceil(len(self.order) / batch_size))
+
+        def __getitem__(self, index):
+            return samples.batch(self.order[index * batch_size:(index + 1) * batch_size])
+
+        def on_epoch_end(self):
+            if shuffle:
+                self.rng.shuffle(self.order)
+
+    return WindowSequence()
+
+
+def limit_threads(threads):
+    """Limite les threads de calcul du processus (à appeler avant l'import de TensorFlow)
+
+    Utilisé par les workers du sweep et le processus de fine-tuning, qui
+    partagent les cœurs de la machine avec d'autres processus.
+    """
+    for variable in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def build_model(lookback, n_features, units=100, n_layers=3, dropout=0.1):
+    """Architecture du notebook: LSTM empilés (100 unités) + Dropout, sortie Dense(1)"""
+    from keras import Input
+    from keras.layers import LSTM, Dense, Dropout
+    from keras.models import Sequential
+
+    model = Sequential()
+    model.add(Input(shape=(lookback, n_features)))
+    for i in range(n_layers):
+        model.add(LSTM(units, return_sequences=i < n_layers - 1, activation='tanh'))
+        model.add(Dropout(dropout))
+    model.add(Dense(1))
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+
+def load_pipeline_data(pipeline, csv_path=None, period=None, descending=False, resolution='1d'):
+    """Données d'un pipeline: CSV local (ex: market_data.csv) ou yfinance sur la période du pipeline
+
+    Avec un CSV, `period` limite l'historique à ses derniers jours (après le
+    calcul des indicateurs). Le notebook triait les données par date
+    décroissante; `descending=True` reproduit ce comportement pour comparer
+    avec les résultats existants. En intraday (`resolution` '1h', '5m'...),
+    les bougies du CSV sont agrégées à la résolution, ou récupérées par
+    tranches sur yfinance.
+    """
+    config = PIPELINES[pipeline]
+    if csv_path is not None:
+        data = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+        if resolution != '1d':
+            data = resample_ohlcv(data.sort_index(), resolution)
+    elif resolution != '1d':
+        data = IntradayYFinanceSource("BTC-USD", resolution=resolution).fetch(period=period or config['period'])
+    else:
+        data = YFinanceSource("BTC-USD").fetch(period=period or config['period'])
+    data = data.sort_index()
+    missing = [feature for feature in config['features'] if feature not in data.columns]
+    if missing:
+        # Historique OHLCV brut: calcul des indicateurs comme le service
+        data = compute_indicators(data)
+    data = data[config['features']].dropna()
+    if csv_path is not None and period:
+        data = data[data.index > data.index.max() - period_offset(period)]
+    return data.iloc[::-1] if descending else data
+
+
+def prepare_samples(data, lookback=1, train_ratio=0.8, dtype=np.float32):
+    """Découpe train/test chronologique, scalers ajustés sur le train, échantillons fenêtrés
+
+    Retourne (train, test, scaler_x, scaler_y). Les fenêtres de test peuvent
+    commencer dans les derniers jours du train (historique connu), leurs
+    cibles sont toutes dans la période de test.
+    """
+    values = data.values.astype(np.float64)
+    closes = data['Close'].values.astype(np.float64).reshape(-1, 1)
+    train_size = int(len(data) * train_ratio)
+
+    scaler_x = MinMaxScaler(feature_range=(-1, 1)).fit(values[:train_size])
+    scaler_y = MinMaxScaler(feature_range=(-1, 1)).fit(closes[1:train_size])
+    X_scaled = scaler_x.transform(values).astype(dtype)
+    y_scaled = scaler_y.transform(closes).astype(dtype)
+
+    # Échantillon i: cible au jour i + lookback
+    train_stop = max(0, train_size - lookback)
+    train = WindowedSamples(X_scaled, y_scaled, lookback, stop=train_stop)
+    test = WindowedSamples(X_scaled, y_scaled, lookback, start=train_stop)
+    if len(train) == 0 or len(test) == 0:
+        raise ValueError(f"Données insuffisantes ({len(data)} lignes) pour une fenêtre de {lookback} jours")
+    return train, test, scaler_x, scaler_y
+
+
+def train_pipeline(pipeline='rolling', data=None, lookback=1, epochs=100, batch_size=32, patience=5,
+                   train_ratio=0.8, validation_split=0.2, units=100, shuffle=False, csv_path=None,
+                   period=None, descending=False, callbacks=(), verbose=1, resolution='1d'):
+    """Entraîne le modèle d'un pipeline du notebook avec une fenêtre de `lookback` jours
+
+    Retourne un dict avec le modèle, les scalers, l'historique d'entraînement
+    et le MAPE à 1 jour sur la période de test. `callbacks` s'ajoutent à
+    l'EarlyStopping (ex: élagage d'un sweep). La résolution des bougies est
+    enregistrée dans les métadonnées: un bundle .npz est servi à la même
+    résolution.
+    """
+    from keras.callbacks import EarlyStopping
+
+    config = PIPELINES[pipeline]
+    if data is None:
+        data = load_pipeline_data(pipeline, csv_path=csv_path, period=period, descending=descending,
+                                  resolution=resolution)
+    data = data[config['features']]
+
+    train, test, scaler_x, scaler_y = prepare_samples(data, lookback=lookback, train_ratio=train_ratio)
+    # Équivalent de validation_split: les derniers échantillons du train (non mélangés)
+    fit_samples, val_samples = train.split(validation_split)
+    logger.info(f"Pipeline {pipeline}: fenêtre {lookback}j, {len(fit_samples)} échantillons d'entraînement, "
+                f"{len(val_samples)} de validation, {len(test)} de test")
+
+    model = build_model(lookback, len(config['features']), units=units)
+    early_stopping = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+    history = model.fit(
+        keras_sequence(fit_samples, batch_size=batch_size, shuffle=shuffle),
+        validation_data=keras_sequence(val_samples, batch_size=batch_size) if len(val_samples) else None,
+        epochs=epochs,
+        callbacks=([early_stopping] if len(val_samples) else []) + list(callbacks),
+        verbose=verbose,
+    )
+
+    # Évaluation à 1 jour sur la période de test (batch par batch)
+    predictions_scaled = model.predict(keras_sequence(test, batch_size=256), verbose=0)
+    predictions = scaler_y.inverse_transform(predictions_scaled)
+    actual = scaler_y.inverse_transform(test.targets[test.indices])
+    mape_1d = calculate_mape(actual, predictions)
+    logger.info(f"MAPE 1 jour (test): {mape_1d:.2f}%")
+
+    return {
+        "model": model,
+        "scaler_x": scaler_x,
+        "scaler_y": scaler_y,
+        "features": list(config['features']),
+        "history": history.history,
+        "mape_1d": mape_1d,
+        "metadata": {
+            "pipeline": config['pipeline'],
+            "window": lookback,
+            "batch_size": batch_size,
+            "epochs": len(history.history.get('loss', [])),
+            "period": f"{data.index.min():%Y-%m-%d} -> {data.index.max():%Y-%m-%d}",
+            "resolution": resolution,
+            "mape_1d": mape_1d,
+            "trained_at": datetime.now().isoformat(timespec='seconds'),
+        },
+    }
+
+
+def append_result(result, results_csv='resultats_tests_lstm_complets.csv', periode=None, commentaires=""):
+    """Ajoute une ligne au format de resultats_tests_lstm_complets.csv"""
+    metadata = result["metadata"]
+    row = {
+        'Pipeline': metadata['pipeline'],
+        'Features': ', '.join(result['features']),
+        'Window': metadata['window'],
+        'Batch_size': metadata['batch_size'],
+        'Epochs': metadata['epochs'],
+        'Période': periode or metadata['period'],
+        'MAPE_1d': result['mape_1d'],
+        'MAPE_30d': None,
+        'Commentaires': commentaires,
+    }
+    header = not os.path.exists(results_csv)
+    pd.DataFrame([row], columns=RESULTS_COLUMNS).to_csv(results_csv, mode='a', header=header, index=False)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement d'un pipeline LSTM avec fenêtre glissante")
+    parser.add_argument('--pipeline', choices=sorted(PIPELINES), default='rolling')
+    parser.add_argument('--csv', default=None, help="Historique local (défaut: yfinance sur la période du pipeline)")
+    parser.add_argument('--period', default=None, help="Historique utilisé: '1y', '4y', '300d'... (défaut: celui du pipeline)")
+    parser.add_argument('--resolution', choices=sorted(RESOLUTIONS), default='1d',
+                        help="Durée des bougies (intraday: exporter un bundle avec --bundle pour le servir)")
+    parser.add_argument('--lookback', type=int, default=1, help="Longueur de la fenêtre d'historique (bougies)")
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--patience', type=int, default=5)
+    parser.add_argument('--shuffle', action='store_true', help="Mélange les batches à chaque epoch")
+    parser.add_argument('--output', default=None,
+                        help="Fichier .h5 du modèle (défaut: model/experiments/<pipeline>_w<lookback>.h5)")
+    parser.add_argument('--bundle', action='store_true', help="Exporte aussi un bundle .npz (poids + scalers)")
+    parser.add_argument('--results', default='resultats_tests_lstm_complets.csv',
+                        help="Fichier de résultats où ajouter la ligne (vide pour ne rien écrire)")
+    args = parser.parse_args()
+
+    result = train_pipeline(args.pipeline, lookback=args.lookback, epochs=args.epochs, batch_size=args.batch_size,
+                            patience=args.patience, shuffle=args.shuffle, csv_path=args.csv, period=args.period,
+                            resolution=args.resolution)
+
+    # model/experiments/ n'est pas scanné par le registre: un modèle à fenêtre > 1 n'y est pas servi
+    output = args.output or os.path.join(EXPERIMENTS_DIRECTORY, PIPELINES[args.pipeline]['model_file'].replace(
+        '.h5', f'_w{args.lookback}.h5'))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    result["model"].save(output)
+    print(f"Modèle sauvegardé: {output} (MAPE 1 jour: {result['mape_1d']:.2f}%)")
+
+    if args.bundle:
+        from services.model_bundle import save_bundle
+        bundle_path = os.path.splitext(output)[0] + '.npz'
+        save_bundle(bundle_path, result["model"], result["scaler_x"], result["scaler_y"],
+                    result["features"], metadata={**result["metadata"], "source_model": os.path.basename(output)})
+        print(f"Bundle sauvegardé: {bundle_path}")
+
+    if args.results:
+        append_result(result, results_csv=args.results, commentaires=f"Fenêtre glissante {args.lookback} jours")
+        print(f"Résultat ajouté à {args.results}")
+
+
+if __name__ == "__main__":
+    main()
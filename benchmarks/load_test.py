@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Test de charge de l'API (débit, percentiles de latence, taux d'erreur, mémoire du serveur)
+
+Le serveur est démarré avec la source de données locale (BTC_DATA_SOURCE=csv:
+market_data.csv rejoué à la place de yfinance) et un store de bougies
+temporaire: aucun accès réseau, résultats reproductibles. Les requêtes sont
+réparties entre /predict, /health et /model/status selon `--mix`:
+
+- boucle fermée (défaut): `--concurrency` clients enchaînent les requêtes;
+- boucle ouverte (`--rate`): arrivées de Poisson à `--rate` requêtes/s,
+  servies par au plus `--concurrency` clients. La latence est mesurée depuis
+  l'heure d'arrivée prévue: l'attente d'un client libre est comptée.
+
+Le rapport JSON est enregistré dans benchmarks/results/; les seuils
+(`--max-error-rate`, `--max-p99-ms`, `--min-rps`) et la comparaison à une
+référence (`--compare`) font échouer le script en cas de dépassement.
+
+Usage:
+    python benchmarks/load_test.py --duration 30 --concurrency 16
+    python benchmarks/load_test.py --rate 200 --concurrency 64 --mode gunicorn
+    python benchmarks/load_test.py --save-baseline
+    python benchmarks/load_test.py --compare benchmarks/results/load_baseline.json --max-error-rate 0.01
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'app', 'backend')
+MARKET_DATA = os.path.join(ROOT_DIR, 'market_data.csv')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'load_baseline.json')
+
+# Endpoints pilotés: nom -> (méthode, chemin)
+ENDPOINTS = {
+    "predict": ("GET", "/predict"),
+    "health": ("GET", "/health"),
+    "model_status": ("GET", "/model/status"),
+}
+DEFAULT_MIX = "predict=8,health=1,model_status=1"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_mix(spec):
+    """'predict=8,health=1' -> {"predict": 8.0, "health": 1.0}"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Endpoint inconnu: {name} (choix: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_rss(pid):
+    """Mémoire résidente (octets) d'un processus et de ses descendants (workers gunicorn), via /proc"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration):
+        return None
+    for path in glob.glob(f"/proc/{pid}/task/*/children"):
+        try:
+            with open(path) as f:
+                children = f.read().split()
+        except OSError:
+            continue
+        rss += sum(process_rss(int(child)) or 0 for child in children)
+    return rss
+
+
+class RSSSampler:
+    """Échantillonne la mémoire résidente du serveur pendant le test (début, pic, fin)"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            rss = process_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        if not self.samples:
+            return None
+        return {
+            "start_mb": self.samples[0] / 2**20,
+            "peak_mb": max(self.samples) / 2**20,
+            "end_mb": self.samples[-1] / 2**20,
+        }
+
+
+# ----------------------------------------------------------------------
+# Serveur
+# ----------------------------------------------------------------------
+def server_env(store_root, backend='numpy', extra=None):
+    """Environnement du serveur testé: données rejouées depuis market_data.csv, store temporaire"""
+    env = dict(os.environ)
+    env.update({
+        "BTC_DATA_SOURCE": "csv",
+        "BTC_REPLAY_CSV": MARKET_DATA,
+        "BTC_STORE_ROOT": store_root,
+        "BTC_INFERENCE_BACKEND": backend,
+        "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")])),
+    })
+    env.update(extra or {})
+    return env
+
+
+class ServerProcess:
+    """API démarrée dans un sous-processus (serveur werkzeug multi-threads, ou gunicorn)"""
+
+    def __init__(self, env, port, gunicorn=False):
+        if gunicorn:
+            command = ['gunicorn', '-c', os.path.join(ROOT_DIR, 'gunicorn.conf.py'), 'api:app']
+            env = {**env, "PORT": str(port)}
+        else:
+            command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port)]
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.url = f"http://127.0.0.1:{port}"
+        self.pid = self.process.pid
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read().decode('utf-8', errors='replace')
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+
+class InProcessServer:
+    """API importée dans ce processus et servie par un thread (la mémoire mesurée inclut le client)"""
+
+    def __init__(self, env, port):
+        from werkzeug.serving import make_server
+
+        os.environ.update(env)
+        sys.path.append(BACKEND_DIR)
+        from api import app
+
+        self.server = make_server('127.0.0.1', port, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="api-server", daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{port}"
+        self.pid = os.getpid()
+
+    def output(self):
+        return ""
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def serve(port):
+    """Point d'entrée du sous-processus: serveur werkzeug multi-threads"""
+    sys.path.append(BACKEND_DIR)
+    os.chdir(ROOT_DIR)
+    from werkzeug.serving import make_server
+    from api import app
+
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def wait_ready(url, timeout=120, server=None):
+    """Attend que /ready réponde 200 (modèle chargé et première prédiction calculée)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if isinstance(server, ServerProcess) and server.process.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté au démarrage:\n{server.output()[-2000:]}")
+        try:
+            if requests.get(f"{url}/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Serveur non prêt après {timeout}s")
+
+
+# ----------------------------------------------------------------------
+# Génération de charge
+# ----------------------------------------------------------------------
+class LoadGenerator:
+    """Envoie les requêtes du mix et enregistre (endpoint, début, latence, statut, erreur)"""
+
+    def __init__(self, url, mix, concurrency=8, days=(30,), timeout=30, seed=0):
+        self.url = url.rstrip('/')
+        self.mix = mix
+        self.concurrency = concurrency
+        self.days = list(days)
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._local = threading.local()
+        self.records = []
+        self._records_lock = threading.Lock()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+        return session
+
+    def _next_request(self):
+        with self._random_lock:
+            name = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            params = {"days": self.random.choice(self.days)} if name == "predict" else None
+        return name, params
+
+    def _send(self, scheduled=None):
+        name, params = self._next_request()
+        method, path = ENDPOINTS[name]
+        start = time.perf_counter()
+        status, error = None, None
+        try:
+            response = self._session().request(method, self.url + path, params=params, timeout=self.timeout)
+            response.content  # Corps complet reçu
+            status = response.status_code
+            if status >= 400:
+                error = f"HTTP {status}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        end = time.perf_counter()
+        # Boucle ouverte: latence depuis l'arrivée prévue (attente d'un client libre comprise)
+        origin = scheduled if scheduled is not None else start
+        with self._records_lock:
+            self.records.append((name, origin, end - origin, status, error))
+
+    def run_closed(self, duration):
+        """`concurrency` clients enchaînent les requêtes pendant `duration` secondes"""
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self._send()
+
+        threads = [threading.Thread(target=client, name=f"load-client-{i}") for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, duration, rate):
+        """Arrivées de Poisson à `rate` requêtes/s pendant `duration` secondes"""
+        arrivals = random.Random(self.random.random())
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="load-client") as pool:
+            start = time.perf_counter()
+            scheduled = start
+            while True:
+                scheduled += arrivals.expovariate(rate)
+                if scheduled - start >= duration:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, scheduled)
+
+
+def summarize(records, elapsed):
+    """Débit, taux d'erreur et percentiles de latence (ms), par endpoint et au total"""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record[0]].append(record)
+        groups["total"].append(record)
+
+    summary = {}
+    for name in sorted(groups, key=lambda name: (name == "total", name)):
+        group = groups[name]
+        latencies = np.array([record[2] for record in group]) * 1e3
+        errors = defaultdict(int)
+        for record in group:
+            if record[4] is not None:
+                errors[record[4]] += 1
+        n_errors = sum(errors.values())
+        summary[name] = {
+            "requests": len(group),
+            "errors": n_errors,
+            "error_rate": n_errors / len(group),
+            "error_kinds": dict(errors),
+            "throughput_rps": len(group) / elapsed,
+            "mean_ms": float(latencies.mean()),
+            **{f"p{p}_ms": float(np.percentile(latencies, p)) for p in PERCENTILES},
+            "max_ms": float(latencies.max()),
+        }
+    return summary
+
+
+def store_snapshot(store_root):
+    """(taille, mtime) des fichiers des stores de bougies, hors verrous"""
+    snapshot = {}
+    for path in glob.glob(os.path.join(store_root, '**', '*'), recursive=True):
+        if os.path.isfile(path) and not path.endswith('.lock'):
+            stat = os.stat(path)
+            snapshot[os.path.relpath(path, store_root)] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def run(duration=10, concurrency=8, rate=None, mix=DEFAULT_MIX, days=(30,), warmup=2, mode='subprocess',
+        url=None, backend='numpy', env=None, seed=0, timeout=30):
+    """Démarre le serveur (sauf `url`), applique la charge et retourne le rapport (sérialisable en JSON)"""
+    mix = parse_mix(mix) if isinstance(mix, str) else dict(mix)
+    store_root = tempfile.mkdtemp(prefix="load-test-candles-")
+    server = None
+    try:
+        if url is None:
+            environment = server_env(store_root, backend=backend, extra=env)
+            port = free_port()
+            if mode == 'inprocess':
+                server = InProcessServer(environment, port)
+            else:
+                server = ServerProcess(environment, port, gunicorn=mode == 'gunicorn')
+            url = server.url
+        wait_ready(url, server=server)
+
+        generator = LoadGenerator(url, mix, concurrency=concurrency, days=days, timeout=timeout, seed=seed)
+        if warmup:
+            # Préchauffage (caches, connexions): requêtes non comptées
+            generator.run_closed(warmup)
+            generator.records.clear()
+
+        # Régime établi: le store ne doit pas être réécrit pendant la mesure (mises à jour incrémentales espacées)
+        store_before = store_snapshot(store_root)
+        sampler = RSSSampler(server.pid).start() if server is not None else None
+        start = time.perf_counter()
+        if rate:
+            generator.run_open(duration, rate)
+        else:
+            generator.run_closed(duration)
+        elapsed = time.perf_counter() - start
+        memory = sampler.stop() if sampler is not None else None
+        store_after = store_snapshot(store_root)
+        if not generator.records:
+            raise RuntimeError("Aucune requête envoyée")
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(store_root, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": _git_commit(),
+        "config": {
+            "mode": mode if server is not None else "external",
+            "backend": backend,
+            "duration_s": duration,
+            "elapsed_s": elapsed,
+            "concurrency": concurrency,
+            "rate_rps": rate,
+            "mix": mix,
+            "days": list(days),
+            "warmup_s": warmup,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "memory": memory,
+        # Fichiers du store créés ou modifiés pendant la mesure (serveur démarré par le script seulement)
+        "store_writes": sorted(name for name in set(store_before) | set(store_after)
+                               if store_before.get(name) != store_after.get(name)) if server is not None else None,
+        "endpoints": summarize(generator.records, elapsed),
+    }
+
+
+def check_gates(report, max_error_rate=None, max_p99_ms=None, min_rps=None):
+    """Seuils absolus sur le total: liste des dépassements"""
+    total = report["endpoints"]["total"]
+    failures = []
+    if max_error_rate is not None and total["error_rate"] > max_error_rate:
+        failures.append(f"taux d'erreur {total['error_rate']:.2%} > {max_error_rate:.2%}")
+    if max_p99_ms is not None and total["p99_ms"] > max_p99_ms:
+        failures.append(f"p99 {total['p99_ms']:.1f} ms > {max_p99_ms:.1f} ms")
+    if min_rps is not None and total["throughput_rps"] < min_rps:
+        failures.append(f"débit {total['throughput_rps']:.1f} req/s < {min_rps:.1f} req/s")
+    return failures
+
+
+def compare(current, baseline, threshold=0.2):
+    """Régressions par endpoint au-delà de `threshold`: p99 plus lent, débit plus faible ou plus d'erreurs"""
+    regressions = []
+    for name, result in current["endpoints"].items():
+        reference = baseline["endpoints"].get(name)
+        if reference is None:
+            continue
+        p99_ratio = result["p99_ms"] / reference["p99_ms"] if reference["p99_ms"] else 1.0
+        rps_ratio = result["throughput_rps"] / reference["throughput_rps"] if reference["throughput_rps"] else 1.0
+        flags = []
+        if p99_ratio > 1 + threshold:
+            flags.append("p99")
+        if rps_ratio < 1 - threshold:
+            flags.append("débit")
+        if result["error_rate"] > reference["error_rate"] + 0.001:
+            flags.append("erreurs")
+        print(f"{name:<14} p99 {reference['p99_ms']:>8.1f} -> {result['p99_ms']:>8.1f} ms (x{p99_ratio:.2f})  "
+              f"débit {reference['throughput_rps']:>7.1f} -> {result['throughput_rps']:>7.1f} req/s (x{rps_ratio:.2f})  "
+              f"{'REGRESSION ' + ', '.join(flags) if flags else ''}")
+        if flags:
+            regressions.append({"name": name, "p99_ratio": p99_ratio, "throughput_ratio": rps_ratio, "flags": flags})
+    return regressions
+
+
+def print_report(report):
+    print(f"{'endpoint':<14} {'requêtes':>9} {'erreurs':>8} {'req/s':>8} "
+          + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES) + f" {'max':>8}")
+    for name, result in report["endpoints"].items():
+        print(f"{name:<14} {result['requests']:>9} {result['error_rate']:>8.2%} {result['throughput_rps']:>8.1f} "
+              + " ".join(f"{result[f'p{p}_ms']:>8.1f}" for p in PERCENTILES) + f" {result['max_ms']:>8.1f}")
+    if report["memory"]:
+        memory = report["memory"]
+        print(f"RSS serveur: {memory['start_mb']:.0f} Mo au début, pic {memory['peak_mb']:.0f} Mo, "
+              f"{memory['end_mb']:.0f} Mo à la fin")
+    if report.get("store_writes"):
+        print(f"Store réécrit pendant la mesure: {', '.join(report['store_writes'])}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API avec données rejouées (hors ligne)")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=['subprocess', 'inprocess', 'gunicorn'], default='subprocess',
+                        help="Serveur testé: sous-processus werkzeug, même processus, ou gunicorn.conf.py")
+    parser.add_argument('--url', default=None, help="Serveur déjà démarré (pas de mesure mémoire)")
+    parser.add_argument('--backend', choices=['numpy', 'keras'], default='numpy')
+    parser.add_argument('--duration', type=float, default=10, help="Durée mesurée (s)")
+    parser.add_argument('--warmup', type=float, default=2, help="Préchauffage non compté (s)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Clients simultanés")
+    parser.add_argument('--rate', type=float, default=None, help="Boucle ouverte: arrivées par seconde")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Répartition des requêtes (endpoint=poids,...)")
+    parser.add_argument('--days', default='30', help="Horizons de /predict tirés au hasard (ex: 7,30,90)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Fichier JSON de résultats (défaut: benchmarks/results/load-<date>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistre aussi ces résultats comme référence")
+    parser.add_argument('--compare', help="Rapport JSON de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Seuil de régression (0.2 = 20%%)")
+    parser.add_argument('--max-error-rate', type=float, default=None)
+    parser.add_argument('--max-p99-ms', type=float, default=None)
+    parser.add_argument('--min-rps', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    report = run(duration=args.duration, concurrency=args.concurrency, rate=args.rate, mix=args.mix,
+                 days=[int(day) for day in args.days.split(',')], warmup=args.warmup, mode=args.mode,
+                 url=args.url, backend=args.backend, seed=args.seed)
+    print_report(report)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, 'load-' + datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    for path in [output] + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Résultats enregistrés: {path}")
+
+    failures = check_gates(report, args.max_error_rate, args.max_p99_ms, args.min_rps)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparaison avec {args.compare} ({baseline.get('git_commit')}, seuil {args.threshold:.0%})")
+        failures += [f"régression {regression['name']}: {', '.join(regression['flags'])}"
+                     for regression in compare(report, baseline, threshold=args.threshold)]
+    if failures:
+        print("\n".join(["Échec:"] + failures))
+        sys.exit(1)
+    print("Seuils respectés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks hors ligne des chemins critiques (préparation des données et inférence)
+
+Utilise market_data.csv comme données de test et les modèles .h5 versionnés:
+aucun accès réseau ni serveur. Les résultats sont enregistrés en JSON pour
+comparer les exécutions; une régression au-delà du seuil fait échouer le script.
+
+Usage:
+    python benchmarks/run_benchmarks.py                          # backend(s) disponibles
+    python benchmarks/run_benchmarks.py --save-baseline          # enregistre la référence
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json --threshold 0.2
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from services.candle_store import CandleStore, CSVReplaySource
+from services.forecast_cache import ForecastCache
+from services.indicators import calculate_rsi, compute_indicators
+from services.model_registry import FEATURES
+from services.prediction_service import BitcoinPredictionService
+
+MARKET_DATA = os.path.join(ROOT_DIR, 'market_data.csv')
+MODEL_PATH = os.path.join(ROOT_DIR, 'app', 'models', 'model.h5')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+
+
+def measure(function, repeats=7, min_time=0.2):
+    """Chronomètre `function`: nombre d'appels par mesure calibré pour durer au moins `min_time`"""
+    function()  # Préchauffage (imports paresseux, caches)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    timings.sort()
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": timings[0],
+        "max_s": timings[-1],
+        "number": number,
+        "repeats": repeats,
+    }
+
+
+def available_backends():
+    backends = ['numpy']
+    if importlib.util.find_spec('tensorflow') is not None:
+        backends.append('keras')
+    return backends
+
+
+def benchmark_cases(store_dir, backend, model_path=MODEL_PATH):
+    """Cas mesurés: (nom, fonction sans argument)"""
+    raw = pd.read_csv(MARKET_DATA, index_col='Date', parse_dates=['Date']).sort_index()
+    closes = raw['Close']
+    data = compute_indicators(raw)[FEATURES].dropna()
+    values = data.values
+
+    store = CandleStore(store_dir, source=CSVReplaySource(MARKET_DATA), seed_csv=MARKET_DATA)
+    # Configuration servie (history_days par défaut, store plus court complété une seule fois) et cache
+    # désactivé: generate_prediction fait tout le travail à chaque appel
+    service = BitcoinPredictionService(model_path=model_path, store=store, backend=backend,
+                                       cache=ForecastCache(maxsize=0))
+    scaler_x = MinMaxScaler(feature_range=(-1, 1)).fit(values)
+    X_scaled, _ = service.prepare_data_for_prediction(data)
+    step_input = X_scaled[-1].reshape(1, 1, -1)
+
+    return [
+        ("calculate_rsi", lambda: calculate_rsi(closes)),
+        ("compute_indicators", lambda: compute_indicators(raw)),
+        ("scaler_fit_transform", lambda: MinMaxScaler(feature_range=(-1, 1)).fit(values).transform(values)),
+        ("scaler_transform", lambda: scaler_x.transform(values)),
+        ("prepare_data_for_prediction", lambda: service.prepare_data_for_prediction(data)),
+        (f"predict_step[{backend}]", lambda: service.model.predict(step_input, verbose=0)),
+        (f"predict_rolling_days_30[{backend}]", lambda: service.predict_rolling_days(X_scaled[-1], n_days=30)),
+        (f"generate_prediction_30[{backend}]", lambda: service.generate_prediction(n_days=30)),
+    ]
+
+
+def run(backends=None, repeats=7, min_time=0.2, only=None):
+    """Exécute les benchmarks et retourne le rapport (dictionnaire sérialisable en JSON)"""
+    results = {}
+    for backend in backends or available_backends():
+        with tempfile.TemporaryDirectory() as store_dir:
+            for name, function in benchmark_cases(store_dir, backend):
+                if name in results or (only and not any(pattern in name for pattern in only)):
+                    continue
+                results[name] = measure(function, repeats=repeats, min_time=min_time)
+                print(f"{name:<40} {results[name]['median_s'] * 1e3:>10.3f} ms  (x{results[name]['number']})")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """Compare les médianes; retourne la liste des régressions au-delà de `threshold` (0.2 = +20%)"""
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["median_s"] / reference["median_s"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ("amélioration" if ratio < 1 - threshold else "")
+        print(f"{name:<40} {reference['median_s'] * 1e3:>10.3f} -> {result['median_s'] * 1e3:>10.3f} ms  x{ratio:.2f} {flag}")
+        if ratio > 1 + threshold:
+            regressions.append({"name": name, "ratio": ratio})
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks hors ligne du pipeline de prédiction")
+    parser.add_argument('--backend', action='append', choices=['numpy', 'keras'],
+                        help="Backend(s) mesuré(s) (défaut: tous ceux disponibles)")
+    parser.add_argument('--only', action='append', help="Ne mesurer que les cas contenant ce texte")
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Durée minimale d'une mesure (s)")
+    parser.add_argument('--output', help="Fichier JSON de résultats (défaut: benchmarks/results/<date>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistre aussi ces résultats comme référence")
+    parser.add_argument('--compare', help="Fichier JSON de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Seuil de régression (0.2 = +20%%)")
+    args = parser.parse_args()
+
+    report = run(backends=args.backend, repeats=args.repeats, min_time=args.min_time, only=args.only)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    for path in [output] + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Résultats enregistrés: {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparaison avec {args.compare} ({baseline.get('git_commit')}, seuil +{args.threshold:.0%})")
+        regressions = compare(report, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} régression(s) détectée(s)")
+            sys.exit(1)
+        print("Aucune régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Configuration gunicorn pour le mode production (workers pré-forkés)
+
+Le modèle et les scalers sont chargés une seule fois dans le processus maître
+(preload_app) avant le fork: les poids sont partagés en copy-on-write entre
+les workers. Chaque worker sert plusieurs requêtes en parallèle avec des threads.
+
+Usage:
+    gunicorn -c gunicorn.conf.py api:app
+    python start_backend.py --production
+
+Variables d'environnement:
+    WEB_CONCURRENCY        nombre de workers (défaut: nombre de cœurs)
+    GUNICORN_THREADS       threads par worker (défaut: 4)
+    PORT                   port d'écoute (défaut: 5001)
+    BTC_INFERENCE_BACKEND  numpy par défaut en production (voir ci-dessous)
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+# Le backend est importable sans PYTHONPATH explicite
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'backend'))
+
+# TensorFlow n'est pas fork-safe une fois initialisé: le préchargement avant le
+# fork n'est fait qu'avec le backend NumPy; avec Keras chaque worker charge son modèle
+os.environ.setdefault('BTC_INFERENCE_BACKEND', 'numpy')
+preload_app = os.environ['BTC_INFERENCE_BACKEND'] == 'numpy'
+if preload_app:
+    # api.py charge le modèle de façon synchrone au lieu du préchauffage en arrière-plan
+    os.environ['BTC_PRELOAD_MODEL'] = '1'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+timeout = 120
+accesslog = '-'
+
+
+def when_ready(server):
+    """Appelé dans le maître après le chargement de l'application, avant le fork des workers"""
+    # Les objets déjà alloués (modèle, scalers, cache) sortent du suivi du GC:
+    # les collections dans les workers ne touchent plus ces pages partagées
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Application préchargée, {workers} workers x {threads} threads")
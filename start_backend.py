@@ -5,6 +5,8 @@ Script de démarrage pour l'API Flask Bitcoin Prediction
 
 import sys
 import os
+import argparse
+import importlib.util
 import logging
 from pathlib import Path
 
@@ -23,26 +25,31 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def check_dependencies():
-    """Vérifie que toutes les dépendances sont disponibles"""
-    try:
-        import flask
-        import flask_cors
-        import numpy
-        import pandas
-        import yfinance
-        import sklearn
-        import tensorflow
-        import keras
-        logger.info("Toutes les dépendances sont disponibles")
-        return True
-    except ImportError as e:
-        logger.error(f"Dépendance manquante: {e}")
+# Modèle par défaut (BTC_MODEL_PATH peut pointer vers un .h5 ou un bundle .npz)
+MODEL_PATH = os.environ.get('BTC_MODEL_PATH', 'app/models/model.h5')
+
+def check_dependencies(production=False):
+    """Vérifie que toutes les dépendances sont disponibles (sans les importer)"""
+    # find_spec localise le module sans l'exécuter: pas d'import de TensorFlow au démarrage
+    modules = ['flask', 'flask_cors', 'numpy', 'pandas', 'yfinance', 'sklearn']
+    if production:
+        modules.append('gunicorn')
+    # Un bundle .npz est toujours servi par le moteur NumPy: ni TensorFlow ni h5py
+    if not MODEL_PATH.endswith('.npz'):
+        if os.environ.get('BTC_INFERENCE_BACKEND', 'keras') == 'keras':
+            modules += ['tensorflow', 'keras']
+        else:
+            modules += ['h5py']
+    missing = [name for name in modules if importlib.util.find_spec(name) is None]
+    if missing:
+        logger.error(f"Dépendances manquantes: {', '.join(missing)}")
         return False
+    logger.info("Toutes les dépendances sont disponibles")
+    return True
 
 def check_model_file():
     """Vérifie que le fichier modèle existe"""
-    model_path = Path("app/models/model.h5")
+    model_path = Path(MODEL_PATH)
     if model_path.exists():
         logger.info(f"Modèle trouvé: {model_path}")
         return True
@@ -50,15 +57,29 @@ def check_model_file():
         logger.error(f"Modèle non trouvé: {model_path}")
         return False
 
+def start_production_server():
+    """Remplace le processus courant par gunicorn (workers pré-forkés, voir gunicorn.conf.py)"""
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    os.execvp('gunicorn', ['gunicorn', '-c', config, 'api:app'])
+
 def main():
     """Fonction principale de démarrage"""
+    parser = argparse.ArgumentParser(description="Démarrage de l'API Flask Bitcoin Prediction")
+    parser.add_argument('--production', action='store_true',
+                        help="Serveur gunicorn multi-workers (modèle préchargé avant le fork)")
+    args = parser.parse_args()
+
     print("Démarrage de l'API Flask Bitcoin Prediction")
     print("=" * 50)
     
+    if args.production:
+        # Backend NumPy par défaut en production: pas d'état TensorFlow dupliqué par worker
+        os.environ.setdefault('BTC_INFERENCE_BACKEND', 'numpy')
+
     # Vérifications préalables
     logger.info("Vérification des prérequis...")
     
-    if not check_dependencies():
+    if not check_dependencies(production=args.production):
         print("Erreur: Dépendances manquantes")
         print("Exécutez: pip install flask flask-cors numpy pandas yfinance scikit-learn tensorflow")
         sys.exit(1)
@@ -72,11 +93,15 @@ def main():
     print("\nDémarrage du serveur API...")
     print("API disponible sur: http://localhost:5001")
     print("Documentation: http://localhost:5001/")
+    print("Préparation (modèle chargé): http://localhost:5001/ready")
     print("\nPour arrêter: Ctrl+C")
     print("=" * 50)
     
+    if args.production:
+        start_production_server()
+
     try:
-        # Import et démarrage de l'API Flask
+        # Import et démarrage de l'API Flask (le modèle se charge en arrière-plan)
         from api import app
         app.run(host="0.0.0.0", port=5001, debug=False)
     except KeyboardInterrupt:
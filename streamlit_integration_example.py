@@ -1,38 +1,36 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
-import time
+
+from api_client import APIError, PredictionAPIClient
 
 # Configuration
 API_BASE_URL = "http://localhost:5001"
 
-def get_prediction():
-    """Récupère la prédiction depuis l'API Flask"""
+@st.cache_resource
+def get_client():
+    """Client partagé par toutes les sessions: connexions keep-alive, cache des prédictions, sonde de santé"""
+    client = PredictionAPIClient(API_BASE_URL, ttl=60)
+    client.start_health_probe()
+    return client
+
+client = get_client()
+
+def get_prediction(n_days=30):
+    """Récupère la prédiction depuis l'API Flask (cache client, revalidée par ETag)"""
     try:
-        response = requests.post(f"{API_BASE_URL}/predict")
-        if response.status_code == 200:
-            data = response.json()
-            if data["success"]:
-                return data["data"]
-            else:
-                st.error(f"Erreur API: {data.get('error', 'Erreur inconnue')}")
-                return None
-        else:
-            st.error(f"Erreur HTTP: {response.status_code}")
-            return None
-    except Exception as e:
-        st.error(f"Erreur de connexion: {e}")
+        return client.get_prediction(days=n_days)
+    except APIError as e:
+        st.error(f"Erreur API: {e}")
         return None
 
-def check_api_health():
-    """Vérifie la santé de l'API"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health")
-        return response.status_code == 200
-    except:
-        return False
+def stream_prediction(n_days=30):
+    """Diffuse la prédiction jour par jour depuis /predict/stream (Server-Sent Events)
+
+    Génère des couples (événement, données): "start", un "day" par jour prédit, puis "summary" ou "error".
+    """
+    return client.stream_prediction(days=n_days)
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -45,93 +43,117 @@ st.set_page_config(
 st.title("📈 Bitcoin Prediction Dashboard")
 st.markdown("---")
 
-# Vérification de la santé de l'API
-if not check_api_health():
+# Santé de l'API: dernier état connu de la sonde en arrière-plan (aucune requête bloquante)
+health = client.health()
+if health["status"] == "unreachable":
     st.error("⚠️ L'API Flask n'est pas accessible. Assurez-vous qu'elle est démarrée sur http://localhost:5001")
     st.stop()
+elif health["status"] == "starting":
+    st.warning("⏳ L'API démarre (chargement du modèle)...")
 
 # Section principale
 col1, col2 = st.columns([2, 1])
 
 with col1:
-    st.subheader("🔮 Prédiction Bitcoin M+30")
+    st.subheader("🔮 Prédiction Bitcoin")
+    
+    # Horizon de prédiction (les longs horizons sont diffusés jour par jour)
+    n_days = st.slider("Horizon (jours)", min_value=7, max_value=365, value=30, step=1)
     
     # Bouton de génération de prédiction
     if st.button("🔮 Générer Prédiction", type="primary", use_container_width=True):
-        with st.spinner("Génération de la prédiction..."):
-            prediction_data = get_prediction()
+        # Affichage progressif: chaque jour est tracé dès qu'il est calculé par l'API
+        progress = st.progress(0.0, text="Génération de la prédiction...")
+        live_chart = st.empty()
+        prediction_dates, predicted_prices = [], []
+        prediction_data = None
+        try:
+            for event, data in stream_prediction(n_days):
+                if event == "day":
+                    prediction_dates.append(data["date"])
+                    predicted_prices.append(data["price"])
+                    progress.progress(data["day"] / n_days, text=f"Jour {data['day']}/{n_days}")
+                    live_chart.line_chart(pd.Series(predicted_prices, index=pd.to_datetime(prediction_dates)))
+                elif event == "summary":
+                    prediction_data = {**data, "prediction_dates": prediction_dates, "predicted_prices": predicted_prices}
+                elif event == "error":
+                    st.error(f"Erreur API: {data.get('error', 'Erreur inconnue')}")
+        except Exception as e:
+            st.error(f"Erreur de connexion: {e}")
+        progress.empty()
+        live_chart.empty()
+        
+        if prediction_data:
+            # Affichage des métriques principales
+            col1_1, col1_2, col1_3, col1_4 = st.columns(4)
+            
+            with col1_1:
+                st.metric(
+                    "Prix Actuel",
+                    f"${prediction_data['current_price']:,.2f}",
+                    delta=None
+                )
+            
+            with col1_2:
+                st.metric(
+                    f"Prix Prédit J+{n_days}",
+                    f"${prediction_data['predicted_price_30d']:,.2f}",
+                    delta=f"{prediction_data['variation_percent']:.2f}%"
+                )
             
-            if prediction_data:
-                # Affichage des métriques principales
-                col1_1, col1_2, col1_3, col1_4 = st.columns(4)
-                
-                with col1_1:
-                    st.metric(
-                        "Prix Actuel",
-                        f"${prediction_data['current_price']:,.2f}",
-                        delta=None
-                    )
-                
-                with col1_2:
-                    st.metric(
-                        "Prix Prédit J+30",
-                        f"${prediction_data['predicted_price_30d']:,.2f}",
-                        delta=f"{prediction_data['variation_percent']:.2f}%"
-                    )
-                
-                with col1_3:
-                    st.metric(
-                        "Variation",
-                        f"{prediction_data['variation_percent']:.2f}%",
-                        delta=None
-                    )
-                
-                with col1_4:
-                    st.metric(
-                        "Confiance",
-                        f"{prediction_data['confidence_score']:.1%}",
-                        delta=None
-                    )
-                
-                # Graphique de prédiction
-                st.subheader("📊 Évolution Prédite (30 jours)")
-                
-                fig = go.Figure()
-                
-                # Prix actuels (derniers 7 jours)
-                dates = pd.date_range(end=datetime.now(), periods=7, freq='D')
-                current_prices = [prediction_data['current_price']] * 7
-                
-                fig.add_trace(go.Scatter(
-                    x=dates,
-                    y=current_prices,
-                    mode='lines+markers',
-                    name='Prix Actuel',
-                    line=dict(color='blue', width=2)
-                ))
-                
-                # Prix prédits
-                prediction_dates = pd.to_datetime(prediction_data['prediction_dates'])
-                fig.add_trace(go.Scatter(
-                    x=prediction_dates,
-                    y=prediction_data['predicted_prices'],
-                    mode='lines+markers',
-                    name='Prix Prédit',
-                    line=dict(color='red', width=2, dash='dash')
-                ))
-                
-                fig.update_layout(
-                    title="Prédiction Bitcoin - 30 jours",
-                    xaxis_title="Date",
-                    yaxis_title="Prix (USD)",
-                    hovermode='x unified',
-                    height=400
+            with col1_3:
+                st.metric(
+                    "Variation",
+                    f"{prediction_data['variation_percent']:.2f}%",
+                    delta=None
                 )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Stockage des données pour l'affichage dans la colonne de droite
-                st.session_state.prediction_data = prediction_data
+            
+            with col1_4:
+                st.metric(
+                    "Confiance",
+                    f"{prediction_data['confidence_score']:.1%}",
+                    delta=None
+                )
+            
+            # Graphique de prédiction
+            st.subheader(f"📊 Évolution Prédite ({n_days} jours)")
+            
+            fig = go.Figure()
+            
+            # Prix actuels (derniers 7 jours)
+            dates = pd.date_range(end=datetime.now(), periods=7, freq='D')
+            current_prices = [prediction_data['current_price']] * 7
+            
+            fig.add_trace(go.Scatter(
+                x=dates,
+                y=current_prices,
+                mode='lines+markers',
+                name='Prix Actuel',
+                line=dict(color='blue', width=2)
+            ))
+            
+            # Prix prédits
+            prediction_dates = pd.to_datetime(prediction_data['prediction_dates'])
+            fig.add_trace(go.Scatter(
+                x=prediction_dates,
+                y=prediction_data['predicted_prices'],
+                mode='lines+markers',
+                name='Prix Prédit',
+                line=dict(color='red', width=2, dash='dash')
+            ))
+            
+            fig.update_layout(
+                title=f"Prédiction Bitcoin - {n_days} jours",
+                xaxis_title="Date",
+                yaxis_title="Prix (USD)",
+                hovermode='x unified',
+                height=400
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Stockage des données pour l'affichage dans la colonne de droite
+            st.session_state.prediction_data = prediction_data
 
 with col2:
     st.subheader("💡 Recommandation DCA")
@@ -165,6 +187,11 @@ with col2:
         if st.button("🔄 Actualiser", use_container_width=True):
             st.rerun()
     else:
+        # Prédiction 30 jours par défaut: partagée entre les utilisateurs via le cache du client
+        default_prediction = get_prediction(30) if health["ready"] else None
+        if default_prediction:
+            st.info(default_prediction['dca_recommendation']['message'])
+            st.markdown(f"**Raison:** {default_prediction['dca_recommendation']['reason']}")
         st.info("Cliquez sur 'Générer Prédiction' pour voir les recommandations")
 
 # Section d'informations
@@ -0,0 +1,49 @@
+"""Outils partagés par les tests: chemins du dépôt, service sur market_data.csv et doublures"""
+
+import os
+import sys
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BACKEND_DIR = os.path.join(ROOT_DIR, 'app', 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from services.candle_store import CandleStore, CSVReplaySource
+from services.prediction_service import BitcoinPredictionService
+
+MARKET_DATA = os.path.join(ROOT_DIR, 'market_data.csv')
+MODEL_PATH = os.path.join(ROOT_DIR, 'app', 'models', 'model.h5')
+
+
+class CountingModel:
+    """Enveloppe qui compte les appels au modèle"""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, x, verbose=0):
+        self.calls += 1
+        return self.model.predict(x, verbose=verbose)
+
+
+def make_store(directory):
+    """Store de bougies initialisé depuis market_data.csv, qui le rejoue comme source"""
+    return CandleStore(directory, source=CSVReplaySource(MARKET_DATA), seed_csv=MARKET_DATA)
+
+
+def make_service(tmp, model_path=MODEL_PATH, count_calls=False, **kwargs):
+    """Service NumPy sur market_data.csv (store dans `tmp`, sauf store_root/store fournis)
+
+    `count_calls`: le modèle par défaut est enveloppé dans un CountingModel
+    (accessible par `service.model`).
+    """
+    kwargs.setdefault('backend', 'numpy')
+    if 'store_root' not in kwargs:
+        kwargs.setdefault('store', make_store(tmp))
+    service = BitcoinPredictionService(model_path=model_path, **kwargs)
+    if count_calls:
+        entry = service.resolve_model()
+        entry.model = service.model = CountingModel(entry.model)
+    return service
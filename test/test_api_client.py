@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+# Ajout de la racine du projet au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT_DIR)
+
+from api_client import APIError, PredictionAPIClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_api(counters):
+    """API minimale: /predict avec ETag (version modifiable) et /ready"""
+    app = Flask(__name__)
+    state = {"version": "v1"}
+
+    @app.route('/predict')
+    def predict():
+        counters["requests"] += 1
+        etag = f'W/"{state["version"]}-{request.args.get("days")}"'
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=304, headers={"ETag": etag, "Cache-Control": "public, max-age=60"})
+        counters["computed"] += 1
+        response = jsonify({"success": True, "data": {"version": state["version"], "days": request.args["days"]}})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "public, max-age=60"
+        return response
+
+    @app.route('/ready')
+    def ready():
+        return jsonify({"ready": True})
+
+    return app, state
+
+
+def start_server(app):
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_cached_predictions_and_revalidation():
+    counters = {"requests": 0, "computed": 0}
+    app, state = make_api(counters)
+    server = start_server(app)
+    clock = FakeClock()
+    client = PredictionAPIClient(f"http://127.0.0.1:{server.port}", ttl=30, clock=clock)
+    try:
+        assert client.get_prediction(days=30)["version"] == "v1"
+        # Dans le TTL: aucune requête
+        client.get_prediction(days=30)
+        assert counters["requests"] == 1 and client.stats["hits"] == 1
+
+        # TTL expiré: requête conditionnelle, 304 sans recalcul
+        clock.now = 31
+        assert client.get_prediction(days=30)["version"] == "v1"
+        assert counters["requests"] == 2 and counters["computed"] == 1
+
+        # Nouvelle version côté serveur: téléchargée à la revalidation suivante
+        state["version"] = "v2"
+        clock.now = 62
+        assert client.get_prediction(days=30)["version"] == "v2"
+        # Horizon différent: entrée de cache distincte
+        assert client.get_prediction(days=7)["days"] == "7"
+    finally:
+        server.shutdown()
+
+    # API arrêtée: la dernière version connue est servie, sinon APIError
+    clock.now = 200
+    assert client.get_prediction(days=30)["version"] == "v2"
+    try:
+        client.get_prediction(days=90)
+        assert False, "APIError attendue"
+    except APIError:
+        pass
+    client.close()
+
+
+def test_background_health_probe():
+    app, _ = make_api({"requests": 0, "computed": 0})
+    server = start_server(app)
+    client = PredictionAPIClient(f"http://127.0.0.1:{server.port}", health_interval=60)
+    try:
+        assert client.health()["status"] == "unknown"
+        assert client.probe_health()["ready"]
+        assert client.health()["status"] == "ready"
+    finally:
+        server.shutdown()
+    assert client.probe_health()["status"] == "unreachable"
+    client.close()
+
+
+if __name__ == "__main__":
+    test_cached_predictions_and_revalidation()
+    print("SUCCESS: test_cached_predictions_and_revalidation")
+    test_background_health_probe()
+    print("SUCCESS: test_background_health_probe")
@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from helpers import MARKET_DATA, make_service
+from services.candle_store import CSVReplaySource
+
+
+class ReplayUntil(CSVReplaySource):
+    """market_data.csv rejoué jusqu'à `until` inclus (historique tel qu'il était à cette date)"""
+
+    def __init__(self, csv_path, until=None):
+        super().__init__(csv_path)
+        self.until = pd.Timestamp(until) if until is not None else None
+
+    def fetch(self, start=None, period="300d"):
+        data = super().fetch(start=start, period=None if start is None else period)
+        return data if self.until is None else data[data.index <= self.until]
+
+
+def make_replay_service(tmp, until=None, **kwargs):
+    """Service dont l'historique local (market_data.csv) s'arrête éventuellement à `until`"""
+    return make_service(tmp, store_root=tmp, seed_csv=None,
+                        source_factory=lambda ticker: ReplayUntil(MARKET_DATA, until), **kwargs)
+
+
+def test_as_of_matches_live_without_lookahead():
+    """Une prévision datée ne dépend que des bougies connues à cette date"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_replay_service(os.path.join(tmp, 'full'))
+        service.refresh_store()
+        result = service.generate_as_of_prediction("2025-06-01", n_days=10)
+        assert result["success"] and result["as_of"] == "2025-06-01"
+        assert result["last_candle_date"] == "2025-06-01"
+        assert result["prediction_dates"][:2] == ["2025-06-02", "2025-06-03"]
+        close = CSVReplaySource(MARKET_DATA).fetch(period=None).loc["2025-06-01", "Close"]
+        assert result["current_price"] == close
+
+        # Même prévision qu'un service dont l'historique s'arrêtait ce jour-là (aucune donnée postérieure)
+        past = make_replay_service(os.path.join(tmp, 'past'), until="2025-06-01")
+        live_then = past.generate_prediction(n_days=10)
+        np.testing.assert_allclose(result["predicted_prices"], live_then["predicted_prices"], rtol=1e-12)
+        assert result["current_price"] == live_then["current_price"]
+
+        # Date sans bougie: dernière bougie connue à cette date
+        assert service.generate_as_of_prediction("2025-06-01 18:00", n_days=10)["as_of"] == "2025-06-01"
+
+        # À la dernière bougie, la prévision datée est la prévision en direct
+        latest = service.generate_as_of_prediction("2025-07-29", n_days=10)
+        np.testing.assert_allclose(latest["predicted_prices"], service.generate_prediction(n_days=10)["predicted_prices"],
+                                   rtol=1e-12)
+
+
+def test_as_of_range_is_batched():
+    """Une période donne une prévision par bougie, en n_days appels au modèle au total"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_replay_service(tmp, count_calls=True)
+        service.refresh_store()
+        model = service.model
+
+        result = service.generate_as_of_prediction("2025-06-01", n_days=7, as_of_end="2025-06-30")
+        assert model.calls == 7 and result["model_calls"] == 7
+        assert result["n_forecasts"] == 30
+        assert (result["as_of_start"], result["as_of_end"]) == ("2025-06-01", "2025-06-30")
+        assert [forecast["as_of"] for forecast in result["forecasts"]] == \
+            [f"{day:%Y-%m-%d}" for day in pd.date_range("2025-06-01", "2025-06-30")]
+
+        # Chaque ancre garde sa propre fenêtre (indicateurs et scalers): identique au calcul isolé
+        for forecast in result["forecasts"][::7]:
+            single = service.generate_as_of_prediction(forecast["as_of"], n_days=7)
+            np.testing.assert_allclose(forecast["predicted_prices"], single["predicted_prices"], rtol=1e-6)
+
+        # Requête identique: servie par le cache, sans appel au modèle
+        calls = model.calls
+        service.generate_as_of_prediction("2025-06-01", n_days=7, as_of_end="2025-06-30")
+        assert model.calls == calls
+
+        for as_of, as_of_end in [("2024-01-01", None), ("2025-03-01", None), ("pas une date", None),
+                                 ("2025-06-30", "2025-06-01"), ("2025-08-01", "2025-08-31")]:
+            try:
+                service.generate_as_of_prediction(as_of, as_of_end=as_of_end)
+                assert False, f"ValueError attendue pour {as_of} / {as_of_end}"
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    for test in [test_as_of_matches_live_without_lookahead, test_as_of_range_is_batched]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
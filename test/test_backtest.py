@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from helpers import MARKET_DATA, MODEL_PATH, make_service
+from services.backtest import FEATURES, load_history, walk_forward
+from services.model_bundle import save_bundle
+
+
+def test_walk_forward_pool_matches_single_process():
+    """Le backtest réparti sur un pool donne les mêmes résultats qu'en un seul processus"""
+    data = load_history(MARKET_DATA)
+    single = walk_forward(data, model_path=MODEL_PATH, workers=1)
+    pooled = walk_forward(data, model_path=MODEL_PATH, workers=2, chunk_size=40)
+
+    assert single["predictions"].shape == (len(single["anchors"]), 30)
+    assert len(single["mape_per_day"]) == 30
+    np.testing.assert_allclose(pooled["predictions"], single["predictions"])
+    # Le prix réel du jour 1 d'une ancre est le Close de la bougie suivante
+    first = data.index.get_loc(single["anchors"][0])
+    assert single["actual"][0, 0] == data['Close'].iloc[first + 1]
+
+
+def test_walk_forward_has_no_lookahead():
+    """Chaque ancre est prédite comme le service en direct à cette date (fenêtre et scalers jusqu'à l'ancre)"""
+    data = load_history(MARKET_DATA)
+    result = walk_forward(data, model_path=MODEL_PATH, workers=1)
+    # Ancres avec au moins 50 bougies exploitables, comme le service
+    assert result["anchors"][-1] == data.index[-31]
+    assert 0 < len(result["anchors"]) < len(data) - 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        for i in (0, len(result["anchors"]) // 2, -1):
+            anchor = result["anchors"][i]
+            live = service.generate_as_of_prediction(f"{anchor:%Y-%m-%d}", n_days=30)
+            np.testing.assert_allclose(result["predictions"][i], live["predicted_prices"], rtol=1e-6)
+
+
+def test_walk_forward_uses_frozen_bundle_scalers():
+    """Un bundle est évalué avec ses scalers d'entraînement, comme le service le sert"""
+    data = load_history(MARKET_DATA)
+    scaler_x = MinMaxScaler(feature_range=(-1, 1)).fit(data[FEATURES].values)
+    scaler_y = MinMaxScaler(feature_range=(-1, 1)).fit(data[['Close']].values)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        save_bundle(path, MODEL_PATH, scaler_x, scaler_y, FEATURES)
+        result = walk_forward(data, model_path=path, workers=1)
+        refitted = walk_forward(data, model_path=MODEL_PATH, workers=1)
+        assert not np.allclose(result["predictions"], refitted["predictions"])
+
+        service = make_service(tmp, model_path=path)
+        for i in (0, -1):
+            anchor = result["anchors"][i]
+            live = service.generate_as_of_prediction(f"{anchor:%Y-%m-%d}", n_days=30)
+            np.testing.assert_allclose(result["predictions"][i], live["predicted_prices"], rtol=1e-6)
+
+
+if __name__ == "__main__":
+    for test in [test_walk_forward_pool_matches_single_process, test_walk_forward_has_no_lookahead,
+                 test_walk_forward_uses_frozen_bundle_scalers]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
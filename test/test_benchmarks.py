@@ -0,0 +1,30 @@
+import os
+import sys
+
+# Ajout du chemin des benchmarks au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'benchmarks'))
+
+from run_benchmarks import compare, run
+
+
+def test_benchmarks_run_offline():
+    """La suite s'exécute hors ligne et produit un rapport JSON par cas"""
+    report = run(backends=['numpy'], repeats=1, min_time=0, only=['calculate_rsi', 'predict_step'])
+    assert set(report["results"]) == {"calculate_rsi", "predict_step[numpy]"}
+    for result in report["results"].values():
+        assert result["median_s"] > 0
+
+
+def test_compare_flags_regressions():
+    """Seules les médianes au-delà du seuil sont signalées"""
+    baseline = {"results": {"a": {"median_s": 1.0}, "b": {"median_s": 1.0}}}
+    current = {"results": {"a": {"median_s": 1.1}, "b": {"median_s": 1.5}, "c": {"median_s": 9.0}}}
+    regressions = compare(current, baseline, threshold=0.2)
+    assert [regression["name"] for regression in regressions] == ["b"]
+
+
+if __name__ == "__main__":
+    for test in [test_benchmarks_run_offline, test_compare_flags_regressions]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
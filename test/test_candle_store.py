@@ -0,0 +1,153 @@
+import tempfile
+import threading
+
+import pandas as pd
+
+from helpers import MARKET_DATA, make_service, make_store
+from services.candle_store import CandleStore, CSVReplaySource
+
+
+class FailingSource:
+    """Source indisponible (yfinance en panne) qui compte les appels"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, start=None, period="300d"):
+        self.calls += 1
+        raise ConnectionError("source indisponible")
+
+
+class CountingSource(CSVReplaySource):
+    """Source CSV qui ne rejoue que les bougies jusqu'à `until` et compte les appels"""
+
+    def __init__(self, csv_path, until):
+        super().__init__(csv_path)
+        self.until = pd.Timestamp(until)
+        self.calls = []
+
+    def fetch(self, start=None, period="300d"):
+        self.calls.append(start)
+        data = super().fetch(start=start, period=period)
+        return data[data.index <= self.until]
+
+
+def test_seed_from_csv():
+    """Le store initialisé depuis market_data.csv contient toutes les bougies, triées"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        expected = CSVReplaySource(MARKET_DATA).fetch(period=None)
+        data = store.load()
+        assert len(data) == len(expected)
+        assert data.index.is_monotonic_increasing
+        pd.testing.assert_frame_equal(data, expected, check_freq=False, check_names=False, check_dtype=False)
+
+
+def test_incremental_update():
+    """Seules les bougies plus récentes que la dernière date stockée sont ajoutées"""
+    full = CSVReplaySource(MARKET_DATA).fetch(period=None)
+    split_date = full.index[100]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp, source=CountingSource(MARKET_DATA, split_date))
+        store.append(full.iloc[:50])
+        store.update(force=True)
+        assert store.last_date() == split_date
+        assert len(store) == 101
+
+        # Nouvelle bougie disponible côté source: un seul ajout, depuis la dernière date
+        store.source.until = full.index[101]
+        added = store.update(force=True)
+        assert added == 1
+        assert store.source.calls[-1] == split_date
+        pd.testing.assert_frame_equal(store.load(), full.iloc[:102], check_freq=False, check_names=False, check_dtype=False)
+
+
+def test_backfill_is_contiguous_and_throttled():
+    """Historique court complété en une requête sans trou, au plus une tentative par intervalle"""
+    full = CSVReplaySource(MARKET_DATA).fetch(period=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Store initialisé depuis un CSV partiel, en retard sur la source
+        store = CandleStore(tmp, source=CountingSource(MARKET_DATA, full.index[140]), min_update_interval=3600)
+        store.append(full.iloc[60:100])
+        store.update(min_rows=300)
+        assert store.source.calls == [full.index[60] - pd.Timedelta(days=260)]
+        pd.testing.assert_frame_equal(store.load(), full.iloc[:141], check_freq=False, check_names=False,
+                                      check_dtype=False)
+
+        # Dans l'intervalle: aucun appel à la source, même avec un historique toujours trop court
+        assert store.update(min_rows=300) == 0 and len(store.source.calls) == 1
+
+        # Rien de plus ancien côté source: historique marqué complet, mises à jour incrémentales ensuite
+        store.source.until = full.index[141]
+        assert store.update(force=True, min_rows=300) == 1
+        assert store.update(force=True, min_rows=300) == 0
+        assert store.source.calls[-1] == full.index[141]
+        assert len(store) == 142
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Source en échec: la tentative compte aussi, pas de nouvel appel à chaque requête
+        store = CandleStore(tmp, source=FailingSource(), seed_csv=MARKET_DATA, min_update_interval=3600)
+        try:
+            store.update(min_rows=300)
+            assert False, "ConnectionError attendue"
+        except ConnectionError:
+            pass
+        assert store.update(min_rows=300) == 0 and store.source.calls == 1
+
+
+def test_service_refreshes_short_store_once():
+    """Store plus court que history_days (market_data.csv): pas de récupération complète à chaque prédiction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = CountingSource(MARKET_DATA, "2025-07-29")
+        service = make_service(tmp, store=CandleStore(tmp, source=source, seed_csv=MARKET_DATA))
+        for _ in range(3):
+            assert service.generate_prediction(n_days=7)["success"]
+        assert len(source.calls) == 1
+
+
+def test_last_candle_rewritten():
+    """La dernière bougie (en cours) est réécrite et non dupliquée"""
+    full = CSVReplaySource(MARKET_DATA).fetch(period=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp, source=CSVReplaySource(MARKET_DATA))
+        store.append(full.iloc[:10])
+        updated = full.iloc[9:10].copy()
+        updated['Close'] = 1.0
+        store.append(updated)
+        data = store.load()
+        assert len(data) == 10
+        assert data['Close'].iloc[-1] == 1.0
+
+
+def test_load_window_and_end():
+    """`load` retourne les n dernières bougies jusqu'à une date donnée"""
+    full = CSVReplaySource(MARKET_DATA).fetch(period=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        data = store.load(n_rows=20, end=full.index[60])
+        assert len(data) == 20
+        assert data.index[-1] == full.index[60]
+
+
+def test_reads_wait_for_writers():
+    """`last_date` attend la fin d'une écriture en cours (colonnes tronquées puis réécrites)"""
+    full = CSVReplaySource(MARKET_DATA).fetch(period=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp, source=CSVReplaySource(MARKET_DATA))
+        store.append(full)
+        result = []
+        with store._file_lock():
+            reader = threading.Thread(target=lambda: result.append(store.last_date()))
+            reader.start()
+            reader.join(timeout=0.3)
+            assert reader.is_alive() and not result
+        reader.join()
+        assert result == [full.index[-1]]
+
+
+if __name__ == "__main__":
+    for test in [test_seed_from_csv, test_incremental_update, test_backfill_is_contiguous_and_throttled,
+                 test_service_refreshes_short_store_once, test_last_candle_rewritten, test_load_window_and_end,
+                 test_reads_wait_for_writers]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from helpers import MARKET_DATA, MODEL_PATH
+import services.fine_tune as fine_tune_module
+from services.fine_tune import (PROMOTED, REJECTED, UP_TO_DATE, STAGING_DIRECTORY, fine_tune, has_new_candles,
+                                load_candles, read_state, start_background)
+from services.model_bundle import save_bundle
+from services.model_registry import FEATURES, ModelRegistry
+
+
+def test_warm_start_gate_and_hot_swap():
+    """Le candidat n'est promu que sans régression du MAPE; le registre recharge le modèle promu à chaud"""
+    data = load_candles(csv_path=MARKET_DATA)
+    x = np.zeros((1, 1, len(FEATURES)), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.h5')
+        shutil.copy(MODEL_PATH, model_path)
+        registry = ModelRegistry(directories=[tmp], backend='numpy')
+        deployed = registry.get('model.h5')
+
+        # Premier fine-tuning (sans état): validé sur les 14 dernières bougies, puis réentraîné sur tout l'historique
+        report = fine_tune(model_path, data.iloc[:-10], epochs=2, tolerance=1e9)
+        assert report["status"] == PROMOTED
+        assert report["train_samples"] == len(data) - 10 - 1 - 14
+        assert report["refit_samples"] == len(data) - 10 - 1
+        assert report["trained_until"] == f"{data.index[-11]:%Y-%m-%d}"
+        promoted = registry.get('model.h5')
+        assert promoted is not deployed and promoted.mtime > deployed.mtime
+        assert not np.allclose(promoted.model.predict(x), deployed.model.predict(x))
+        assert os.path.exists(os.path.join(tmp, STAGING_DIRECTORY, 'model.h5.previous'))
+        assert registry.available() == ['model.h5']
+
+        # Aucune nouvelle bougie: rien à faire
+        assert not has_new_candles(model_path, data.index[-11])
+        assert fine_tune(model_path, data.iloc[:-10])["status"] == UP_TO_DATE
+
+        # 5 nouvelles bougies (dans la période de validation), complétées par les plus récentes déjà vues;
+        # régression refusée: le modèle et trained_until sont inchangés
+        assert has_new_candles(model_path, data.index[-6])
+        mtime = os.path.getmtime(model_path)
+        report = fine_tune(model_path, data.iloc[:-5], epochs=2, min_samples=32, tolerance=-1)
+        assert report["status"] == REJECTED and report["new_candles"] == 5 and report["train_samples"] == 32
+        assert "refit_samples" not in report
+        assert os.path.getmtime(model_path) == mtime and registry.get('model.h5') is promoted
+        assert sorted(os.listdir(os.path.join(tmp, STAGING_DIRECTORY))) == ['.lock', 'model.h5.previous']
+
+        # 5 bougies de plus: les 10 bougies jamais apprises sont dans le réentraînement du modèle promu
+        report = fine_tune(model_path, data, epochs=2, min_samples=32, tolerance=1e9)
+        assert report["status"] == PROMOTED and report["refit_samples"] == 32
+        assert report["trained_until"] == f"{data.index[-1]:%Y-%m-%d}"
+
+        state = read_state(model_path)
+        assert state["last_candle"] == state["trained_until"] == f"{data.index[-1]:%Y-%m-%d}"
+        assert [run["status"] for run in state["runs"]] == [PROMOTED, REJECTED, PROMOTED]
+
+
+def test_divergent_refit_not_promoted():
+    """Le modèle réentraîné est évalué avant promotion: une divergence après la validation est refusée"""
+    data = load_candles(csv_path=MARKET_DATA)
+    warm_start = fine_tune_module._warm_start
+
+    def diverging_refit(entry, samples, *args):
+        model = warm_start(entry, samples, *args)
+        if samples.indices[-1] == len(data) - 2:
+            # Réentraînement (jusqu'à la dernière bougie): poids perturbés
+            rng = np.random.default_rng(0)
+            model.set_weights([weights + rng.normal(0, 1, weights.shape) for weights in model.get_weights()])
+        return model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.h5')
+        shutil.copy(MODEL_PATH, model_path)
+        mtime = os.path.getmtime(model_path)
+        fine_tune_module._warm_start = diverging_refit
+        try:
+            report = fine_tune(model_path, data, epochs=1, tolerance=0.5)
+        finally:
+            fine_tune_module._warm_start = warm_start
+        assert report["holdout_mape_after"] <= report["holdout_mape_before"] * 1.5
+        assert report["holdout_mape_refit"] > report["holdout_mape_before"] * 1.5
+        assert report["status"] == REJECTED and report["trained_until"] is None
+        assert os.path.getmtime(model_path) == mtime
+        assert sorted(os.listdir(os.path.join(tmp, STAGING_DIRECTORY))) == ['.lock']
+
+
+def test_background_process_with_bundle():
+    """Fine-tuning d'un bundle dans un processus séparé limité à un cœur"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'model.npz')
+        save_bundle(bundle_path, MODEL_PATH, None, None, FEATURES, metadata={"window": 1})
+
+        report = start_background(bundle_path, csv_path=MARKET_DATA, threads=1, epochs=1,
+                                  tolerance=1e9).result(timeout=300)
+        assert report["status"] == PROMOTED
+        entry = ModelRegistry(directories=[tmp], backend='numpy').get('model.npz')
+        assert entry.metadata["trained_until"] == report["trained_until"]
+        assert entry.metadata["window"] == 1 and entry.features == FEATURES
+
+
+if __name__ == "__main__":
+    for test in [test_warm_start_gate_and_hot_swap, test_divergent_refit_not_promoted,
+                 test_background_process_with_bundle]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
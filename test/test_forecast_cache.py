@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+
+# Ajout du chemin du backend au PYTHONPATH
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app', 'backend'))
+
+from services.forecast_cache import ForecastCache
+
+
+def test_single_flight():
+    """Les requêtes concurrentes identiques partagent un seul calcul"""
+    cache = ForecastCache(maxsize=4, ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"success": True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_ttl_and_lru():
+    """Les entrées expirent après le TTL et les moins récentes sont évincées"""
+    cache = ForecastCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_errors_not_cached():
+    """Les résultats en échec et les exceptions ne sont pas mis en cache"""
+    cache = ForecastCache()
+    cache.get_or_compute("k", lambda: {"success": False}, cache_if=lambda r: r["success"])
+    assert cache.get("k") is None
+
+    def failing():
+        raise RuntimeError("boom")
+
+    try:
+        cache.get_or_compute("k", failing)
+        assert False, "L'exception aurait dû être propagée"
+    except RuntimeError:
+        pass
+    assert cache.get_or_compute("k", lambda: 42) == 42
+
+
+if __name__ == "__main__":
+    for test in [test_single_flight, test_ttl_and_lru, test_errors_not_cached]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
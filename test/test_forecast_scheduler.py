@@ -0,0 +1,156 @@
+import os
+import tempfile
+import time
+
+from helpers import MARKET_DATA, make_service
+from services.candle_store import CandleStore, CSVReplaySource
+from services.forecast_scheduler import DAY_SECONDS, ForecastScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Délai dépassé"
+        time.sleep(0.01)
+
+
+def test_calendar():
+    """Le recalcul est prévu à minuit UTC + close_delay"""
+    scheduler = ForecastScheduler(None, close_delay=300)
+    midnight = 20000 * DAY_SECONDS
+    assert scheduler.last_run_time(midnight + 299) == midnight - DAY_SECONDS + 300
+    assert scheduler.last_run_time(midnight + 300) == midnight + 300
+    assert scheduler.seconds_until_next_run(midnight + 300) == DAY_SECONDS
+
+
+def test_stale_while_revalidate():
+    """La prévision publiée est servie sans calcul, même périmée, puis recalculée en arrière-plan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        clock = FakeClock(20000 * DAY_SECONDS + 3600)
+        scheduler = ForecastScheduler(service, jobs=[(30, None), (7, None)], clock=clock, retry_delay=0)
+        try:
+            scheduler.ensure_started()
+            wait_for(lambda: scheduler.refreshes == 1)
+
+            fresh = scheduler.get(30)
+            assert fresh["success"] and not fresh["stale"]
+            assert len(fresh["predicted_prices"]) == 30
+            assert len(scheduler.get(7)["predicted_prices"]) == 7
+            assert scheduler.get(14) is None
+
+            # Clôture de la bougie suivante: l'ancienne prévision est servie immédiatement
+            clock.now += DAY_SECONDS
+            stale = scheduler.get(30)
+            assert stale["stale"]
+            assert stale["data_age_seconds"] == DAY_SECONDS
+            wait_for(lambda: scheduler.refreshes == 2)
+            assert not scheduler.get(30)["stale"]
+        finally:
+            scheduler.stop()
+
+
+def test_failed_refresh_keeps_published():
+    """Un recalcul en échec garde la version publiée"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        after_refresh = []
+        scheduler = ForecastScheduler(service, after_refresh=lambda: after_refresh.append(scheduler.refreshes))
+        scheduler.stop()  # Pas de thread: recalculs manuels
+        assert scheduler.refresh()
+        published = scheduler.get(30)
+        assert after_refresh == [1]
+
+        service.generate_prediction = lambda n_days, model_name, entry: {"success": False,
+                                                                         "error": "source indisponible"}
+        assert not scheduler.refresh()
+        assert scheduler.failures == 1
+        # Pas de tâche après un recalcul en échec (ex: fine-tuning)
+        assert after_refresh == [1]
+        assert scheduler.get(30)["predicted_prices"] == published["predicted_prices"]
+
+
+def test_forecast_of_previous_model_not_served():
+    """Après un rechargement à chaud du modèle, la prévision publiée par l'ancien modèle n'est plus servie"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        clock = FakeClock(20000 * DAY_SECONDS + 3600)
+        scheduler = ForecastScheduler(service, jobs=[(7, None)], clock=clock, retry_delay=0)
+        scheduler.stop()  # Pas de thread: recalculs manuels
+        assert scheduler.refresh()
+        identity = service.model_identity()
+        assert scheduler.get(7, identity=identity)["predicted_prices"]
+
+        # Nouveau fichier modèle (mtime différent): prévision ignorée et recalcul demandé
+        swapped = identity[:2] + (identity[2] + 1,) + identity[3:]
+        scheduler._last_refresh_request = None
+        assert scheduler.get(7, identity=swapped) is None
+        assert scheduler._last_refresh_request == clock.now
+        # Publication partagée (JSON): l'identité est comparée après relecture
+        scheduler._published = {key: {**entry, "identity": list(entry["identity"])}
+                                 for key, entry in scheduler._published.items()}
+        assert scheduler.get(7, identity=identity) is not None
+
+
+def test_refresh_backfills_short_store():
+    """Le précalcul complète un historique local trop court pour MM_200, comme une requête"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = CSVReplaySource(MARKET_DATA)
+        store = CandleStore(os.path.join(tmp, 'candles'), source=source)
+        store.append(source.fetch(period=None).iloc[-20:])
+        service = make_service(tmp, store=store)
+        scheduler = ForecastScheduler(service, jobs=[(7, None)])
+        scheduler.stop()  # Pas de thread: recalculs manuels
+
+        assert scheduler.refresh()
+        assert len(store) == len(source.fetch(period=None))
+        assert scheduler.get(7)["success"]
+
+
+def test_single_leader_across_workers():
+    """Un seul scheduler par store recalcule (et lance le fine-tuning); les autres servent ses prévisions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(os.path.join(tmp, 'store'))
+        shared_dir = service.store.directory
+        clock = FakeClock(20000 * DAY_SECONDS + 3600)
+        after_refresh = []
+        schedulers = [ForecastScheduler(service, jobs=[(7, None)], clock=clock, retry_delay=0, shared_dir=shared_dir,
+                                        after_refresh=lambda worker=worker: after_refresh.append(worker))
+                      for worker in range(3)]
+        leader, followers = schedulers[0], schedulers[1:]
+        try:
+            leader.ensure_started()
+            wait_for(lambda: leader.refreshes == 1)
+            for follower in followers:
+                follower.ensure_started()
+                forecast = follower.get(7)
+                assert forecast["predicted_prices"] == leader.get(7)["predicted_prices"]
+                assert not forecast["stale"] and not follower.status()["leader"]
+            assert leader.status()["leader"]
+            time.sleep(0.2)
+            assert [scheduler.refreshes for scheduler in schedulers] == [1, 0, 0]
+            assert after_refresh == [0]
+
+            # Fin du leader (verrou libéré): un autre processus est élu
+            leader.stop()
+            leader._leader_file.close()
+            assert followers[0].is_leader() and not followers[1].is_leader()
+        finally:
+            for scheduler in schedulers:
+                scheduler.stop()
+
+
+if __name__ == "__main__":
+    for test in [test_calendar, test_stale_while_revalidate, test_failed_refresh_keeps_published,
+                 test_forecast_of_previous_model_not_served, test_refresh_backfills_short_store,
+                 test_single_leader_across_workers]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
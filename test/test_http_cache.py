@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+from flask import Flask, Response, jsonify, request
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.http_cache import (FastJSONProvider, compress_response, forecast_etag, is_not_modified,
+                                 last_modified_for, tag_response)
+
+IDENTITY = ("model.h5", "app/models/model.h5", 1754236996.0, "numpy")
+
+
+def make_app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def test_etag_depends_on_model_candle_and_params():
+    etag = forecast_etag(IDENTITY, "2025-07-29", 30, 0, None)
+    assert etag == forecast_etag(IDENTITY, "2025-07-29", 30, 0, None)
+    assert etag != forecast_etag(IDENTITY, "2025-07-30", 30, 0, None)
+    assert etag != forecast_etag(IDENTITY, "2025-07-29", 90, 0, None)
+    assert etag != forecast_etag(IDENTITY[:2] + (1754236997.0,) + IDENTITY[3:], "2025-07-29", 30, 0, None)
+
+    # Dernière modification: la plus récente entre la bougie et le fichier du modèle
+    assert last_modified_for(0, "2025-07-29") == datetime(2025, 7, 29, tzinfo=timezone.utc)
+
+
+def test_conditional_requests():
+    app = make_app()
+    etag = forecast_etag(IDENTITY, "2025-07-29", 30)
+    last_modified = last_modified_for(0, "2025-07-29")
+
+    response = tag_response(Response("{}"), etag, last_modified, max_age=60)
+    assert response.headers["ETag"] == f'W/"{etag}"'
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+    with app.test_request_context(headers={"If-None-Match": response.headers["ETag"]}):
+        assert is_not_modified(request, etag, last_modified)
+    with app.test_request_context(headers={"If-None-Match": '"autre"'}):
+        assert not is_not_modified(request, etag, last_modified)
+    with app.test_request_context(headers={"If-Modified-Since": response.headers["Last-Modified"]}):
+        assert is_not_modified(request, etag, last_modified)
+    with app.test_request_context(method="POST", headers={"If-None-Match": response.headers["ETag"]}):
+        assert not is_not_modified(request, etag, last_modified)
+
+
+def test_compression():
+    app = make_app()
+    payload = {"predicted_prices": [float(p) for p in np.linspace(100000, 120000, 365)]}
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(jsonify(payload), request.accept_encodings)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert json.loads(gzip.decompress(response.get_data())) == payload
+
+        # Petites réponses et réponses diffusées non compressées
+        assert "Content-Encoding" not in compress_response(jsonify({"ok": True}), request.accept_encodings).headers
+        streamed = Response(iter(["a" * 2048]), mimetype="text/event-stream")
+        assert "Content-Encoding" not in compress_response(streamed, request.accept_encodings).headers
+
+    with app.test_request_context():
+        assert "Content-Encoding" not in compress_response(jsonify(payload), request.accept_encodings).headers
+
+
+def test_fast_json_provider_matches_standard_json():
+    app = make_app()
+    payload = {"b": [1.5, np.float64(2.25)], "a": "Prédiction", "n": np.arange(3), 1: None}
+    with app.app_context():
+        encoded = app.json.dumps(payload)
+    assert json.loads(encoded) == {"a": "Prédiction", "b": [1.5, 2.25], "n": [0, 1, 2], "1": None}
+
+
+if __name__ == "__main__":
+    test_etag_depends_on_model_candle_and_params()
+    print("SUCCESS: test_etag_depends_on_model_candle_and_params")
+    test_conditional_requests()
+    print("SUCCESS: test_conditional_requests")
+    test_compression()
+    print("SUCCESS: test_compression")
+    test_fast_json_provider_matches_standard_json()
+    print("SUCCESS: test_fast_json_provider_matches_standard_json")
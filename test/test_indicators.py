@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.candle_store import CandleStore
+from services.indicators import IndicatorEngine, StoreIndicators, calculate_rsi, compute_indicators
+
+MARKET_DATA = os.path.join(ROOT_DIR, 'market_data.csv')
+
+
+def load_closes():
+    """Clôtures de market_data.csv prolongées par une marche aléatoire (avec un palier plat)"""
+    closes = pd.read_csv(MARKET_DATA, index_col='Date', parse_dates=['Date']).sort_index()['Close'].values
+    rng = np.random.default_rng(0)
+    walk = closes[-1] * np.exp(np.cumsum(rng.normal(0, 0.02, 600)))
+    walk[100:120] = walk[99]
+    return pd.Series(np.concatenate([closes, walk]))
+
+
+def pandas_reference(closes):
+    """Calcul d'origine du service (pandas)"""
+    return closes.rolling(window=200, min_periods=1).mean(), calculate_rsi(closes, window=14)
+
+
+def test_batch_matches_pandas():
+    """Le mode batch NumPy correspond au calcul pandas"""
+    closes = load_closes()
+    mm_200, rsi_14 = pandas_reference(closes)
+    result = compute_indicators(pd.DataFrame({'Close': closes}))
+    np.testing.assert_allclose(result['MM_200'], mm_200, rtol=1e-12)
+    np.testing.assert_allclose(result['RSI_14'], rsi_14, rtol=1e-12, equal_nan=True)
+
+
+def test_incremental_matches_pandas():
+    """Les mises à jour incrémentales (avec ou sans backfill) correspondent au calcul pandas"""
+    closes = load_closes()
+    mm_200, rsi_14 = pandas_reference(closes)
+
+    engine = IndicatorEngine()
+    values = np.array([engine.update(close) for close in closes])
+    np.testing.assert_allclose(values[:, 0], mm_200, rtol=1e-12)
+    np.testing.assert_allclose(values[:, 1], rsi_14, rtol=1e-12, equal_nan=True)
+
+    engine = IndicatorEngine()
+    engine.backfill(closes[:300])
+    values = np.array([engine.update(close) for close in closes[300:]])
+    np.testing.assert_allclose(values[:, 0], mm_200[300:], rtol=1e-12)
+    np.testing.assert_allclose(values[:, 1], rsi_14[300:], rtol=1e-12)
+
+
+def test_store_indicators_follow_appends():
+    """Après des ajouts (et réécritures de la dernière bougie), les valeurs incrémentales sont celles du batch"""
+    closes = load_closes()
+    candles = pd.DataFrame({'Close': closes.values, 'Open': closes.values, 'High': closes.values,
+                            'Low': closes.values, 'Volume': 1.0},
+                           index=pd.date_range('2022-01-01', periods=len(closes), freq='D', name='Date'))
+
+    def check(indicators, store):
+        expected = compute_indicators(store.load()).iloc[-300:]
+        result = indicators.load(store)
+        assert result.index.equals(expected.index)
+        np.testing.assert_allclose(result[['MM_200', 'RSI_14']], expected[['MM_200', 'RSI_14']], rtol=1e-12)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp)
+        store.append(candles.iloc[100:650])
+        indicators = StoreIndicators(300)
+        check(indicators, store)
+
+        for stop in range(650, len(candles), 7):
+            # Nouvelles bougies; la dernière stockée (encore en cours) est réécrite à son prix final
+            store.append(candles.iloc[stop - 1:stop + 7])
+            check(indicators, store)
+            store.append(candles.iloc[[min(stop + 7, len(candles)) - 1]] * 1.01)
+            check(indicators, store)
+        assert indicators.cold_starts == 1
+
+        # Historique complété vers le passé: les indicateurs repartent d'un calcul batch
+        store.append(candles.iloc[:100])
+        store.append(candles.iloc[100:])
+        check(indicators, store)
+        assert indicators.cold_starts == 2
+
+
+if __name__ == "__main__":
+    for test in [test_batch_matches_pandas, test_incremental_matches_pandas, test_store_indicators_follow_appends]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
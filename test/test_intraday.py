@@ -0,0 +1,170 @@
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from helpers import MODEL_PATH
+from services.candle_store import CandleStore
+from services.indicators import compute_indicators
+from services.intraday import (FEATURE_COLUMNS, IntradayYFinanceSource, history_period, resample_ohlcv,
+                               stream_features)
+from services.model_bundle import save_bundle
+from services.numpy_lstm import NumpyLSTMModel
+from services.prediction_service import BitcoinPredictionService
+
+END = pd.Timestamp("2025-03-01 10:00")
+
+
+def make_5m_candles(days=20, seed=0):
+    """Bougies 5 minutes synthétiques (marche aléatoire) se terminant à END"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=END - pd.Timedelta(minutes=5), periods=days * 288, freq='5min', name='Date')
+    close = 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, len(index))))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, len(index))) * close
+    return pd.DataFrame({
+        'Close': close,
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Volume': rng.uniform(1, 100, len(index)),
+    }, index=index)
+
+
+class FakeChunks:
+    """Tranches servies depuis un DataFrame, avec une latence réseau simulée (bornes [start, end))"""
+
+    def __init__(self, data, latency=0.02, failing=()):
+        self.data = data
+        self.latency = latency
+        # Débuts de tranche en échec au premier appel (source momentanément indisponible)
+        self.failing = set(failing)
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.max_rows = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, start, end):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            if start in self.failing:
+                self.failing.discard(start)
+                raise ConnectionError(f"tranche {start} indisponible")
+            chunk = self.data[(self.data.index >= start) & (self.data.index < end)]
+            self.max_rows = max(self.max_rows, len(chunk))
+            return chunk
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def make_source(data, resolution='1h', chunk_days=1, failing=()):
+    fetch_chunk = FakeChunks(data, failing=failing)
+    source = IntradayYFinanceSource("BTC-USD", resolution=resolution, interval='5m',
+                                    chunk_span=pd.Timedelta(days=chunk_days), fetch_chunk=fetch_chunk,
+                                    clock=lambda: END)
+    return source, fetch_chunk
+
+
+def test_chunked_fetch_and_streaming_resample():
+    """Tranches récupérées en parallèle et agrégées en flux: même résultat qu'un resample de l'historique complet"""
+    data = make_5m_candles()
+    source, fetch_chunk = make_source(data)
+
+    bars = source.fetch(period="20d")
+    expected = resample_ohlcv(data, '1h')
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False)
+    assert fetch_chunk.calls == 20
+    assert fetch_chunk.max_active > 1
+    # Une tranche = un jour de bougies 5m: jamais l'historique complet en mémoire
+    assert fetch_chunk.max_rows == 288
+
+    # Bougies 1h: Open de la première bougie 5m, Close de la dernière, volume cumulé
+    hour = data.loc["2025-02-25 13:00":"2025-02-25 13:55"]
+    bar = bars.loc[pd.Timestamp("2025-02-25 13:00")]
+    assert bar['Open'] == hour['Open'].iloc[0] and bar['Close'] == hour['Close'].iloc[-1]
+    assert np.isclose(bar['Volume'], hour['Volume'].sum())
+    assert bar['High'] == hour['High'].max() and bar['Low'] == hour['Low'].min()
+
+    # Tranche intraday non alignée sur les heures: la bougie à cheval est complétée par la tranche suivante
+    odd, _ = make_source(data, chunk_days=0.37)
+    pd.testing.assert_frame_equal(odd.fetch(period="20d"), expected, check_freq=False)
+
+    assert history_period(300, '1h') == "14d"
+    assert history_period(300, '1d') == "300d"
+
+
+def test_failed_chunk_leaves_no_gap():
+    """Une tranche en échec au milieu: le store ne garde que le préfixe contigu et le complète ensuite"""
+    data = make_5m_candles()
+    source, _ = make_source(data, failing=[END - pd.Timedelta(days=10)])
+    expected = resample_ohlcv(data, '1h')
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp, source=source, resolution='1h')
+        store.update(force=True)
+        assert store.last_date() == END - pd.Timedelta(days=10, hours=1)
+        assert (np.diff(store.load().index.values) == np.timedelta64(1, 'h')).all()
+
+        # Mise à jour suivante (source rétablie): reprise à la dernière bougie, historique complet sans trou
+        store.update(force=True)
+        stored = store.load()
+        assert stored.index.equals(expected.index)
+        np.testing.assert_allclose(stored[expected.columns].values, expected.values)
+
+
+def test_streamed_features_match_batch():
+    """Les 7 features calculées lot par lot sont celles du calcul sur la série complète"""
+    data = make_5m_candles()
+    source, _ = make_source(data, chunk_days=0.5)
+
+    streamed = pd.concat(list(stream_features(source, END - pd.Timedelta(days=20))))
+    expected = compute_indicators(resample_ohlcv(data, '1h'))[FEATURE_COLUMNS].dropna()
+    assert list(streamed.columns) == FEATURE_COLUMNS
+    assert streamed.index.equals(expected.index)
+    np.testing.assert_allclose(streamed.values, expected.values, rtol=1e-9)
+
+
+def test_intraday_model_is_served():
+    """Un bundle entraîné en 1h est servi sur un store 1h, avec des dates de prédiction horaires"""
+    data = make_5m_candles()
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'model_1h.npz')
+        model = NumpyLSTMModel.from_h5(MODEL_PATH)
+        save_bundle(bundle_path, model, None, None, FEATURE_COLUMNS, metadata={"resolution": "1h"})
+
+        service = BitcoinPredictionService(
+            model_path=bundle_path, backend='numpy', seed_csv=None, store_root=os.path.join(tmp, 'candles'),
+            intraday_source_factory=lambda ticker, resolution: make_source(data, resolution)[0],
+        )
+        result = service.generate_prediction(n_days=6)
+        assert result["success"], result
+        assert result["model_info"]["resolution"] == "1h"
+        assert result["last_candle_date"] == "2025-03-01 09:00"
+        assert result["prediction_dates"][:2] == ["2025-03-01 10:00", "2025-03-01 11:00"]
+        assert len(result["predicted_prices"]) == 6
+
+        store = service.store_for(resolution='1h')
+        assert store.directory.endswith('BTC-USD_1h') and len(store) == 14 * 24
+        assert service.forecast_version()[1] == "2025-03-01 09:00"
+
+        # Un store ne mélange pas les résolutions
+        try:
+            CandleStore(store.directory, resolution='1d')
+            assert False, "ValueError attendue"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    for test in [test_chunked_fetch_and_streaming_resample, test_failed_chunk_leaves_no_gap,
+                 test_streamed_features_match_batch, test_intraday_model_is_served]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,59 @@
+import os
+import sys
+
+# Ajout du chemin des benchmarks au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'benchmarks'))
+
+from load_test import check_gates, compare, parse_mix, run, summarize
+
+
+def test_load_test_against_subprocess_server():
+    """Serveur démarré hors ligne (market_data.csv rejoué): débit, percentiles, erreurs et RSS par endpoint"""
+    report = run(duration=1.5, concurrency=4, warmup=0.5, mode='subprocess', days=(7, 30))
+    endpoints = report["endpoints"]
+    assert set(endpoints) == {"predict", "health", "model_status", "total"}
+    total = endpoints["total"]
+    assert total["requests"] == sum(endpoints[name]["requests"] for name in ("predict", "health", "model_status"))
+    assert total["error_rate"] == 0, total["error_kinds"]
+    assert total["throughput_rps"] > 0
+    assert 0 < total["p50_ms"] <= total["p99_ms"] <= total["max_ms"]
+    assert report["memory"]["peak_mb"] > 0
+    # Régime établi: aucune réécriture du store de bougies pendant la mesure
+    assert report["store_writes"] == []
+    assert check_gates(report, max_error_rate=0.01) == []
+
+
+def test_summary_gates_and_comparison():
+    """Percentiles et taux d'erreur calculés par endpoint; seuils et régressions signalés"""
+    records = [("predict", 0.0, latency / 1000, 200, None) for latency in range(1, 101)]
+    records.append(("health", 0.0, 0.002, None, "ConnectionError"))
+    summary = summarize(records, elapsed=2.0)
+    assert summary["predict"]["requests"] == 100 and summary["predict"]["error_rate"] == 0
+    assert abs(summary["predict"]["p50_ms"] - 50.5) < 1e-9
+    assert summary["health"]["error_kinds"] == {"ConnectionError": 1}
+    assert summary["total"]["throughput_rps"] == 50.5
+    assert list(summary)[-1] == "total"
+
+    report = {"endpoints": summary}
+    assert len(check_gates(report, max_error_rate=0.001, max_p99_ms=50, min_rps=100)) == 3
+
+    baseline = {"endpoints": {
+        "predict": {**summary["predict"], "p99_ms": 50.0},
+        "health": {**summary["health"]},
+    }}
+    regressions = compare(report, baseline, threshold=0.2)
+    assert [(regression["name"], regression["flags"]) for regression in regressions] == [("predict", ["p99"])]
+
+    assert parse_mix("predict=3,health") == {"predict": 3.0, "health": 1.0}
+    try:
+        parse_mix("predict=1,unknown=2")
+        assert False, "ValueError attendue"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    for test in [test_load_test_against_subprocess_server, test_summary_gates_and_comparison]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,61 @@
+import os
+import sys
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_prometheus_text_format():
+    """Compteurs, jauges et histogrammes au format texte Prometheus"""
+    registry = MetricsRegistry()
+    requests = Counter('test_requests_total', "Requêtes", ['endpoint'], registry=registry)
+    in_flight = Gauge('test_in_flight', "En cours", registry=registry)
+    latency = Histogram('test_latency_seconds', "Latence", ['stage'], buckets=(0.1, 1.0), registry=registry)
+
+    requests.labels(endpoint='/predict').inc()
+    requests.labels(endpoint='/predict').inc(2)
+    in_flight.set(3)
+    for value in (0.05, 0.1, 0.5, 5.0):
+        latency.labels(stage='rollout').observe(value)
+
+    lines = registry.render().splitlines()
+    pid = os.getpid()
+    assert '# TYPE test_requests_total counter' in lines
+    assert f'test_requests_total{{pid="{pid}",endpoint="/predict"}} 3.0' in lines
+    assert f'test_in_flight{{pid="{pid}"}} 3.0' in lines
+    # Buckets cumulés, borne supérieure incluse
+    assert f'test_latency_seconds_bucket{{pid="{pid}",stage="rollout",le="0.1"}} 2' in lines
+    assert f'test_latency_seconds_bucket{{pid="{pid}",stage="rollout",le="1.0"}} 3' in lines
+    assert f'test_latency_seconds_bucket{{pid="{pid}",stage="rollout",le="+Inf"}} 4' in lines
+    assert f'test_latency_seconds_count{{pid="{pid}",stage="rollout"}} 4' in lines
+    assert f'test_latency_seconds_sum{{pid="{pid}",stage="rollout"}} 5.65' in lines
+
+
+def test_labels_and_gauge_function():
+    """Labels obligatoires et échappés, jauge lue à la collecte"""
+    registry = MetricsRegistry()
+    counter = Counter('test_total', "Test", ['model'], registry=registry)
+    size = Gauge('test_size', "Taille", registry=registry)
+    items = [1, 2]
+    size.set_function(lambda: len(items))
+
+    try:
+        counter.inc()
+        assert False, "ValueError attendue"
+    except ValueError:
+        pass
+    counter.labels(model='a"b').inc()
+    items.append(3)
+
+    text = registry.render()
+    assert 'model="a\\"b"' in text
+    assert f'test_size{{pid="{os.getpid()}"}} 3.0' in text
+
+
+if __name__ == "__main__":
+    for test in [test_prometheus_text_format, test_labels_and_gauge_function]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
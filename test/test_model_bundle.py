@@ -0,0 +1,75 @@
+import os
+import tempfile
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from helpers import ROOT_DIR, MODEL_PATH, make_service, make_store
+from services.model_bundle import load_bundle, save_bundle
+from services.numpy_lstm import NumpyLSTMModel
+from services.prediction_service import FEATURES, BitcoinPredictionService
+
+SHIPPED_MODEL = os.path.join(ROOT_DIR, 'model', 'model_btc_rolling_30d_1y.h5')
+
+
+def make_scalers():
+    rng = np.random.default_rng(0)
+    scaler_x = MinMaxScaler(feature_range=(-1, 1)).fit(rng.uniform(0, 100, size=(50, 7)))
+    scaler_y = MinMaxScaler(feature_range=(-1, 1)).fit(rng.uniform(0, 100, size=(50, 1)))
+    return scaler_x, scaler_y
+
+
+def test_bundle_roundtrip():
+    """Le bundle restitue les mêmes prédictions et les mêmes scalers, en memory-map"""
+    scaler_x, scaler_y = make_scalers()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        save_bundle(path, MODEL_PATH, scaler_x, scaler_y, FEATURES, metadata={"mape_30d": 3.14})
+
+        for mmap in (True, False):
+            bundle = load_bundle(path, mmap=mmap)
+            assert bundle.features == FEATURES
+            assert bundle.metadata == {"mape_30d": 3.14}
+            x = np.random.default_rng(1).uniform(-1, 1, size=(4, 1, 7))
+            np.testing.assert_array_equal(bundle.model.predict(x), NumpyLSTMModel.from_h5(MODEL_PATH).predict(x))
+            values = np.arange(14, dtype=float).reshape(2, 7)
+            np.testing.assert_allclose(bundle.scaler_x.transform(values), scaler_x.transform(values))
+            np.testing.assert_allclose(bundle.scaler_y.inverse_transform([[0.5]]), scaler_y.inverse_transform([[0.5]]))
+
+        kernel = load_bundle(path).model.layers[0]["kernel"]
+        assert isinstance(kernel.base, np.memmap) or isinstance(kernel, np.memmap)
+
+
+def test_service_uses_frozen_scalers():
+    """Avec un bundle, le service n'ajuste plus les scalers sur les données de la requête"""
+    scaler_x, scaler_y = make_scalers()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        save_bundle(path, MODEL_PATH, scaler_x, scaler_y, FEATURES)
+        store = make_store(os.path.join(tmp, 'store'))
+        service = BitcoinPredictionService(model_path=path, store=store)
+
+        assert service.backend == 'numpy' and service.frozen_scalers
+        data = service.get_latest_bitcoin_data()
+        X_scaled, _ = service.prepare_data_for_prediction(data)
+        np.testing.assert_allclose(X_scaled, scaler_x.transform(data[FEATURES].values))
+        assert service.generate_prediction(n_days=5)["success"]
+
+
+def test_shipped_bundles_match_h5():
+    """Les bundles livrés (sans scalers d'entraînement) prédisent comme le .h5 dont ils sont exportés"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        expected = make_service(tmp, model_path=SHIPPED_MODEL, store=store).generate_prediction(n_days=30)["predicted_prices"]
+        for suffix, rtol in (('.npz', 1e-7), ('.float16.npz', 1e-3), ('.int8.npz', 1e-2)):
+            path = SHIPPED_MODEL.replace('.h5', suffix)
+            assert load_bundle(path).scaler_x is None
+            service = BitcoinPredictionService(model_path=path, store=store)
+            assert not service.frozen_scalers
+            np.testing.assert_allclose(service.generate_prediction(n_days=30)["predicted_prices"], expected, rtol=rtol)
+
+
+if __name__ == "__main__":
+    for test in [test_bundle_roundtrip, test_service_uses_frozen_scalers, test_shipped_bundles_match_h5]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
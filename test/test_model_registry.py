@@ -0,0 +1,71 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.model_registry import ModelRegistry
+
+MODEL_DIR = os.path.join(ROOT_DIR, 'model')
+
+
+def make_registry(tmp, max_resident=2):
+    for filename in ('model_btc_close_only_4y.h5', 'model_btc_ohlcv_4y.h5', 'model_btc_rolling_30d_1y.h5'):
+        shutil.copy(os.path.join(MODEL_DIR, filename), tmp)
+    return ModelRegistry(directories=[tmp], max_resident=max_resident, backend='numpy')
+
+
+def test_lazy_loading_and_lru():
+    """Les modèles sont chargés au premier usage et au plus max_resident restent en mémoire"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(tmp)
+        assert len(registry.available()) == 3
+        assert registry.status()["resident"] == []
+
+        assert registry.get('model_btc_close_only_4y.h5').features == ['Close']
+        assert registry.get('model_btc_ohlcv_4y.h5').features == ['Close', 'Open', 'High', 'Low', 'Volume']
+        registry.get('model_btc_close_only_4y.h5')
+        registry.get('model_btc_rolling_30d_1y.h5')
+
+        status = registry.status()
+        assert status["resident"] == ['model_btc_close_only_4y.h5', 'model_btc_rolling_30d_1y.h5']
+        assert status["resident_memory_bytes"] > 0
+
+
+def test_hot_swap_on_file_change():
+    """Un fichier modifié sur disque est rechargé sans redémarrage"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(tmp)
+        name = 'model_btc_rolling_30d_1y.h5'
+        first = registry.get(name)
+        assert registry.get(name) is first
+
+        # Remplacement atomique du fichier par un autre modèle
+        replacement = os.path.join(tmp, 'new.tmp')
+        shutil.copy(os.path.join(MODEL_DIR, 'model_btc_ohlcv_4y.h5'), replacement)
+        os.replace(replacement, os.path.join(tmp, name))
+        os.utime(os.path.join(tmp, name), (first.mtime + 10, first.mtime + 10))
+
+        second = registry.get(name)
+        assert second is not first
+        assert len(second.features) == 5
+
+
+def test_unknown_model():
+    """Un modèle inconnu lève KeyError"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(tmp)
+        try:
+            registry.get('absent.h5')
+            assert False, "KeyError attendue"
+        except KeyError:
+            pass
+
+
+if __name__ == "__main__":
+    for test in [test_lazy_loading_and_lru, test_hot_swap_on_file_change, test_unknown_model]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,90 @@
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from helpers import MARKET_DATA, make_service
+from services.candle_store import CSVReplaySource
+
+PRICE_FACTORS = {"BTC-USD": 1.0, "ETH-USD": 0.03, "SOL-USD": 0.0015, "DOGE-USD": 0.000002}
+
+
+class FakeSource:
+    """Source locale: market_data.csv mis à l'échelle par actif, avec une latence réseau simulée"""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, ticker, latency=0.2):
+        self.ticker = ticker
+        self.latency = latency
+        self.replay = CSVReplaySource(MARKET_DATA)
+
+    def fetch(self, start=None, period="300d"):
+        with FakeSource.lock:
+            FakeSource.active += 1
+            FakeSource.max_active = max(FakeSource.max_active, FakeSource.active)
+        try:
+            time.sleep(self.latency)
+            if self.ticker not in PRICE_FACTORS:
+                raise ConnectionError(f"Actif inconnu: {self.ticker}")
+            data = self.replay.fetch(start=start, period=period).copy()
+            data[['Close', 'Open', 'High', 'Low']] *= PRICE_FACTORS[self.ticker]
+            return data
+        finally:
+            with FakeSource.lock:
+                FakeSource.active -= 1
+
+
+def make_multi_asset_service(tmp):
+    """Service dont chaque actif est rejoué par une FakeSource, modèle instrumenté"""
+    return make_service(tmp, count_calls=True, store_root=tmp, seed_csv=None, source_factory=FakeSource)
+
+
+def test_concurrent_fetch_and_batched_rollout():
+    """Les actifs sont récupérés en parallèle et avancent ensemble dans le modèle"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_multi_asset_service(tmp)
+        model = service.model
+        FakeSource.max_active = 0
+
+        start = time.perf_counter()
+        result = service.generate_multi_asset_prediction(["btc-usd", "ETH-USD", "SOL-USD", "DOGE-USD"], n_days=30)
+        elapsed = time.perf_counter() - start
+
+        assert FakeSource.max_active == 4
+        assert elapsed < 4 * 0.2
+        assert model.calls == 30
+        assert result["model_calls"] == 30
+        assert list(result["assets"]) == ["BTC-USD", "ETH-USD", "SOL-USD", "DOGE-USD"]
+
+        # Chaque actif garde ses propres scalers: trajectoire identique au calcul mono-actif
+        for ticker, asset in result["assets"].items():
+            data = service.get_latest_data(ticker)
+            expected = service._compute_prediction(data, 30, service.resolve_model())
+            np.testing.assert_allclose(asset["predicted_prices"], expected["predicted_prices"], rtol=1e-6)
+        assert result["assets"]["ETH-USD"]["current_price"] < result["assets"]["BTC-USD"]["current_price"]
+
+
+def test_partial_failure_and_validation():
+    """Un actif indisponible est signalé sans bloquer les autres; les symboles invalides sont refusés"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_multi_asset_service(tmp)
+        result = service.generate_multi_asset_prediction(["ETH-USD", "XXX-USD"], n_days=5)
+        assert list(result["assets"]) == ["ETH-USD"]
+        assert list(result["errors"]) == ["XXX-USD"]
+
+        for tickers in (["../../etc"], [], ["ETH USD"]):
+            try:
+                service.generate_multi_asset_prediction(tickers)
+                assert False, "ValueError attendue"
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    for test in [test_concurrent_fetch_and_batched_rollout, test_partial_failure_and_validation]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.numpy_lstm import NumpyLSTMModel
+
+MODEL_PATHS = [
+    os.path.join(ROOT_DIR, 'app', 'models', 'model.h5'),
+    os.path.join(ROOT_DIR, 'model', 'model_btc_close_only_4y.h5'),
+    os.path.join(ROOT_DIR, 'model', 'model_btc_ohlcv_4y.h5'),
+    os.path.join(ROOT_DIR, 'model', 'model_btc_rolling_30d_1y.h5'),
+]
+
+
+def test_load_all_models():
+    """Tous les modèles du dépôt se chargent sans TensorFlow"""
+    for path in MODEL_PATHS:
+        model = NumpyLSTMModel.from_h5(path)
+        x = np.zeros((4, 1, model.input_dim), dtype=np.float32)
+        assert model.predict(x).shape == (4, 1)
+
+
+def test_parity_with_keras():
+    """Les prédictions NumPy correspondent à celles de Keras"""
+    try:
+        from keras.models import load_model
+    except ImportError:
+        print("SKIP: Keras non installé, comparaison ignorée")
+        return
+
+    rng = np.random.default_rng(0)
+    for path in MODEL_PATHS:
+        keras_model = load_model(path, compile=False)
+        numpy_model = NumpyLSTMModel.from_h5(path)
+        x = rng.uniform(-1, 1, size=(32, 3, numpy_model.input_dim)).astype(np.float32)
+        expected = keras_model.predict(x, verbose=0)
+        np.testing.assert_allclose(numpy_model.predict(x), expected, atol=1e-5)
+
+
+def test_single_step_latency():
+    """Un pas de prédiction (batch 1) prend moins d'une milliseconde"""
+    model = NumpyLSTMModel.from_h5(MODEL_PATHS[0])
+    x = np.zeros((1, 1, model.input_dim), dtype=np.float32)
+    model.predict(x)
+    start = time.perf_counter()
+    for _ in range(200):
+        model.predict(x)
+    elapsed_ms = (time.perf_counter() - start) / 200 * 1000
+    print(f"Temps moyen par pas: {elapsed_ms:.3f} ms")
+    assert elapsed_ms < 5
+
+
+if __name__ == "__main__":
+    for test in [test_load_all_models, test_parity_with_keras, test_single_step_latency]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+import numpy as np
+
+from helpers import MARKET_DATA, MODEL_PATH, ROOT_DIR, make_store
+from services.model_bundle import load_bundle
+from services.numpy_lstm import NumpyLSTMModel
+from services.prediction_service import BitcoinPredictionService
+from services.quantization import accuracy_report, export_quantized, quantize_weights
+
+
+def test_int8_quantization_error_bounded():
+    weights = np.random.default_rng(0).normal(size=(100, 400)).astype(np.float32)
+    quantized, scale = quantize_weights(weights, 'int8')
+
+    assert quantized.dtype == np.int8 and scale.shape == (400,)
+    assert np.all(np.abs(quantized * scale - weights) <= scale / 2 + 1e-7)
+
+
+def test_export_and_load_quantized_bundle():
+    """Le bundle int8 est 4x plus petit en mémoire et prédit comme le modèle float32"""
+    reference = NumpyLSTMModel.from_h5(MODEL_PATH)
+    x = np.random.default_rng(1).uniform(-1, 1, size=(32, 1, reference.input_dim))
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, tolerance in (('float16', 1e-3), ('int8', 1e-2)):
+            path = export_quantized(MODEL_PATH, mode, output=os.path.join(tmp, f'model.{mode}.npz'))
+            bundle = load_bundle(path)
+
+            assert bundle.model.quantization == mode
+            assert bundle.scaler_x is None  # .h5: scalers réajustés à chaque requête
+            np.testing.assert_allclose(bundle.model.predict(x), reference.predict(x), atol=tolerance)
+        assert bundle.model.nbytes < reference.nbytes / 3
+
+
+def test_service_quantization_option():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        reference = BitcoinPredictionService(model_path=MODEL_PATH, store=store, backend='numpy')
+        quantized = BitcoinPredictionService(model_path=MODEL_PATH, store=store, backend='numpy',
+                                             quantization='int8')
+
+        assert quantized.resolve_model().model.quantization == 'int8'
+        expected = reference.generate_prediction(n_days=30)["predicted_prices"]
+        result = quantized.generate_prediction(n_days=30)["predicted_prices"]
+        np.testing.assert_allclose(result, expected, rtol=1e-3)
+
+        try:
+            BitcoinPredictionService(model_path=MODEL_PATH, store=store, backend='keras', quantization='int8',
+                                     eager_load=False)
+            assert False, "Quantification avec le backend keras acceptée"
+        except ValueError:
+            pass
+
+
+def test_accuracy_report():
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = {'int8': export_quantized(MODEL_PATH, 'int8', output=os.path.join(tmp, 'model.int8.npz'))}
+        report = accuracy_report(MODEL_PATH, variants, csv_path=MARKET_DATA, n_days=5)
+
+    assert list(report['Format']) == ['float32', 'int8']
+    assert abs(report['MAPE_5d'][1] - report['MAPE_5d'][0]) < 0.1
+    assert report['Poids_Ko'][1] < report['Poids_Ko'][0] / 3
+
+
+def test_accuracy_report_close_only_model():
+    """Le walk-forward d'un modèle Close seul n'utilise que sa feature (pas les 7 du modèle rolling)"""
+    path = os.path.join(ROOT_DIR, 'model', 'model_btc_close_only_4y.h5')
+    report = accuracy_report(path, {}, csv_path=MARKET_DATA, n_days=5)
+
+    assert list(report['Format']) == ['float32']
+    assert np.isfinite(report['MAPE_5d'][0])
+
+
+if __name__ == "__main__":
+    test_int8_quantization_error_bounded()
+    print("SUCCESS: test_int8_quantization_error_bounded")
+    test_export_and_load_quantized_bundle()
+    print("SUCCESS: test_export_and_load_quantized_bundle")
+    test_service_quantization_option()
+    print("SUCCESS: test_service_quantization_option")
+    test_accuracy_report()
+    print("SUCCESS: test_accuracy_report")
+    test_accuracy_report_close_only_model()
+    print("SUCCESS: test_accuracy_report_close_only_model")
@@ -0,0 +1,98 @@
+import tempfile
+import time
+
+import numpy as np
+
+from helpers import make_service
+from services.metrics import STAGE_DURATION
+
+
+def reference_rolling(service, initial_data, n_days):
+    """Boucle d'origine (un appel par jour, inverse_transform/transform complets)"""
+    predictions = []
+    current_data = initial_data.copy()
+    for _ in range(n_days):
+        pred_scaled = service.model.predict(current_data.reshape((1, 1, -1)), verbose=0)
+        pred_price = service.scaler_y.inverse_transform(pred_scaled)[0, 0]
+        predictions.append(pred_price)
+        current_data_unscaled = service.scaler_x.inverse_transform(current_data.reshape(1, -1))[0]
+        current_data_unscaled[0] = pred_price
+        current_data = service.scaler_x.transform(current_data_unscaled.reshape(1, -1))[0]
+    return np.array(predictions)
+
+
+def test_batch_matches_sequential():
+    """Le rollout batché donne les mêmes trajectoires que la boucle séquentielle"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, count_calls=True)
+        data = service.get_latest_bitcoin_data()
+        X_scaled, _ = service.prepare_data_for_prediction(data)
+
+        anchors = X_scaled[-5:]
+        batch = service.predict_rolling_batch(anchors, n_days=30)
+        for i, anchor in enumerate(anchors):
+            np.testing.assert_allclose(batch[i], reference_rolling(service, anchor, 30), rtol=1e-5)
+
+
+def test_batch_model_calls():
+    """500 scénarios coûtent autant d'appels au modèle qu'un seul"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, count_calls=True)
+        scenarios = [{"shocks": {"Volume": 1 + i / 100}, "days": 10 + i % 21} for i in range(500)]
+        result = service.generate_batch_prediction(scenarios)
+        assert service.model.calls == 30
+        assert result["model_calls"] == 30
+        assert len(result["scenarios"]) == 500
+        assert len(result["scenarios"][1]["predicted_prices"]) == 11
+
+
+def test_batch_anchor_dates():
+    """Les dates d'ancrage utilisent la dernière bougie disponible à cette date"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, count_calls=True)
+        result = service.generate_batch_prediction([
+            {"id": "a", "anchor_date": "2025-06-01", "days": 5},
+            {"id": "b", "overrides": {"RSI_14": 30.0}},
+        ])
+        first, second = result["scenarios"]
+        assert first["anchor_date"] == "2025-06-01"
+        assert first["prediction_dates"][0] == "2025-06-02"
+        assert len(second["predicted_prices"]) == 30
+
+        try:
+            service.generate_batch_prediction([{"overrides": {"Inconnue": 1}}])
+            assert False, "Une feature inconnue doit être refusée"
+        except ValueError:
+            pass
+
+
+def test_stream_events():
+    """La prédiction diffusée émet un événement par jour, identique à la prédiction complète"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, count_calls=True)
+        rollout = STAGE_DURATION.labels(stage="rollout")
+        observed, total = sum(rollout._counts), rollout._sum
+        events = []
+        for event in service.stream_prediction(n_days=10):
+            events.append(event)
+            time.sleep(0.02)  # Client lent
+        names = [name for name, _ in events]
+        assert names == ["start"] + ["day"] * 10 + ["summary"]
+        assert service.model.calls == 10
+        # Étape rollout enregistrée une fois, sans l'attente du client entre les événements
+        assert sum(rollout._counts) == observed + 1
+        assert rollout._sum - total < 0.2
+
+        expected = service.generate_prediction(n_days=10)
+        assert [data["price"] for name, data in events if name == "day"] == expected["predicted_prices"]
+        assert events[-1][1]["variation_percent"] == expected["variation_percent"]
+
+        # Deuxième diffusion: rejouée depuis le cache, sans appel au modèle
+        replay = list(service.stream_prediction(n_days=10))
+        assert replay[0][1]["cached"] and service.model.calls == 10
+
+
+if __name__ == "__main__":
+    for test in [test_batch_matches_sequential, test_batch_model_calls, test_batch_anchor_dates, test_stream_events]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
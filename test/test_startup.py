@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+from helpers import make_service
+from services.startup import StartupReport, start_warmup
+
+
+def test_background_warmup():
+    """Le service est créé sans modèle, puis le préchauffage le charge et remplit le cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, eager_load=False)
+        assert service.model is None
+
+        report = StartupReport()
+        start_warmup(service, report).join(timeout=60)
+
+        assert report.ready
+        assert service.model is not None
+        assert set(report.as_dict()["phases_seconds"]) == {"model_load", "first_inference", "total"}
+        assert service.cache.stats()["size"] == 1
+
+
+def test_warmup_failure():
+    """Un modèle introuvable laisse le service non prêt avec l'erreur"""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp, model_path=os.path.join(tmp, 'absent.h5'), eager_load=False)
+        report = StartupReport()
+        start_warmup(service, report).join(timeout=60)
+
+        assert not report.ready
+        assert report.as_dict()["state"] == "failed"
+        assert "absent.h5" in report.error
+
+
+if __name__ == "__main__":
+    for test in [test_background_warmup, test_warmup_failure]:
+        test()
+        print(f"SUCCESS: {test.__name__}")
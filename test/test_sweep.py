@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Ajout du chemin du backend au PYTHONPATH
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'app', 'backend'))
+
+from services.backtest import RESULTS_COLUMNS
+from services.sweep import COMPLETED, MedianPruner, SweepStore, expand_spec, run_sweep, trial_id
+
+MARKET_DATA = os.path.join(ROOT_DIR, 'market_data.csv')
+
+
+def test_expand_spec():
+    grid = expand_spec({"mode": "grid", "params": {"lookback": [1, 7, 30], "batch_size": [16, 32]}})
+    assert len(grid) == 6
+    assert all(trial["pipeline"] == "rolling" and trial["epochs"] == 100 for trial in grid)
+
+    spec = {"mode": "random", "n_trials": 20, "seed": 3,
+            "params": {"lookback": {"low": 1, "high": 120}, "batch_size": [16, 32, 64]}}
+    first, second = expand_spec(spec), expand_spec(spec)
+    assert [trial_id(trial) for trial in first] == [trial_id(trial) for trial in second]
+    assert all(1 <= trial["lookback"] <= 120 for trial in first)
+
+
+def test_median_pruner():
+    references = [[1.0, 0.8, 0.6, 0.5], [1.0, 0.9, 0.7, 0.6], [1.2, 1.0, 0.9]]
+    pruner = MedianPruner(references, warmup_epochs=2, min_trials=3)
+
+    assert not pruner.should_prune(0, 5.0)  # Avant la fin du préchauffage
+    assert pruner.should_prune(2, 0.8)  # Médiane au 3e epoch: 0.7
+    assert not pruner.should_prune(2, 0.65)
+    # Un essai de référence plus court garde sa dernière meilleure valeur
+    assert pruner.should_prune(5, 0.61) and not pruner.should_prune(5, 0.55)
+    assert not MedianPruner(references[:2], min_trials=3).should_prune(10, 99.0)
+
+
+def test_sweep_resumes():
+    """Les essais déjà enregistrés ne sont pas relancés; le fichier reprend les colonnes des résultats"""
+    spec = {"mode": "grid", "params": {"lookback": [1, 5], "epochs": [2], "units": [4], "batch_size": [32]}}
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, 'sweep.csv')
+        first = expand_spec(spec)[0]
+        SweepStore(results_path).append({'Trial': trial_id(first), 'Statut': COMPLETED, 'Courbe_val_loss': '[0.1]'})
+
+        executed = run_sweep(spec, results_path, csv_path=MARKET_DATA, workers=1, threads_per_worker=1)
+        assert executed == 1
+
+        results = pd.read_csv(results_path, dtype={'Trial': str})
+        assert list(results.columns[:len(RESULTS_COLUMNS)]) == RESULTS_COLUMNS
+        assert results.iloc[-1]['Window'] == 5 and results.iloc[-1]['Statut'] == COMPLETED
+        assert run_sweep(spec, results_path, csv_path=MARKET_DATA, workers=1) == 0
+
+
+if __name__ == "__main__":
+    test_expand_spec()
+    print("SUCCESS: test_expand_spec")
+    test_median_pruner()
+    print("SUCCESS: test_median_pruner")
+    test_sweep_resumes()
+    print("SUCCESS: test_sweep_resumes")
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+import numpy as np
+
+from helpers import MARKET_DATA, MODEL_PATH
+from services.model_bundle import save_bundle
+from services.model_registry import load_model_file
+from services.training import keras_sequence, load_pipeline_data, prepare_samples, sliding_windows, train_pipeline
+
+
+def test_sliding_windows_are_views():
+    """Les fenêtres sont des vues du tableau d'origine, sans copie"""
+    values = np.arange(20, dtype=np.float32).reshape(10, 2)
+    windows = sliding_windows(values, 4)
+
+    assert windows.shape == (7, 4, 2)
+    assert np.shares_memory(windows, values)
+    np.testing.assert_array_equal(windows[3], values[3:7])
+
+
+def test_windows_aligned_with_next_close():
+    """La fenêtre se terminant au jour t a pour cible le Close du jour t + 1"""
+    data = load_pipeline_data('rolling', csv_path=MARKET_DATA)
+    train, test, scaler_x, scaler_y = prepare_samples(data, lookback=5)
+
+    assert len(train) + len(test) == len(data) - 5
+    X, y = train.batch(train.indices[:3])
+    assert X.shape == (3, 5, 7)
+    np.testing.assert_allclose(scaler_x.inverse_transform(X[0]), data.values[0:5], rtol=1e-5)
+    np.testing.assert_allclose(scaler_y.inverse_transform(y)[:, 0], data['Close'].values[5:8], rtol=1e-5)
+    # Toutes les cibles de test sont postérieures à la période d'entraînement
+    assert test.indices[0] + 5 == int(len(data) * 0.8)
+
+
+def test_sequence_batches():
+    data = load_pipeline_data('ohlcv', csv_path=MARKET_DATA)
+    train, _, _, _ = prepare_samples(data, lookback=10)
+    sequence = keras_sequence(train, batch_size=32)
+
+    assert len(sequence) == int(np.ceil(len(train) / 32))
+    X, y = sequence[len(sequence) - 1]
+    assert X.shape[1:] == (10, 5) and X.dtype == np.float32
+    assert len(X) == len(y) == len(train) - 32 * (len(sequence) - 1)
+
+
+def test_train_pipeline_small():
+    """Entraînement rapide (petit modèle, 1 epoch) avec une fenêtre de 7 jours"""
+    data = load_pipeline_data('rolling', csv_path=MARKET_DATA)
+    result = train_pipeline('rolling', data=data, lookback=7, epochs=1, units=8, verbose=0)
+
+    assert result["model"].input_shape == (None, 7, 7)
+    assert np.isfinite(result["mape_1d"])
+    assert result["metadata"]["window"] == 7
+
+    # Modèle à fenêtre 7: refusé au chargement (.h5 NumPy ou Keras, bundle), le modèle servi est accepté
+    with tempfile.TemporaryDirectory() as tmp:
+        h5_path = os.path.join(tmp, 'model_w7.h5')
+        result["model"].save(h5_path)
+        bundle_path = os.path.join(tmp, 'model_w7.npz')
+        save_bundle(bundle_path, result["model"], result["scaler_x"], result["scaler_y"], result["features"],
+                    metadata=result["metadata"])
+        for path, backend in [(h5_path, 'numpy'), (h5_path, 'keras'), (bundle_path, 'numpy')]:
+            try:
+                load_model_file(path, backend=backend)
+                assert False, f"ValueError attendue pour {path} ({backend})"
+            except ValueError as e:
+                assert "fenêtre de 7 bougies" in str(e)
+    assert load_model_file(MODEL_PATH, backend='numpy').model.timesteps == 1
+
+
+if __name__ == "__main__":
+    test_sliding_windows_are_views()
+    print("SUCCESS: test_sliding_windows_are_views")
+    test_windows_aligned_with_next_close()
+    print("SUCCESS: test_windows_aligned_with_next_close")
+    test_sequence_batches()
+    print("SUCCESS: test_sequence_batches")
+    test_train_pipeline_small()
+    print("SUCCESS: test_train_pipeline_small")
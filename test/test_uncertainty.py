@@ -0,0 +1,91 @@
+import tempfile
+
+import numpy as np
+
+from helpers import MODEL_PATH, make_service
+from services.numpy_lstm import NumpyLSTMModel
+from services.rollout import quantile_bands, rollout_mc_dropout
+
+
+class CountingNumpyModel(NumpyLSTMModel):
+    """Moteur NumPy qui compte les appels à predict"""
+
+    calls = 0
+
+    def predict(self, x, verbose=0, batch_size=None, training=False, rng=None):
+        self.calls += 1
+        return super().predict(x, verbose=verbose, training=training, rng=rng)
+
+
+def load_counting_model():
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    return CountingNumpyModel(model.layers)
+
+
+def test_numpy_dropout_training_mode():
+    """Dropout actif uniquement avec training=True, masques reproductibles avec un rng seedé"""
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    x = np.random.default_rng(0).uniform(-1, 1, size=(64, 1, model.input_dim))
+
+    np.testing.assert_array_equal(model.predict(x), model(x, training=False))
+    sampled = model(x, training=True, rng=np.random.default_rng(1))
+    assert not np.allclose(sampled, model.predict(x))
+    np.testing.assert_array_equal(sampled, model(x, training=True, rng=np.random.default_rng(1)))
+
+    # Lignes identiques: masques différents pour chaque élément du batch
+    repeated = np.repeat(x[:1], 32, axis=0)
+    assert np.std(model(repeated, training=True)) > 0
+
+
+def test_mc_rollout_one_call_per_day():
+    model = load_counting_model()
+    initial = np.zeros(model.input_dim)
+    ones = np.ones(model.input_dim)
+
+    paths = rollout_mc_dropout(model, initial, 10, 200, ones, np.zeros(model.input_dim), 1.0, 0.0, seed=0)
+    assert paths.shape == (200, 10)
+    assert model.calls == 10
+
+    bands = quantile_bands(paths)
+    assert all(len(bands[name]) == 10 for name in ("p10", "p50", "p90"))
+    assert all(low <= mid <= high for low, mid, high in zip(bands["p10"], bands["p50"], bands["p90"]))
+
+
+def test_mc_rollout_latency_budget():
+    """Au-delà du budget, des trajectoires sont abandonnées (au moins min_samples gardées)"""
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    ticks = iter(range(1000))
+    clock = lambda: float(next(ticks))  # 1 s par pas
+
+    paths = rollout_mc_dropout(model, np.zeros(model.input_dim), 10, 400, np.ones(model.input_dim),
+                               np.zeros(model.input_dim), 1.0, 0.0, budget_s=5.0, min_samples=50, clock=clock)
+    assert 50 <= len(paths) < 400
+    assert np.isfinite(paths).all()
+
+
+def test_prediction_with_uncertainty_bands():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+
+        result = service.generate_prediction(n_days=15, samples=100)
+        assert result["success"], result.get("error")
+        uncertainty = result["uncertainty"]
+        assert uncertainty["method"] == "mc_dropout" and uncertainty["samples"] == 100
+        assert len(uncertainty["quantiles"]["p50"]) == 15
+        assert uncertainty["quantiles"]["p10"][-1] < uncertainty["quantiles"]["p90"][-1]
+        assert 0.1 <= result["confidence_score"] <= 1.0
+
+        # Sans échantillons: réponse inchangée
+        assert "uncertainty" not in service.generate_prediction(n_days=15)
+        assert not service.generate_prediction(n_days=15, samples=10 ** 6)["success"]
+
+
+if __name__ == "__main__":
+    test_numpy_dropout_training_mode()
+    print("SUCCESS: test_numpy_dropout_training_mode")
+    test_mc_rollout_one_call_per_day()
+    print("SUCCESS: test_mc_rollout_one_call_per_day")
+    test_mc_rollout_latency_budget()
+    print("SUCCESS: test_mc_rollout_latency_budget")
+    test_prediction_with_uncertainty_bands()
+    print("SUCCESS: test_prediction_with_uncertainty_bands")
@@ -1,6 +1,13 @@
+import os
+import sys
 import yfinance as yf
 import pandas as pd
 
+# Ajout du chemin du backend au PYTHONPATH
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app', 'backend'))
+
+from services.indicators import calculate_rsi
+
 print("Test de yfinance...")
 
 # Test de récupération des données
@@ -50,12 +57,3 @@ try:
         
 except Exception as e:
     print(f"Erreur générale: {e}")
-
-def calculate_rsi(prices, window=14):
-    """Calcule le RSI (Relative Strength Index)"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi 
\ No newline at end of file